@@ -0,0 +1,259 @@
+import time
+import threading
+from collections import OrderedDict
+
+from PIL import Image as pil_image
+
+from lib import shch_img_browser_render as ShchRender
+from lib import shch_img_browser_io as ShchIO
+
+DEBUG_ENABLED = False
+
+# the frames shorter than this (in ms) are shown for DEFAULT_DURATION ms, the way web browsers do it (many GIF files
+#   ask for 0 or 10 ms, meaning "as fast as possible")
+MIN_DURATION = 20
+DEFAULT_DURATION = 100
+
+class ImgAnimation():
+    __doc__ = """
+    plays an animated image (GIF, APNG, WebP) in a Tk label, using the duration of every frame.
+        The frames are decoded one after another in the background thread, and rendered at the shown size
+        (see ShchRender.ImgMaster.fnc_render(...)), so that the Tk loop only shows them.
+        The rendered frames are kept while they fit into the memory budget, thus a short animation is decoded
+        once and then loops from memory. A longer one is streamed: the decoder runs at most a few frames ahead of
+        the shown one, the shown frames are dropped, and every loop decodes the file again, thus the memory taken
+        stays the same however long the animation is.
+        The frames are shown on absolute deadlines (the time it takes to show a frame does not add up).
+    Args:
+        tk_root : Tk
+            The main window (used to show the frames with after(...)).
+        img_path : str
+            The path to the image file.
+        params : tuple
+            (scale, flip_left_right, flip_top_bottom, rotation, screen_size) as in ShchRender.fnc_RenderImage(...).
+            The frames are always rendered in the fine quality.
+        callback : function
+            This is called (in the Tk loop) as callback(frame) to show a frame (ShchRender.RenderedFrame).
+        kwargs : typical kwargs
+            'max_bytes' : int
+                The memory budget of the rendered frames (in bytes). The default is 64 MB.
+            'ahead' : int
+                How many frames the decoder runs ahead of the shown one, when streaming. The default is 8.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, tk_root, img_path, params, callback, **kwargs):
+        self.tk_root = tk_root
+        self.IMG_PATH = img_path
+        self.PARAMS = tuple(params[:5])
+        self.callback = callback
+        self.MAX_BYTES = kwargs['max_bytes'] if 'max_bytes' in kwargs else 64 * 1024 * 1024
+        self.AHEAD = kwargs['ahead'] if 'ahead' in kwargs else 8
+        self.POLL_INTERVAL = 10 # in ms. How often to check for a frame which is still being decoded
+
+        self.CONDITION = threading.Condition()
+        self.FRAMES = OrderedDict() # frame index -> (frame, duration in ms, nbytes)
+        self.BYTES = 0
+        self.IS_STREAMING = False # True once the frames do not fit into self.MAX_BYTES
+        self.FRAME_COUNT = None # known once the decoder has reached the end of the file
+        self.LOOP_TIME = 0. # the duration of a loop (in seconds), known along with self.FRAME_COUNT
+        self.IS_FAILED = False
+
+        self.INDEX = 0 # the frame to be shown next
+        self.LOOPS = 0 # how many loops have been played
+        self.START_TIME = None # when the first frame was shown (time.perf_counter())
+        self.NEXT_TIME = 0. # when the next frame is due (time.perf_counter())
+        self.TICK_QUEUE = []
+        self.IS_PLAYING = False
+        self.IS_STOPPED = False
+        self.THREAD = threading.Thread(target= self.fnc_work, daemon= True)
+        self.THREAD.start()
+        # end of __init__
+    #!
+    # checks if this is the animation of a given file, shown with given parameters.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       The render parameters (see ShchImgBrowser.fnc_getRenderParams(...)); the quality is not compared.
+    # Returns: result : bool
+    def fnc_isOf(self, img_path, params):
+        return (img_path == self.IMG_PATH) and (tuple(params[:5]) == self.PARAMS)
+        # end of function
+    #!
+    # decodes and renders the frames. This runs in the background thread and must not touch Tk.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_work(self):
+        try:
+            ShchIO.fnc_LoadPlugin(self.IMG_PATH)
+            _img = pil_image.open(self.IMG_PATH)
+        except:
+            self.IS_FAILED = True
+            return
+
+        with _img:
+            _index = 0
+            _loop_time = 0.
+            while True:
+                with self.CONDITION:
+                    # when streaming, the decoder waits for the shown frames to be taken
+                    while not self.IS_STOPPED and self.IS_STREAMING and\
+                          ((len(self.FRAMES) >= self.AHEAD) or (_index in self.FRAMES)):
+                        self.CONDITION.wait()
+                    if self.IS_STOPPED:
+                        return
+
+                try:
+                    _img.seek(_index)
+                    _frame_img = _img.convert('RGBA')
+                    _duration = _img.info.get('duration') or 0
+                except EOFError:
+                    if _index < 1:
+                        self.IS_FAILED = True
+                        return
+                    with self.CONDITION:
+                        self.FRAME_COUNT = _index
+                        self.LOOP_TIME = _loop_time
+                        if not self.IS_STREAMING:
+                            # all frames are in memory
+                            return
+                    _index = 0
+                    continue
+                except:
+                    if DEBUG_ENABLED:
+                        print('animation frame cannot be decoded: ', self.IMG_PATH, _index)
+                    self.IS_FAILED = self.IS_FAILED or (_index < 1)
+                    with self.CONDITION:
+                        # the frames decoded so far are played as the whole animation
+                        self.FRAME_COUNT = self.FRAME_COUNT or _index
+                        self.LOOP_TIME = self.LOOP_TIME or _loop_time
+                        if not self.IS_STREAMING:
+                            return
+                    _index = 0
+                    continue
+
+                if _duration < MIN_DURATION:
+                    _duration = DEFAULT_DURATION
+                _frame = ShchRender.ImgMaster(self.IMG_PATH, None, _frame_img, _frame_img.size).fnc_render(\
+                            *self.PARAMS, 'fine')
+                if _frame is None:
+                    self.IS_FAILED = True
+                    return
+                _nbytes = _frame.fnc_getSizeInBytes()
+                if self.FRAME_COUNT is None:
+                    _loop_time += .001 * _duration
+
+                with self.CONDITION:
+                    self.FRAMES[_index] = (_frame, _duration, _nbytes)
+                    self.BYTES += _nbytes
+                    if not self.IS_STREAMING and (self.BYTES > self.MAX_BYTES):
+                        # the animation is too long to be kept: the frames already shown are dropped
+                        self.IS_STREAMING = True
+                        for _shown in [_each for _each in self.FRAMES if _each < self.INDEX]:
+                            self.BYTES -= self.FRAMES.pop(_shown)[2]
+                        if DEBUG_ENABLED:
+                            print('animation is streamed: ', self.IMG_PATH)
+                    self.CONDITION.notify_all()
+                _index += 1
+        # end of function
+    #!
+    # starts (or resumes) playing the animation.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_play(self):
+        if self.IS_STOPPED or self.IS_PLAYING:
+            return
+        self.IS_PLAYING = True
+        self.NEXT_TIME = time.perf_counter()
+        self.fnc_tick()
+        # end of function
+    #!
+    # pauses the animation (e.g. when another image is shown). The decoded frames are kept.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_pause(self):
+        self.IS_PLAYING = False
+        for _each in self.TICK_QUEUE:
+            try:
+                self.tk_root.after_cancel(_each)
+            except:
+                pass
+        self.TICK_QUEUE = []
+        # end of function
+    #!
+    # checks if the animation is being played (i.e. it is not paused, and it has shown a frame).
+    # Args: none.
+    # Returns: result : bool
+    def fnc_isPlaying(self):
+        return self.IS_PLAYING and not (self.START_TIME is None) and not self.IS_FAILED
+        # end of function
+    #!
+    # shows the next frame, and schedules the one after it. This is called by the Tk loop (through after(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_tick(self):
+        self.TICK_QUEUE = []
+        if self.IS_STOPPED or not self.IS_PLAYING:
+            return
+
+        with self.CONDITION:
+            if not (self.FRAME_COUNT is None) and (self.INDEX >= self.FRAME_COUNT):
+                self.INDEX = 0
+                self.LOOPS += 1
+            _entry = self.FRAMES.get(self.INDEX)
+            if not (_entry is None) and self.IS_STREAMING:
+                self.FRAMES.pop(self.INDEX)
+                self.BYTES -= _entry[2]
+                self.CONDITION.notify_all()
+
+        if _entry is None:
+            if not self.IS_FAILED:
+                # the frame is still being decoded
+                self.TICK_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_tick)]
+            return
+
+        _frame, _duration, _nbytes = _entry
+        self.callback(_frame)
+        self.INDEX += 1
+        _now = time.perf_counter()
+        if self.START_TIME is None:
+            self.START_TIME = _now
+        # the next frame is due one duration after this one was due, unless this one is late
+        self.NEXT_TIME = max(self.NEXT_TIME, _now - .001 * _duration) + .001 * _duration
+        self.TICK_QUEUE = [self.tk_root.after(max(0, int(1000 * (self.NEXT_TIME - _now))), self.fnc_tick)]
+        # end of function
+    #!
+    # returns how long autoplay should wait for the animation, i.e. until it has played once, but not longer than
+    #   the given cap (counted from when the animation started).
+    # Args:
+    #   max_wait : float
+    #       The cap (in seconds).
+    # Returns: wait : float
+    #   In seconds; this is 0 if autoplay can move on. If the end of the loop is not known yet, this is a short
+    #   time after which to ask again.
+    def fnc_getWait(self, max_wait):
+        if self.IS_STOPPED or self.IS_FAILED or (self.LOOPS > 0):
+            return 0.
+        _now = time.perf_counter()
+        _left = max_wait - ((_now - self.START_TIME) if not (self.START_TIME is None) else 0.)
+        if _left <= 0:
+            return 0.
+        if (self.FRAME_COUNT is None) or (self.START_TIME is None):
+            return min(_left, .1)
+        # the frames may be late, thus the loop is checked again when it should be over
+        return min(_left, max(self.START_TIME + self.LOOP_TIME - _now, .02))
+        # end of function
+    #!
+    # stops the animation, and drops its frames.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.fnc_pause()
+        with self.CONDITION:
+            self.IS_STOPPED = True
+            self.FRAMES = OrderedDict()
+            self.BYTES = 0
+            self.CONDITION.notify_all()
+        # end of function
+    # end of class ImgAnimation
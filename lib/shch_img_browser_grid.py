@@ -0,0 +1,298 @@
+import os
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import ImageTk as pil_image_tk
+import tkinter as tk
+
+DEBUG_ENABLED = False
+
+class ImgGridView():
+    __doc__ = """
+    shows the thumbnails of the images in a folder as a scrollable grid.
+        Only the cells which are visible have canvas items; those items are reused (moved and refilled) when
+        the grid is scrolled, thus scrolling costs the same for 100 and for 100k images.
+        The thumbnails are loaded (see ThumbnailStore) in a pool of worker threads, the visible ones first, and passed
+        back to the Tk loop through a queue which is polled with after(...).
+    Args:
+        parent : Tk widget
+            The widget to place the grid in (it is packed into it).
+        image_folder : str
+            The folder with images.
+        image_files : list
+            The list of image files (e.g. ShchImgBrowser.IMAGE_FILES_LIST). The list is read as it is, i.e. the images
+            appended to it later are shown too.
+        thumbnails : ThumbnailStore
+            The store to get the thumbnails from.
+        callback : function
+            This is called with the index of the clicked image.
+        kwargs : typical kwargs
+            'current_index' : int
+                The index of the image to highlight and to scroll to.
+            'font_size' : int
+                The font size of the file names.
+            'thumb_size' : int
+                The size of the thumbnails (default is 128).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, parent, image_folder, image_files, thumbnails, callback, **kwargs):
+        self.IMAGE_FOLDER = image_folder
+        self.IMAGE_FILES_LIST = image_files
+        self.THUMBNAILS = thumbnails
+        self.callback = callback
+
+        self.CURRENT_IMAGE_INDEX = kwargs['current_index'] if 'current_index' in kwargs else 0
+        self.FONT_SIZE = kwargs['font_size'] if 'font_size' in kwargs else 9
+        self.THUMB_SIZE = kwargs['thumb_size'] if 'thumb_size' in kwargs else 128
+        self.CELL_WIDTH = self.THUMB_SIZE + 24
+        self.CELL_HEIGHT = self.THUMB_SIZE + 2 * self.FONT_SIZE + 20
+        self.POLL_INTERVAL = 30 # in ms.
+        self.MAX_PHOTOS = 1024 # thumbnails kept as PhotoImage (the visible ones and the recently visible ones)
+
+        self.COLUMNS = 1
+        self.OFFSET = 0 # in pixels, from the top of the (virtual) grid to the top of the canvas
+        self.CELLS = [] # each cell is a dict with the canvas items and the index of the image shown in it
+        self.PHOTOS = OrderedDict() # image file name -> PhotoImage
+        self.WANTED = set() # file names of the thumbnails which are still needed (see fnc_work(...))
+        self.REQUESTED = set() # file names of the thumbnails submitted to the worker threads
+        self.FAILED = set() # file names of the images which cannot be loaded
+        self.FIRST_INDEX = 0 # the index of the image in the top-left cell
+        self.EXECUTOR = ThreadPoolExecutor(max_workers=2)
+        self.RESULTS = queue.Queue()
+        self.POLL_QUEUE = []
+        self.IS_STOPPED = False
+
+        self.FRAME = tk.Frame(parent)
+        self.FRAME.pack(fill= 'both', expand= 'yes')
+        self.CANVAS = tk.Canvas(self.FRAME, highlightthickness= 0)
+        self.SCROLLBAR = tk.Scrollbar(self.FRAME, orient= 'vertical', command= self.fnc_yview)
+        self.SCROLLBAR.pack(side= 'right', fill= 'y')
+        self.CANVAS.pack(side= 'left', fill= 'both', expand= 'yes')
+
+        self.CANVAS.bind('<Configure>', lambda event: self.fnc_layout())
+        self.CANVAS.bind('<Button-1>', self.fnc_click)
+        self.CANVAS.bind('<MouseWheel>', lambda event: self.fnc_scrollBy((-1 if event.delta > 0 else 1) * self.CELL_HEIGHT // 3))
+        self.CANVAS.bind('<Button-4>', lambda event: self.fnc_scrollBy(-self.CELL_HEIGHT // 3))
+        self.CANVAS.bind('<Button-5>', lambda event: self.fnc_scrollBy(self.CELL_HEIGHT // 3))
+        self.CANVAS.bind('<Escape>', lambda event: self.callback(self.CURRENT_IMAGE_INDEX))
+        self.CANVAS.focus_set()
+        self.IS_FIRST_LAYOUT = True
+        # end of __init__
+    #!
+    # (re)creates the pool of cells to fit the canvas. This is called when the canvas is resized.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_layout(self):
+        if self.IS_STOPPED:
+            return
+
+        _width = max(1, self.CANVAS.winfo_width())
+        _height = max(1, self.CANVAS.winfo_height())
+        self.COLUMNS = max(1, _width // self.CELL_WIDTH)
+        _cells_needed = self.COLUMNS * (_height // self.CELL_HEIGHT + 2)
+
+        while len(self.CELLS) < _cells_needed:
+            self.CELLS.append({
+                'rect': self.CANVAS.create_rectangle(0, 0, 0, 0, outline= '', width= 3),
+                'image': self.CANVAS.create_image(0, 0, anchor= 'n'),
+                'text': self.CANVAS.create_text(0, 0, anchor= 'n', font= ('Times', self.FONT_SIZE),\
+                                                width= self.CELL_WIDTH - 6),
+                'index': None,
+                'name': None,
+                })
+        while len(self.CELLS) > _cells_needed:
+            _cell = self.CELLS.pop()
+            [self.CANVAS.delete(_cell[_item]) for _item in ('rect', 'image', 'text')]
+
+        if self.IS_FIRST_LAYOUT:
+            self.IS_FIRST_LAYOUT = False
+            # scrolling to the current image
+            _row = self.CURRENT_IMAGE_INDEX // self.COLUMNS
+            self.OFFSET = max(0, _row * self.CELL_HEIGHT - (_height - self.CELL_HEIGHT) // 2)
+        self.fnc_refresh()
+        # end of function
+    #!
+    # returns the height of the whole (virtual) grid.
+    # Args: none.
+    # Returns: height : int
+    def fnc_getTotalHeight(self):
+        _rows = (len(self.IMAGE_FILES_LIST) + self.COLUMNS - 1) // self.COLUMNS
+        return max(1, _rows * self.CELL_HEIGHT)
+        # end of function
+    #!
+    # callback for the scrollbar.
+    # Args:
+    #   args : typical args
+    #       These are ('moveto', fraction), or ('scroll', number, 'units' / 'pages').
+    # Returns: nothing.
+    def fnc_yview(self, *args):
+        if len(args) < 2:
+            return
+        if args[0] == 'moveto':
+            self.OFFSET = int(float(args[1]) * self.fnc_getTotalHeight())
+            self.fnc_refresh()
+        elif args[0] == 'scroll':
+            _step = self.CANVAS.winfo_height() if ((len(args) > 2) and (args[2] == 'pages')) else self.CELL_HEIGHT
+            self.fnc_scrollBy(int(args[1]) * _step)
+        # end of function
+    #!
+    # scrolls the grid.
+    # Args:
+    #   pixels : int
+    #       By how many pixels to scroll (down if positive).
+    # Returns: nothing.
+    def fnc_scrollBy(self, pixels):
+        self.OFFSET += pixels
+        self.fnc_refresh()
+        # end of function
+    #!
+    # places the cells over the visible part of the grid, fills them in, and requests the missing thumbnails.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_refresh(self):
+        if self.IS_STOPPED:
+            return
+
+        _height = max(1, self.CANVAS.winfo_height())
+        _total_height = self.fnc_getTotalHeight()
+        self.OFFSET = max(0, min(self.OFFSET, _total_height - _height))
+        self.SCROLLBAR.set(float(self.OFFSET) / _total_height, min(1., float(self.OFFSET + _height) / _total_height))
+
+        _first_index = (self.OFFSET // self.CELL_HEIGHT) * self.COLUMNS
+        _image_count = len(self.IMAGE_FILES_LIST)
+        self.FIRST_INDEX = _first_index
+        for _slot, _cell in enumerate(self.CELLS):
+            _index = _first_index + _slot
+            _row, _column = divmod(_index, self.COLUMNS)
+            _x = _column * self.CELL_WIDTH
+            _y = _row * self.CELL_HEIGHT - self.OFFSET
+            self.CANVAS.coords(_cell['rect'], _x + 2, _y + 2, _x + self.CELL_WIDTH - 2, _y + self.CELL_HEIGHT - 2)
+            self.CANVAS.coords(_cell['image'], _x + self.CELL_WIDTH // 2, _y + 6)
+            self.CANVAS.coords(_cell['text'], _x + self.CELL_WIDTH // 2, _y + self.THUMB_SIZE + 10)
+
+            _name = self.IMAGE_FILES_LIST[_index] if (_index < _image_count) else None
+            if (_index == _cell['index']) and (_name == _cell['name']):
+                continue
+            _cell['index'] = _index
+            _cell['name'] = _name
+            self.CANVAS.itemconfigure(_cell['rect'],\
+                outline= '#b35900' if (_index == self.CURRENT_IMAGE_INDEX) and (_name is not None) else '')
+            self.CANVAS.itemconfigure(_cell['text'], text= os.path.basename(_name) if (_name is not None) else '')
+            self.CANVAS.itemconfigure(_cell['image'],\
+                image= self.PHOTOS[_name] if (_name in self.PHOTOS) else '')
+
+        self.fnc_request()
+        # end of function
+    #!
+    # requests the thumbnails of the visible cells (in the order they are seen), and then of the next page.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_request(self):
+        _last_index = min(len(self.IMAGE_FILES_LIST), self.FIRST_INDEX + 2 * len(self.CELLS))
+        _names = [self.IMAGE_FILES_LIST[_index] for _index in range(self.FIRST_INDEX, _last_index)]
+        self.WANTED = set(_names)
+
+        for _name in _names:
+            if (_name in self.PHOTOS) or (_name in self.REQUESTED) or (_name in self.FAILED):
+                if _name in self.PHOTOS:
+                    self.PHOTOS.move_to_end(_name)
+                continue
+            self.REQUESTED.add(_name)
+            self.EXECUTOR.submit(self.fnc_work, _name)
+
+        if (len(self.REQUESTED) > 0) and (len(self.POLL_QUEUE) < 1):
+            self.POLL_QUEUE = [self.CANVAS.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # loads one thumbnail. This runs in a worker thread and must not touch Tk.
+    #   The thumbnails which scrolled out of sight before their turn came are skipped.
+    # Args:
+    #   name : str
+    #       The image file name.
+    # Returns: nothing.
+    def fnc_work(self, name):
+        if self.IS_STOPPED or not (name in self.WANTED):
+            self.RESULTS.put((name, None, True))
+            return
+        try:
+            _thumb = self.THUMBNAILS.fnc_get(os.path.join(self.IMAGE_FOLDER, name), self.THUMB_SIZE)
+        except:
+            _thumb = None
+        self.RESULTS.put((name, _thumb, False))
+        # end of function
+    #!
+    # puts the loaded thumbnails into the cells. This is called by the Tk loop (through after(...)) for as long as
+    #   there are thumbnails being loaded.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_poll(self):
+        self.POLL_QUEUE = []
+        if self.IS_STOPPED:
+            return
+
+        _is_changed = False
+        while True:
+            try:
+                _name, _thumb, _is_skipped = self.RESULTS.get_nowait()
+            except queue.Empty:
+                break
+            self.REQUESTED.discard(_name)
+            if _is_skipped:
+                continue
+            try:
+                self.PHOTOS[_name] = pil_image_tk.PhotoImage(_thumb)
+            except:
+                self.FAILED.add(_name)
+                continue
+            _is_changed = True
+
+        while len(self.PHOTOS) > self.MAX_PHOTOS:
+            self.PHOTOS.popitem(last=False)
+
+        if _is_changed:
+            for _cell in self.CELLS:
+                if (_cell['name'] in self.PHOTOS):
+                    self.CANVAS.itemconfigure(_cell['image'], image= self.PHOTOS[_cell['name']])
+
+        # the thumbnails skipped by the worker threads may be visible again
+        if len(self.REQUESTED) < 1:
+            self.fnc_request()
+        elif len(self.REQUESTED) > 0:
+            self.POLL_QUEUE = [self.CANVAS.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # callback for a click on the grid: the index of the clicked image is passed to self.callback.
+    # Args:
+    #   event : Tk event
+    # Returns: nothing.
+    def fnc_click(self, event):
+        _column = event.x // self.CELL_WIDTH
+        if _column >= self.COLUMNS:
+            return
+        _index = ((event.y + self.OFFSET) // self.CELL_HEIGHT) * self.COLUMNS + _column
+        if _index < len(self.IMAGE_FILES_LIST):
+            self.callback(_index)
+        # end of function
+    #!
+    # destroys the grid and stops loading thumbnails.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        self.WANTED = set()
+        for _each in self.POLL_QUEUE:
+            try:
+                self.CANVAS.after_cancel(_each)
+            except:
+                pass
+        self.POLL_QUEUE = []
+        self.EXECUTOR.shutdown(wait=False)
+        self.PHOTOS = OrderedDict()
+        try:
+            self.FRAME.destroy()
+        except:
+            pass
+        # end of function
+    # end of class ImgGridView
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from lib import shch_img_browser_meta as ShchMeta
+
+DEBUG_ENABLED = False
+
+class FolderIndex():
+    __doc__ = """
+    keeps the last known list of image files of a folder in a local SQLite database (one per folder), along with
+        the size, the mtime, the pixel dimensions, the format and the capture date of every file.
+        The list is loaded at once when the folder is opened (see fnc_load(...)), and brought up to date
+        in the background once the folder has been listed (see fnc_update(...)). Only the files which are new or
+        have changed since the last update are opened (their headers only) to get their dimensions.
+        The list is kept for a given listing signature (the extensions, the recursive mode, the patterns), thus
+        a list made with other settings is not used.
+    Args:
+        cache_dir : str
+            The folder to keep the databases in (it is created when needed).
+        image_folder : str
+            The folder with images.
+        signature : any value which can be dumped to JSON
+            The settings the folder is listed with (see fnc_GetSignature(...)).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, cache_dir, image_folder, signature):
+        self.IMAGE_FOLDER = image_folder
+        self.SIGNATURE = json.dumps(signature, sort_keys= True)
+        _key = hashlib.sha1(os.path.abspath(image_folder).encode('utf-8', 'surrogateescape')).hexdigest()
+        self.INDEX_DIR = os.path.join(cache_dir, 'index')
+        self.DB_PATH = os.path.join(self.INDEX_DIR, '{}.sqlite'.format(_key))
+        # the probed files are committed every BATCH_SIZE files, so that they are not probed again if the update
+        #   is stopped (the list itself is replaced at the end of the update only, see fnc_work(...))
+        self.BATCH_SIZE = 500
+
+        self.IS_STOPPED = False
+        self.THREAD = None
+        # end of __init__
+    #!
+    # opens the database (and creates the tables if needed). Every thread uses its own connection.
+    # Args: none.
+    # Returns: connection : sqlite3.Connection
+    #   This is None if the database cannot be opened.
+    def fnc_connect(self):
+        try:
+            os.makedirs(self.INDEX_DIR, exist_ok= True)
+            _db = sqlite3.connect(self.DB_PATH, timeout= 10)
+            _db.execute('PRAGMA journal_mode=WAL')
+            _db.execute('PRAGMA synchronous=NORMAL')
+            _db.execute('CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, seq INTEGER, size INTEGER,'\
+                ' mtime INTEGER, width INTEGER, height INTEGER, format TEXT, taken TEXT, new_seq INTEGER)')
+            # the databases made before new_seq (see fnc_work(...)) was added
+            if not ('new_seq' in [_row[1] for _row in _db.execute('PRAGMA table_info(files)')]):
+                _db.execute('ALTER TABLE files ADD COLUMN new_seq INTEGER')
+            _db.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
+            return _db
+        except:
+            if DEBUG_ENABLED:
+                print('folder index cannot be opened: ', self.DB_PATH)
+            return None
+        # end of function
+    #!
+    # returns the last known list of image files (in the order they were listed in).
+    # Args: none.
+    # Returns: image_files : list
+    #   This is empty if the folder has not been indexed yet (or has been indexed with other settings).
+    def fnc_load(self):
+        _db = self.fnc_connect()
+        if _db is None:
+            return []
+        try:
+            _row = _db.execute("SELECT value FROM settings WHERE key = 'signature'").fetchone()
+            if (_row is None) or not (_row[0] == self.SIGNATURE):
+                return []
+            return [_row[0] for _row in _db.execute('SELECT name FROM files WHERE seq >= 0 ORDER BY seq')]
+        except:
+            return []
+        finally:
+            _db.close()
+        # end of function
+    #!
+    # returns what is known about the image files.
+    # Args:
+    #   image_files : list
+    #       The file names (e.g. self.IMAGE_FILES_LIST); if None, all indexed files are returned.
+    # Returns: info : dict
+    #   The keys are file names, the values are dicts with the keys 'size', 'mtime' (in ns), 'width', 'height',
+    #   'format', 'taken' (EXIF DateTimeOriginal, as 'YYYY:MM:DD HH:MM:SS'). Unknown values are None.
+    def fnc_getInfo(self, image_files= None):
+        _db = self.fnc_connect()
+        if _db is None:
+            return dict()
+        _wanted = None if (image_files is None) else set(image_files)
+        _info = dict()
+        try:
+            for _name, _size, _mtime, _width, _height, _format, _taken in\
+                _db.execute('SELECT name, size, mtime, width, height, format, taken FROM files'):
+                if (_wanted is None) or (_name in _wanted):
+                    _info[_name] = {'size': _size, 'mtime': _mtime, 'width': _width, 'height': _height,\
+                                    'format': _format, 'taken': _taken}
+        except:
+            pass
+        finally:
+            _db.close()
+        return _info
+        # end of function
+    #!
+    # brings the index up to date with the given list of image files, in the background thread.
+    #   The files which are gone are removed from the index, those which are new or have changed are probed.
+    # Args:
+    #   image_files : list
+    #       The complete list of the image files in the folder (in the order they are to be loaded in).
+    # Returns: nothing.
+    def fnc_update(self, image_files):
+        self.THREAD = threading.Thread(target= self.fnc_work, args= (list(image_files),), daemon= True)
+        self.THREAD.start()
+        # end of function
+    #!
+    # updates the index. This runs in the background thread.
+    #   The new list is put together in the new_seq column, while the last known list (the seq column and
+    #   the signature) stays as it is; it is replaced in one transaction once the new list is complete, thus
+    #   an update which is stopped (or killed) leaves the last known list to be loaded.
+    # Args:
+    #   image_files : list
+    #       See fnc_update(...).
+    # Returns: nothing.
+    def fnc_work(self, image_files):
+        _db = self.fnc_connect()
+        if _db is None:
+            return
+        _start = time.perf_counter()
+        _probed = 0
+        try:
+            _known = {_name: (_size, _mtime) for _name, _size, _mtime in\
+                      _db.execute('SELECT name, size, mtime FROM files')}
+            # what is left of an update which has been stopped
+            _db.execute('UPDATE files SET new_seq = NULL')
+            _db.commit()
+
+            for _seq, _name in enumerate(image_files):
+                if self.IS_STOPPED:
+                    # the files probed so far are kept, the list is not replaced
+                    _db.commit()
+                    return
+                _path = os.path.join(self.IMAGE_FOLDER, _name)
+                try:
+                    _stat = os.stat(_path)
+                except OSError:
+                    continue
+                if _known.get(_name) == (_stat.st_size, _stat.st_mtime_ns):
+                    _db.execute('UPDATE files SET new_seq = ? WHERE name = ?', (_seq, _name))
+                else:
+                    _meta = ShchMeta.fnc_ProbeImage(_path) or\
+                            {'width': None, 'height': None, 'format': None, 'taken': None}
+                    _probed += 1
+                    # a changed file keeps its place (seq) in the last known list
+                    _values = (_stat.st_size, _stat.st_mtime_ns,\
+                               _meta['width'], _meta['height'], _meta['format'], _meta['taken'], _seq, _name)
+                    if _db.execute('UPDATE files SET size = ?, mtime = ?, width = ?, height = ?, format = ?,'\
+                                   ' taken = ?, new_seq = ? WHERE name = ?', _values).rowcount < 1:
+                        _db.execute('INSERT INTO files (size, mtime, width, height, format, taken, new_seq, name, seq)'\
+                                    ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, -1)', _values)
+                if (_seq + 1) % self.BATCH_SIZE == 0:
+                    _db.commit()
+
+            # the new list replaces the last known one (in one transaction). The rows of the files which are not
+            #   listed are kept (seq is -1) until they are found to be gone, so that their dimensions are not probed
+            #   again if the folder is listed with other settings
+            _db.execute('UPDATE files SET seq = COALESCE(new_seq, -1), new_seq = NULL')
+            # the files which are not listed and do not exist any more
+            _gone = [(_name,) for _name, in _db.execute('SELECT name FROM files WHERE seq < 0')\
+                     if not os.path.lexists(os.path.join(self.IMAGE_FOLDER, _name))]
+            _db.executemany('DELETE FROM files WHERE name = ?', _gone)
+            _db.execute("INSERT OR REPLACE INTO settings VALUES ('signature', ?)", (self.SIGNATURE,))
+            _db.commit()
+            if DEBUG_ENABLED:
+                print('folder index is updated: {} files, {} probed, {:.3f} s'.format(\
+                    len(image_files), _probed, time.perf_counter() - _start))
+        except:
+            if DEBUG_ENABLED:
+                print('folder index is not updated: ', self.DB_PATH)
+        finally:
+            _db.close()
+        # end of function
+    #!
+    # stops the update (e.g. when another folder is selected). The last known list is kept, and so are the files
+    #   probed so far (see fnc_work(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        # end of function
+    # end of class FolderIndex
+
+#!
+# returns the listing signature of a folder, i.e. the settings which decide which files are listed.
+# Args:
+#   legit_extensions : dict
+#       See Shch.fnc_GetImageFileList(...).
+#   kwargs : typical kwargs
+#       The kwargs of the folder scanner (see ShchScan.ImgFolderScanner).
+# Returns: signature : dict
+def fnc_GetSignature(legit_extensions, **kwargs):
+    return {'extensions': sorted([_ext, _label[1]] for _ext, _label in legit_extensions.items() if (_label[0] == 1)),
+            'recursive': 'recursive' in kwargs,
+            'max_depth': kwargs['max_depth'] if ('recursive' in kwargs) and ('max_depth' in kwargs) else 0,
+            'include': list(kwargs['include']) if 'include' in kwargs else [],
+            'exclude': list(kwargs['exclude']) if 'exclude' in kwargs else []}
+    # end of function
@@ -0,0 +1,368 @@
+import os
+import mmap
+import time
+import importlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image as pil_image
+
+DEBUG_ENABLED = False
+
+# the image plugins of Pillow, by the file extensions. Pillow loads the plugins of the common formats (BMP, GIF,
+#   JPEG, PNG, PPM) at the first open, and all of its plugins (some 50 modules) as soon as a file is not one of these;
+#   the plugin of a file is loaded ahead (see fnc_LoadPlugin(...)), thus the rest are loaded only if a file is not
+#   what its extension says.
+PLUGINS = {'bmp': 'BmpImagePlugin', 'dib': 'BmpImagePlugin', 'gif': 'GifImagePlugin',\
+           'jpg': 'JpegImagePlugin', 'jpeg': 'JpegImagePlugin', 'jpe': 'JpegImagePlugin', 'jfif': 'JpegImagePlugin',\
+           'png': 'PngImagePlugin', 'apng': 'PngImagePlugin',\
+           'ppm': 'PpmImagePlugin', 'pgm': 'PpmImagePlugin', 'pbm': 'PpmImagePlugin', 'pnm': 'PpmImagePlugin',\
+           'tif': 'TiffImagePlugin', 'tiff': 'TiffImagePlugin', 'webp': 'WebPImagePlugin',\
+           'eps': 'EpsImagePlugin', 'ps': 'EpsImagePlugin', 'ico': 'IcoImagePlugin', 'icns': 'IcnsImagePlugin',\
+           'tga': 'TgaImagePlugin', 'pcx': 'PcxImagePlugin', 'psd': 'PsdImagePlugin', 'dds': 'DdsImagePlugin',\
+           'jp2': 'Jpeg2KImagePlugin', 'j2k': 'Jpeg2KImagePlugin', 'jpx': 'Jpeg2KImagePlugin',\
+           'sgi': 'SgiImagePlugin', 'rgb': 'SgiImagePlugin', 'xbm': 'XbmImagePlugin', 'xpm': 'XpmImagePlugin',\
+           'im': 'ImImagePlugin', 'pcd': 'PcdImagePlugin', 'msp': 'MspImagePlugin'}
+LOADED_PLUGINS = set() # the plugins loaded by fnc_LoadPlugin(...), or which cannot be loaded
+#!
+# loads the image plugin of Pillow for a file, by its extension (see PLUGINS). A plugin is imported once; importing
+#   it registers its format with Pillow. The files of other extensions are left to Pillow.
+#   This can be called from worker threads (an import is done under the import lock).
+# Args:
+#   img_path : str
+#       The path to an image file.
+# Returns: nothing.
+def fnc_LoadPlugin(img_path):
+    _plugin = PLUGINS.get(os.path.splitext(img_path)[1][1:].lower())
+    if (_plugin is None) or (_plugin in LOADED_PLUGINS):
+        return
+    try:
+        importlib.import_module('PIL.' + _plugin)
+    except:
+        # e.g. a plugin which this version of Pillow does not have (Pillow looks for the format itself)
+        if DEBUG_ENABLED:
+            print('the image plugin cannot be loaded: ', _plugin)
+    LOADED_PLUGINS.add(_plugin)
+    # end of function
+
+class IoStats():
+    __doc__ = """
+    counts what the image files cost to read: the files opened, the bytes read and the time the readers were
+        blocked (e.g. waiting for the disk), and the files read ahead (see ImgReadAhead).
+        The methods of this class can be called from worker threads.
+    Args: none.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self):
+        self.LOCK = threading.Lock()
+        self.OPENED = 0
+        self.BYTES_READ = 0
+        self.BLOCKED = 0. # in seconds
+        self.ADVISED = 0 # the files read ahead ...
+        self.ADVISED_BYTES = 0 # ... and their sizes
+        # end of __init__
+    #!
+    # adds to the counters.
+    # Args:
+    #   kwargs : typical kwargs
+    #       'opened', 'bytes_read', 'blocked', 'advised', 'advised_bytes' : int or float
+    #           The values to add.
+    # Returns: nothing.
+    def fnc_add(self, **kwargs):
+        with self.LOCK:
+            self.OPENED += kwargs['opened'] if 'opened' in kwargs else 0
+            self.BYTES_READ += kwargs['bytes_read'] if 'bytes_read' in kwargs else 0
+            self.BLOCKED += kwargs['blocked'] if 'blocked' in kwargs else 0.
+            self.ADVISED += kwargs['advised'] if 'advised' in kwargs else 0
+            self.ADVISED_BYTES += kwargs['advised_bytes'] if 'advised_bytes' in kwargs else 0
+        # end of function
+    #!
+    # returns the counters.
+    # Args: none.
+    # Returns: stats : dict
+    #   The keys are 'opened', 'bytes_read', 'blocked' (in seconds), 'advised' and 'advised_bytes'.
+    def fnc_stats(self):
+        with self.LOCK:
+            return {'opened': self.OPENED, 'bytes_read': self.BYTES_READ, 'blocked': self.BLOCKED,\
+                    'advised': self.ADVISED, 'advised_bytes': self.ADVISED_BYTES}
+        # end of function
+    # end of class IoStats
+
+# the counters of all image files read through this module
+IO_STATS = IoStats()
+
+class MappedFile():
+    __doc__ = """
+    a read-only file object over a memory map of a file, which counts the bytes read and the time spent reading
+        them (see IO_STATS). The pages of the file are taken from the page cache (filled by the read-ahead, see
+        ImgReadAhead), thus reading them does not make a system call per block.
+        Empty files (which cannot be mapped) are read as they are.
+    Args:
+        file_path : str
+            The path to a file.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, file_path):
+        self.name = file_path
+        self.FILE = open(file_path, 'rb')
+        try:
+            self.MAP = mmap.mmap(self.FILE.fileno(), 0, access= mmap.ACCESS_READ)
+        except:
+            self.MAP = None
+        IO_STATS.fnc_add(opened= 1)
+        # end of __init__
+    #!
+    # reads bytes, as file.read(...) does.
+    # Args:
+    #   size : int
+    #       How many bytes to read (all the rest, if negative).
+    # Returns: data : bytes
+    def read(self, size= -1):
+        _start = time.perf_counter()
+        _data = (self.MAP if not (self.MAP is None) else self.FILE).read(size if (size is not None) else -1)
+        IO_STATS.fnc_add(bytes_read= len(_data), blocked= time.perf_counter() - _start)
+        return _data
+        # end of function
+    #!
+    # reads a line, as file.readline(...) does (some image plugins of Pillow read the headers by lines).
+    # Args:
+    #   size : int
+    #       The most bytes to read (no limit, if negative).
+    # Returns: data : bytes
+    def readline(self, size= -1):
+        _start = time.perf_counter()
+        if self.MAP is None:
+            _data = self.FILE.readline(size if (size is not None) else -1)
+        else:
+            # readline() of a map takes no limit, thus the rest of a longer line is left to be read
+            _position = self.MAP.tell()
+            _data = self.MAP.readline()
+            if not (size is None) and (size >= 0) and (len(_data) > size):
+                _data = _data[:size]
+                self.MAP.seek(_position + size)
+        IO_STATS.fnc_add(bytes_read= len(_data), blocked= time.perf_counter() - _start)
+        return _data
+        # end of function
+    #!
+    def readable(self):
+        return True
+    #!
+    def seekable(self):
+        return True
+    #!
+    # moves to a position, as file.seek(...) does.
+    # Args:
+    #   offset : int
+    #   whence : int
+    #       os.SEEK_SET, os.SEEK_CUR or os.SEEK_END.
+    # Returns: position : int
+    def seek(self, offset, whence= os.SEEK_SET):
+        if self.MAP is None:
+            return self.FILE.seek(offset, whence)
+        # a map cannot be positioned beyond its end, while a file can (reading from there gives nothing)
+        _base = {os.SEEK_SET: 0, os.SEEK_CUR: self.MAP.tell(), os.SEEK_END: len(self.MAP)}[whence]
+        self.MAP.seek(max(0, min(_base + offset, len(self.MAP))))
+        return self.MAP.tell()
+        # end of function
+    #!
+    # returns the position, as file.tell() does.
+    # Args: none.
+    # Returns: position : int
+    def tell(self):
+        return (self.MAP if not (self.MAP is None) else self.FILE).tell()
+        # end of function
+    #!
+    # closes the map and the file.
+    # Args: none.
+    # Returns: nothing.
+    def close(self):
+        try:
+            if not (self.MAP is None):
+                self.MAP.close()
+            self.FILE.close()
+        except:
+            pass
+        # end of function
+    #!
+    def __enter__(self):
+        return self
+    #!
+    def __exit__(self, *args):
+        self.close()
+    # end of class MappedFile
+
+#!
+# opens an image file through a memory map (see MappedFile). The image must be loaded (see load(...) in Pillow)
+#   before the map is closed.
+# Args:
+#   img_path : str
+#       The path to an image file.
+# Returns: result : tuple
+#   This is (image, mapped_file). If the image cannot be opened, the map is closed and the exception is raised.
+def fnc_OpenImage(img_path):
+    fnc_LoadPlugin(img_path)
+    _file = MappedFile(img_path)
+    try:
+        return (pil_image.open(_file), _file)
+    except:
+        _file.close()
+        raise
+    # end of function
+#!
+# asks the OS to read a file into the page cache in the background (posix_fadvise(WILLNEED)). Where this is not
+#   available (e.g. on Windows), the file is read through (and the data dropped), which has the same effect.
+#   The call may block (e.g. on a network mount), thus it is made from worker threads (see ImgReadAhead).
+# Args:
+#   file_path : str
+#       The path to a file.
+# Returns: size : int
+#   The size of the file (0 if it cannot be read).
+def fnc_ReadAhead(file_path):
+    try:
+        _fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return 0
+    try:
+        _size = os.fstat(_fd).st_size
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(_fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while len(os.read(_fd, 1024 * 1024)) > 0:
+                pass
+        return _size
+    except OSError:
+        return 0
+    finally:
+        os.close(_fd)
+    # end of function
+
+class ImgReadAhead():
+    __doc__ = """
+    reads the image files which are going to be shown (the next ones in the list) into the page cache in the
+        background (see fnc_ReadAhead(...)), so that rendering them does not wait for a slow disk (or a network mount).
+        It runs further ahead than the prefetcher (which decodes the images, see ShchRender.ImgPrefetcher): reading
+        a file ahead costs no memory of this program, only some of the page cache.
+    Args:
+        kwargs : typical kwargs
+            'ahead' : int
+                How many files after the current one to read ahead. The default is 8.
+            'max_bytes' : int
+                The most bytes to read ahead at a time (the files beyond this are not read ahead). The default is 256 MB.
+                The files ahead count against it, whether they are read already, being read, or to be read.
+            'done_s' : float
+                How long (in seconds) a file read ahead is taken to stay in the page cache. It is read ahead again
+                after that (e.g. when autoplay comes back to it). The default is 60.
+            'workers' : int
+                The number of worker threads. The default is 2.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, **kwargs):
+        self.AHEAD = kwargs['ahead'] if 'ahead' in kwargs else 8
+        self.MAX_BYTES = kwargs['max_bytes'] if 'max_bytes' in kwargs else 256 * 1024 * 1024
+        self.EXECUTOR = ThreadPoolExecutor(max_workers= kwargs['workers'] if 'workers' in kwargs else 2)
+        self.DONE = OrderedDict() # path -> (size, time.monotonic()), for the files recently read ahead
+        self.MAX_DONE = 4096
+        self.DONE_S = kwargs['done_s'] if 'done_s' in kwargs else 60.
+        self.PENDING = dict() # path -> (future, size)
+        self.LOCK = threading.Lock() # guards self.DONE and self.PENDING, which the worker threads change
+        self.IS_STOPPED = False
+        # end of __init__
+    #!
+    # requests the files after the current one to be read ahead. The requests for the files which are not ahead
+    #   any more are canceled (unless they are already being read).
+    # Args:
+    #   image_folder : str
+    #       The folder with images.
+    #   image_files : list
+    #       The list of image files (e.g. ShchImgBrowser.IMAGE_FILES_LIST).
+    #   current_index : int
+    #       The index of the image being shown.
+    #   kwargs : typical kwargs
+    #       'ahead' : int
+    #           How many files to read ahead (self.AHEAD by default).
+    #       'wrap' : <any value>
+    #           If this is set, the files after the last one are taken from the beginning of the list.
+    # Returns: nothing.
+    def fnc_schedule(self, image_folder, image_files, current_index, **kwargs):
+        if self.IS_STOPPED or (len(image_files) < 1):
+            return
+
+        _ahead = min(kwargs['ahead'] if 'ahead' in kwargs else self.AHEAD, len(image_files) - 1)
+        _paths = []
+        for _step in range(1, _ahead + 1):
+            _index = current_index + _step
+            if _index >= len(image_files):
+                if not ('wrap' in kwargs):
+                    break
+                _index -= len(image_files)
+            _paths.append(os.path.join(image_folder, image_files[_index]))
+
+        _now = time.monotonic()
+        with self.LOCK:
+            for _path in [_path for _path in self.PENDING if not (_path in _paths)]:
+                if self.PENDING[_path][0].cancel() or self.PENDING[_path][0].done():
+                    self.PENDING.pop(_path)
+            _new_paths = [_path for _path in _paths if not (_path in self.PENDING) and\
+                          not ((_path in self.DONE) and (_now - self.DONE[_path][1] < self.DONE_S))]
+        # the sizes of the files to be read (the lock is not held, since a stat may wait for the disk)
+        _sizes = dict()
+        for _path in _new_paths:
+            try:
+                _sizes[_path] = os.stat(_path).st_size
+            except OSError:
+                pass
+
+        with self.LOCK:
+            # the files ahead count against the budget: those read recently, those being read and those to be read
+            _bytes = 0
+            for _path in _paths:
+                if (_path in self.DONE) and (_now - self.DONE[_path][1] < self.DONE_S):
+                    _bytes += self.DONE[_path][0]
+                    self.DONE.move_to_end(_path)
+                    continue
+                if _path in self.PENDING:
+                    _bytes += self.PENDING[_path][1]
+                    continue
+                if not (_path in _sizes):
+                    continue
+                if _bytes + _sizes[_path] > self.MAX_BYTES:
+                    break
+                _bytes += _sizes[_path]
+                self.PENDING[_path] = (self.EXECUTOR.submit(self.fnc_work, _path), _sizes[_path])
+        # end of function
+    #!
+    # reads one file ahead. This runs in a worker thread.
+    # Args:
+    #   file_path : str
+    # Returns: nothing.
+    def fnc_work(self, file_path):
+        if self.IS_STOPPED:
+            return
+        _size = fnc_ReadAhead(file_path)
+        IO_STATS.fnc_add(advised= 1, advised_bytes= _size)
+        with self.LOCK:
+            self.DONE[file_path] = (_size, time.monotonic())
+            self.DONE.move_to_end(file_path)
+            while len(self.DONE) > self.MAX_DONE:
+                self.DONE.popitem(last= False)
+            self.PENDING.pop(file_path, None)
+        if DEBUG_ENABLED:
+            print('read ahead: ', file_path, _size)
+        # end of function
+    #!
+    # stops reading ahead (e.g. when the main window is being closed).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        with self.LOCK:
+            for _future, _size in self.PENDING.values():
+                _future.cancel()
+            self.PENDING = dict()
+        self.EXECUTOR.shutdown(wait=False)
+        # end of function
+    # end of class ImgReadAhead
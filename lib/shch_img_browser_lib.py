@@ -1,9 +1,14 @@
 import os
+import fnmatch
 from shutil import copyfile
 import getpass
 import json
+import time
+import threading
 import tkinter as tk
 
+from lib import shch_img_browser_perf as ShchPerf
+
 DEBUG_ENABLED = False
 #!
 # returns the path to an image file.
@@ -63,6 +68,173 @@ def fnc_HasLegitExtension(image_file, extensions):
     return False
     # end of function
 #!
+# compiles the extensions into a function which checks if a file name has one of them. This is the same check as in
+#   fnc_HasLegitExtension(...), but the extensions are looked up in sets instead of being looped over for every file.
+# Args:
+#   extensions : dict
+#       The format of extensions is (example): {'png': (1, 0), 'jpg': (1, 0), 'jpeg': (1, 0), }
+#       See fnc_HasLegitExtension(...).
+# Returns: matcher : function
+#   This is called with a file name, and returns True if the file has one of the selected extensions.
+def fnc_GetExtensionMatcher(extensions):
+    _exts_cs = set() # case sensitive extensions
+    _exts_ci = set() # case insensitive extensions (in lower case)
+    if isinstance(extensions, dict):
+        for _each_ext, _label in extensions.items():
+            if isinstance(_label, (list, tuple)) and (len(_label) == 2):
+                _selected, _cs = _label
+                if _selected == 1:
+                    if _cs == 0:
+                        _exts_ci.add(_each_ext.lower())
+                    if _cs == 1:
+                        _exts_cs.add(_each_ext)
+
+    def fnc_IsMatching(image_file):
+        # the same as os.path.splitext(...): the leading dots do not start an extension
+        _dot = image_file.rfind('.')
+        if (_dot < 0) or (len(image_file[:_dot].lstrip('.')) < 1):
+            return False
+        _ext = image_file[_dot + 1:]
+        return (_ext in _exts_cs) or (_ext.lower() in _exts_ci)
+
+    return fnc_IsMatching
+    # end of function
+#!
+# yields the names of the image files in a given folder (image_folder) one by one, as they are found.
+#   The folder is read with os.scandir(...), which tells files from folders without extra stat calls on
+#   most file systems.
+# Args:
+#   image_folder : str
+#       This must be a legit folder name.
+#   legit_extensions : dict
+#       See fnc_GetImageFileList(...).
+# Returns: generator
+#   Each yielded value is a file name (without any folder name(s)). Errors are not raised: the generator just stops.
+def fnc_IterImageFiles(image_folder, legit_extensions):
+    _is_matching = fnc_GetExtensionMatcher(legit_extensions)
+    try:
+        with os.scandir(image_folder) as _entries:
+            for _entry in _entries:
+                if not _is_matching(_entry.name):
+                    continue
+                try:
+                    if _entry.is_file():
+                        yield _entry.name
+                except OSError:
+                    pass
+    except OSError:
+        return
+    # end of function
+#!
+# checks if there are image files in a given folder. The folder is read only up to the first image file found
+#   (see fnc_IterImageFiles(...)), thus a large folder is not listed in full.
+# Args:
+#   image_folder : str
+#   legit_extensions : dict
+#       See fnc_GetImageFileList(...).
+# Returns: result : bool
+def fnc_HasImageFiles(image_folder, legit_extensions):
+    try:
+        return not (next(fnc_IterImageFiles(image_folder, legit_extensions), None) is None)
+    except:
+        return False
+    # end of function
+#!
+# checks if a file (or a folder) matches any of the glob patterns (e.g. '*.jpg', '2021/*', 'tmp_*').
+#   A pattern is matched against the name, and against the path relative to the image folder (with '/' separators).
+# Args:
+#   rel_path : str
+#       The path relative to the image folder.
+#   patterns : list
+#       The glob patterns.
+# Returns: result : bool
+def fnc_IsMatchingGlobs(rel_path, patterns):
+    _rel_path = rel_path.replace(os.sep, '/')
+    _name = os.path.basename(rel_path)
+    for _pattern in patterns:
+        if fnmatch.fnmatch(_name, _pattern) or fnmatch.fnmatch(_rel_path, _pattern):
+            return True
+    return False
+    # end of function
+#!
+# yields the paths (relative to image_folder) of the image files in a given folder and in its subfolders, as they
+#   are found. The subfolders are walked depth first, in the order of their names.
+#   The folders which are reached more than once (e.g. through symbolic links which make a loop) are walked once.
+# Args:
+#   image_folder : str
+#       This must be a legit folder name.
+#   legit_extensions : dict
+#       See fnc_GetImageFileList(...).
+#   kwargs : typical kwargs
+#       'max_depth' : int
+#           How deep to go into the subfolders (0 - only image_folder itself). The default is 8.
+#       'include' : list
+#           If not empty, only the files which match one of these glob patterns are yielded
+#           (see fnc_IsMatchingGlobs(...)).
+#       'exclude' : list
+#           The files and the folders which match one of these glob patterns are skipped.
+#       'on_folder' : function
+#           If given, this is called with the path (relative to image_folder) of every folder before it is walked.
+# Returns: generator
+#   Each yielded value is a path relative to image_folder. Errors are not raised: unreadable folders are skipped.
+def fnc_IterImageFilesRecursive(image_folder, legit_extensions, **kwargs):
+    _max_depth = kwargs['max_depth'] if 'max_depth' in kwargs else 8
+    _include = kwargs['include'] if 'include' in kwargs else []
+    _exclude = kwargs['exclude'] if 'exclude' in kwargs else []
+    _on_folder = kwargs['on_folder'] if 'on_folder' in kwargs else None
+    _is_matching = fnc_GetExtensionMatcher(legit_extensions)
+
+    try:
+        _stat = os.stat(image_folder)
+    except OSError:
+        return
+    _visited = set([(_stat.st_dev, _stat.st_ino)])
+    _stack = [('', 0)]
+
+    while len(_stack) > 0:
+        _rel_folder, _depth = _stack.pop()
+        if not (_on_folder is None):
+            _on_folder(_rel_folder)
+
+        _subfolders = []
+        try:
+            with os.scandir(os.path.join(image_folder, _rel_folder)) as _entries:
+                for _entry in _entries:
+                    _rel_path = os.path.join(_rel_folder, _entry.name) if (len(_rel_folder) > 0) else _entry.name
+                    try:
+                        if _entry.is_dir():
+                            if (_depth < _max_depth) and not fnc_IsMatchingGlobs(_rel_path, _exclude):
+                                _subfolders.append((_entry, _rel_path))
+                            continue
+                        if not _is_matching(_entry.name):
+                            continue
+                        if (len(_include) > 0) and not fnc_IsMatchingGlobs(_rel_path, _include):
+                            continue
+                        if fnc_IsMatchingGlobs(_rel_path, _exclude):
+                            continue
+                        if _entry.is_file():
+                            yield _rel_path
+                    except OSError:
+                        pass
+        except OSError:
+            continue
+
+        # the subfolders are pushed in the reverse order, so that they are popped in the order of their names
+        _subfolders.sort(key= lambda _each: _each[1], reverse= True)
+        for _entry, _rel_path in _subfolders:
+            try:
+                _stat = _entry.stat() # follows symbolic links
+            except OSError:
+                continue
+            _id = (_stat.st_dev, _stat.st_ino)
+            if _id in _visited:
+                if DEBUG_ENABLED:
+                    print('folder: {}'.format(_rel_path), ' is already walked')
+                continue
+            _visited.add(_id)
+            _stack.append((_rel_path, _depth + 1))
+    # end of function
+#!
 # gets the list of image files in a given folder (image_folder). Only names of the files will be returned whose
 #   extentions are listed in the list/tuple (legit_extensions).
 # Args:
@@ -80,9 +252,7 @@ def fnc_HasLegitExtension(image_file, extensions):
 #   If no files were found, the list is empty.
 def fnc_GetImageFileList(image_folder, legit_extensions):
     try:
-        return [_f for _f in os.listdir(image_folder) if\
-            os.path.isfile(os.path.join(image_folder, _f)) and\
-            fnc_HasLegitExtension(_f, legit_extensions)]
+        return list(fnc_IterImageFiles(image_folder, legit_extensions))
     except:
         return []
     # end of function
@@ -91,25 +261,50 @@ class ImgBrowserConfig():
     __doc__ ="""
     loads the config info, if it is available in the folder named shch_img_browser_cfg,
         in the file named 'current user name'.cfg. Otherwise it loads the default settings.
-    Args: none.
+    Args:
+        kwargs : typical kwargs
+            'start_dir_later' : <any value>
+                If this is set, and the default settings are loaded (e.g. when this program is run for the first time),
+                the image folder is not looked for (see ImgBrowserStartDir): IMAGE_FOLDER is None and
+                IS_START_DIR_PENDING is True, until the caller finds the folder (e.g. in the background, see
+                ShchScan.ImgStartDirFinder) and sets IMAGE_FOLDER.
     Returns: instance of this class.
     """
     #!
-    def __init__(self):
+    def __init__(self, **kwargs):
         global DEBUG_ENABLED
 
+        _start = time.perf_counter()
         self.HOME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.CONFIG_FOLDER = 'shch_img_browser_cfg'
+        self.CACHE_FOLDER = 'shch_img_browser_cache' # thumbnails, etc. (see CACHE_PATH below)
         self.CURRENT_USER = getpass.getuser()
         _config_folder_path = os.path.join(self.HOME_DIR, self.CONFIG_FOLDER)
         _config_file_path = os.path.join(_config_folder_path, '{}.cfg'.format(self.CURRENT_USER))
+        self.CONFIG_PATH = _config_file_path
         if DEBUG_ENABLED:
             print(_config_file_path)
 
         self.CONFIG_KEYS = {'ICO_FOLDER' : 'str', 'ICO_FILE' : 'str',\
                             'IMAGE_FOLDER' : 'str', 'IMAGE_FILE_EXTENSIONS' : 'dict',\
                             'IMAGE_SCALE_INDEX' : 'int', 'WIDGET_FONT_SIZE_INDEX' : 'int'}
+        # the keys below may be missing in the config file (e.g. if it was saved by an older version).
+        #   Each one is (type, default value).
+        self.CONFIG_KEYS_OPTIONAL = {'FRAME_CACHE_MB' : ('int', 256), 'THUMBNAIL_CACHE_MB' : ('int', 512),\
+                            'RECURSIVE' : ('int', 0), 'RECURSIVE_DEPTH' : ('int', 8),\
+                            'INCLUDE_GLOBS' : ('list', []), 'EXCLUDE_GLOBS' : ('list', []),\
+                            'WATCH_FOLDER' : ('int', 1), 'FOLDER_INDEX' : ('int', 1),\
+                            'SORT_MODE' : ('str', 'name'), 'SORT_REVERSE' : ('int', 0),\
+                            'QUALITY_IDLE_MS' : ('int', 400),\
+                            'ANIMATION_CACHE_MB' : ('int', 64), 'AUTOPLAY_ANIMATION_MS' : ('int', 10000),\
+                            'ZOOM_CACHE_MB' : ('int', 256),\
+                            'READ_AHEAD_FILES' : ('int', 16), 'READ_AHEAD_MB' : ('int', 256),\
+                            'DECODE_PROCESSES' : ('int', 0),\
+                            'PERF_LOG' : ('int', 1), 'PERF_LOG_INTERVAL_S' : ('int', 60),\
+                            'RECORD_SESSION' : ('int', 0),\
+                            'RESUME' : ('int', 1), 'RESUME_FOLDERS' : ('int', 256), 'POSITIONS' : ('dict', {})}
         _useDefaults = True
+        _config = dict()
         # try to load from the config file. If not available, use the default settings
         try:
             with open(_config_file_path, 'r') as _config_file:
@@ -135,26 +330,73 @@ class ImgBrowserConfig():
                      'gif': (1, 0), 'bmp': (1, 0), 'raw': (1, 0), 'eps': (1, 0),\
                     }
             # changed 25-11-2021 (25th-November-2021, Thanksgiving Day)
-            self.__c__['IMAGE_FOLDER'] =\
-                    ImgBrowserStartDir(self.__c__['IMAGE_FILE_EXTENSIONS'], self.HOME_DIR).fnc_getStartDir()
+            if 'start_dir_later' in kwargs:
+                self.__c__['IMAGE_FOLDER'] = None
+            else:
+                self.__c__['IMAGE_FOLDER'] =\
+                        ImgBrowserStartDir(self.__c__['IMAGE_FILE_EXTENSIONS'], self.HOME_DIR).fnc_getStartDir()
             #
             self.__c__['IMAGE_SCALE_INDEX'] = 10
             self.__c__['WIDGET_FONT_SIZE_INDEX'] = 4
 
+        for _key, (_type, _default) in self.CONFIG_KEYS_OPTIONAL.items():
+            _is_loaded = isinstance(_config, dict) and (_key in _config) and self.fnc_checkType(_type, _config[_key])
+            self.__c__[_key] = _config[_key] if _is_loaded else _default
+
         self.ICO_PATH =  fnc_GetImageFilePath(\
             self.HOME_DIR, fnc_GetImageFilePath(\
             self.__c__['ICO_FOLDER'], self.__c__['ICO_FILE']))
         self.IMAGE_FOLDER = self.__c__['IMAGE_FOLDER']
+        # True if the image folder is yet to be looked for (see 'start_dir_later' above)
+        self.IS_START_DIR_PENDING = _useDefaults and ('start_dir_later' in kwargs)
         self.IMAGE_FILE_EXTENSIONS =  {_ext: _label for _ext, _label in self.__c__['IMAGE_FILE_EXTENSIONS'].items()}
         self.IMAGE_SCALE_INDEX = self.__c__['IMAGE_SCALE_INDEX']
         self.WIDGET_FONT_SIZE_INDEX = self.__c__['WIDGET_FONT_SIZE_INDEX']
+        self.FRAME_CACHE_MB = self.__c__['FRAME_CACHE_MB'] # memory budget for the rendered images (in MB)
+        self.THUMBNAIL_CACHE_MB = self.__c__['THUMBNAIL_CACHE_MB'] # disk budget for the thumbnails (in MB)
+        self.CACHE_PATH = os.path.join(self.HOME_DIR, self.CACHE_FOLDER)
+        self.RECURSIVE = self.__c__['RECURSIVE'] # if 1, the subfolders of IMAGE_FOLDER are browsed too
+        self.RECURSIVE_DEPTH = self.__c__['RECURSIVE_DEPTH']
+        self.INCLUDE_GLOBS = list(self.__c__['INCLUDE_GLOBS']) # see fnc_IsMatchingGlobs(...)
+        self.EXCLUDE_GLOBS = list(self.__c__['EXCLUDE_GLOBS'])
+        self.WATCH_FOLDER = self.__c__['WATCH_FOLDER'] # if 1 - the image folder is watched for added/removed images
+        self.FOLDER_INDEX = self.__c__['FOLDER_INDEX'] # if 1 - the last known list of images is kept (in CACHE_PATH)
+        self.SORT_MODE = self.__c__['SORT_MODE'] # 'name', 'mtime', 'size' or 'taken' (see ShchSort.SORT_MODES)
+        self.SORT_REVERSE = self.__c__['SORT_REVERSE'] # if 1 - the images are sorted in the reverse order
+        # how long the view must be idle (in ms) before a fast rendered image is replaced with the fine one
+        self.QUALITY_IDLE_MS = self.__c__['QUALITY_IDLE_MS']
+        self.ANIMATION_CACHE_MB = self.__c__['ANIMATION_CACHE_MB'] # memory budget for the frames of an animation (in MB)
+        # how long autoplay waits (at most, in ms) for an animated image to play once before moving on
+        self.AUTOPLAY_ANIMATION_MS = self.__c__['AUTOPLAY_ANIMATION_MS']
+        self.ZOOM_CACHE_MB = self.__c__['ZOOM_CACHE_MB'] # memory budget for the tiles of the zoom view (in MB)
+        # how many of the next image files (and at most how many MB of them) are read into the page cache ahead
+        self.READ_AHEAD_FILES = self.__c__['READ_AHEAD_FILES']
+        self.READ_AHEAD_MB = self.__c__['READ_AHEAD_MB']
+        # how many worker processes decode the images (0 - the images are decoded in worker threads)
+        self.DECODE_PROCESSES = self.__c__['DECODE_PROCESSES']
+        # if 1 - the histograms of the timings are written to CACHE_PATH/perf.jsonl every PERF_LOG_INTERVAL_S seconds
+        self.PERF_LOG = self.__c__['PERF_LOG']
+        self.PERF_LOG_INTERVAL_S = self.__c__['PERF_LOG_INTERVAL_S']
+        # if 1 - what the browser is asked to do is recorded to CACHE_PATH/sessions/ (see ShchSession.SessionRecorder)
+        self.RECORD_SESSION = self.__c__['RECORD_SESSION']
+        # if 1 - the image shown last in a folder (and its scale, rotation and flips) is shown again when the folder
+        #   is opened again. The positions of the last RESUME_FOLDERS folders are kept (see fnc_setPosition(...))
+        self.RESUME = self.__c__['RESUME']
+        self.RESUME_FOLDERS = self.__c__['RESUME_FOLDERS']
+        self.POSITIONS = dict(self.__c__['POSITIONS'])
+        # the config is written in the background (see fnc_save(...)); the newest one waiting to be written is kept
+        self.SAVE_LOCK = threading.Lock()
+        self.SAVE_PENDING = None
+        self.SAVE_THREAD = None
+        self.WRITE_LOCK = threading.Lock() # one write at a time (see fnc_write(...))
+        ShchPerf.PERF.fnc_add('config_load', _start)
         # end of __init__
 
     #!
     # checks varaible type
     # Args:
     #   type_of_var: str
-    #       Describes the type. It can be be presently str, int and dict.
+    #       Describes the type. It can be be presently str, int, dict and list (of str).
     # Returns: success_code : bool
     #   This is True is the check has passed. False otherwise.
     def fnc_checkType(self, type_of_var, var_to_check):
@@ -167,11 +409,16 @@ class ImgBrowserConfig():
         if type_of_var == 'dict':
             return isinstance(var_to_check, dict)
 
+        if type_of_var == 'list':
+            return isinstance(var_to_check, list) and all(type('') == type(_each) for _each in var_to_check)
+
         return False
 
     #!
     # saves the existing configuration in the file named 'current user name'.cfg, which is located in
     #   the folder named shch_img_browser_cfg.
+    #   The file is written in the background (see fnc_saveWork(...)), and it is replaced at once (see fnc_write(...)),
+    #   thus a crash cannot leave it truncated. Use fnc_flush(...) (or 'wait') to make sure it has been written.
     # Args:
     #   kwargs: (typical kwargs)
     #       'folder' : <any value>
@@ -182,44 +429,193 @@ class ImgBrowserConfig():
     #           name and new legit files' extensions.
     #       'image_scale' : <any value>
     #           If this is in kwargs, the current image scale will be saved.
+    #       'widget_font_size' : <any value>
+    #           If this is in kwargs, the current button scale will be saved.
+    #       'recursive' : <any value>
+    #           If this is in kwargs, the recursive mode (on/off, depth, include/exclude patterns) will be saved.
+    #       'sort' : <any value>
+    #           If this is in kwargs, the sort mode (and the reverse order on/off) will be saved.
+    #       'positions' : <any value>
+    #           If this is in kwargs, the positions in the image folders (see fnc_setPosition(...)) will be saved.
+    #       'wait' : <any value>
+    #           If this is in kwargs, this function returns once the file has been written.
     # Returns: nothing.
     def fnc_save(self, **kwargs):
-        _config_folder_path = os.path.join(self.HOME_DIR, self.CONFIG_FOLDER)
-        if not os.path.isdir(_config_folder_path):
-            try:
-                os.mkdir(_config_folder_path)
-            except:
-                return
-
-        _config_file_path = os.path.join(_config_folder_path, '{}.cfg'.format(self.CURRENT_USER))
+        if 'folder' in kwargs:
+            self.__c__['IMAGE_FOLDER'] = self.IMAGE_FOLDER
+            if DEBUG_ENABLED:
+                print(self.__c__['IMAGE_FOLDER'])
+        if 'extensions' in kwargs:
+            self.__c__['IMAGE_FILE_EXTENSIONS'] = self.IMAGE_FILE_EXTENSIONS
+            if DEBUG_ENABLED:
+                print(self.__c__['IMAGE_FILE_EXTENSIONS'])
+        if 'image_scale' in kwargs:
+            self.__c__['IMAGE_SCALE_INDEX'] = self.IMAGE_SCALE_INDEX
+            if DEBUG_ENABLED:
+                print(self.__c__['IMAGE_SCALE_INDEX'])
+        if 'widget_font_size' in kwargs:
+            self.__c__['WIDGET_FONT_SIZE_INDEX'] = self.WIDGET_FONT_SIZE_INDEX
+            if DEBUG_ENABLED:
+                print(self.__c__['WIDGET_FONT_SIZE_INDEX'])
+        if 'recursive' in kwargs:
+            self.__c__['RECURSIVE'] = self.RECURSIVE
+            self.__c__['RECURSIVE_DEPTH'] = self.RECURSIVE_DEPTH
+            self.__c__['INCLUDE_GLOBS'] = self.INCLUDE_GLOBS
+            self.__c__['EXCLUDE_GLOBS'] = self.EXCLUDE_GLOBS
+            if DEBUG_ENABLED:
+                print(self.__c__['RECURSIVE'], self.__c__['INCLUDE_GLOBS'], self.__c__['EXCLUDE_GLOBS'])
+        if 'sort' in kwargs:
+            self.__c__['SORT_MODE'] = self.SORT_MODE
+            self.__c__['SORT_REVERSE'] = self.SORT_REVERSE
+            if DEBUG_ENABLED:
+                print(self.__c__['SORT_MODE'], self.__c__['SORT_REVERSE'])
+        if 'positions' in kwargs:
+            self.__c__['POSITIONS'] = self.POSITIONS
 
+        # the config is serialized here (not in the background), since it is changed by the caller's thread
         try:
-            with open(_config_file_path, 'w') as _config_file:
-
-                if 'folder' in kwargs:
-                    self.__c__['IMAGE_FOLDER'] = self.IMAGE_FOLDER
-                    if DEBUG_ENABLED:
-                        print(self.__c__['IMAGE_FOLDER'])
-                if 'extensions' in kwargs:
-                    self.__c__['IMAGE_FILE_EXTENSIONS'] = self.IMAGE_FILE_EXTENSIONS
-                    if DEBUG_ENABLED:
-                        print(self.__c__['IMAGE_FILE_EXTENSIONS'])
-                if 'image_scale' in kwargs:
-                    self.__c__['IMAGE_SCALE_INDEX'] = self.IMAGE_SCALE_INDEX
-                    if DEBUG_ENABLED:
-                        print(self.__c__['IMAGE_SCALE_INDEX'])
-                if 'widget_font_size' in kwargs:
-                    self.__c__['WIDGET_FONT_SIZE_INDEX'] = self.WIDGET_FONT_SIZE_INDEX
-                    if DEBUG_ENABLED:
-                        print(self.__c__['WIDGET_FONT_SIZE_INDEX'])
-
-                _config_to_save = json.dumps(self.__c__)
-                _config_file.write(_config_to_save)
-
+            _config_to_save = json.dumps(self.__c__)
         except:
             if DEBUG_ENABLED:
                 print('no config is saved')
+            return
 
+        with self.SAVE_LOCK:
+            self.SAVE_PENDING = _config_to_save
+            if self.SAVE_THREAD is None:
+                self.SAVE_THREAD = threading.Thread(target= self.fnc_saveWork)
+                self.SAVE_THREAD.start()
+        if 'wait' in kwargs:
+            self.fnc_flush()
+        # end of function
+    #!
+    # writes the configs passed by fnc_save(...), until there are none left. Only the newest one is written, if
+    #   several have been passed while a file was being written. This runs in the saving thread.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_saveWork(self):
+        while True:
+            with self.SAVE_LOCK:
+                _config_to_save, self.SAVE_PENDING = self.SAVE_PENDING, None
+                if _config_to_save is None:
+                    self.SAVE_THREAD = None
+                    return
+            self.fnc_write(_config_to_save)
+        # end of function
+    #!
+    # waits until the configs passed by fnc_save(...) have been written (e.g. before this program stops).
+    # Args:
+    #   kwargs : typical kwargs
+    #       'timeout' : float
+    #           How long to wait for the saving thread (in seconds). The default is 5.
+    # Returns: nothing.
+    def fnc_flush(self, **kwargs):
+        with self.SAVE_LOCK:
+            _thread = self.SAVE_THREAD
+        if not (_thread is None):
+            _thread.join(kwargs['timeout'] if 'timeout' in kwargs else 5.)
+        # whatever the saving thread has not taken (yet) is written here
+        with self.SAVE_LOCK:
+            _config_to_save, self.SAVE_PENDING = self.SAVE_PENDING, None
+        if not (_config_to_save is None):
+            self.fnc_write(_config_to_save)
+        # end of function
+    #!
+    # writes a serialized config to a temporary file next to the config file, and then replaces the config file with
+    #   it, thus the config file is either the old one or the new one, but never a partly written one.
+    # Args:
+    #   config_to_save : str
+    #       The config (JSON).
+    # Returns: nothing.
+    def fnc_write(self, config_to_save):
+        _start = time.perf_counter()
+        _config_folder_path = os.path.dirname(self.CONFIG_PATH)
+        _temp_path = self.CONFIG_PATH + '.tmp'
+        with self.WRITE_LOCK:
+            try:
+                if not os.path.isdir(_config_folder_path):
+                    os.mkdir(_config_folder_path)
+                with open(_temp_path, 'w') as _config_file:
+                    _config_file.write(config_to_save)
+                    _config_file.flush()
+                    os.fsync(_config_file.fileno())
+                # on Windows the config file may be held open for a moment (e.g. by a virus scanner)
+                for _attempt in range(3):
+                    try:
+                        os.replace(_temp_path, self.CONFIG_PATH)
+                        break
+                    except PermissionError:
+                        if _attempt == 2:
+                            raise
+                        time.sleep(.05)
+            except:
+                if DEBUG_ENABLED:
+                    print('no config is saved')
+        ShchPerf.PERF.fnc_add('config_save', _start)
+        # end of function
+    #!
+    # sets the image folder found on the first run (see 'start_dir_later' above); it is the image folder
+    #   saved with the config from now on, as if it had been found when the config was loaded.
+    # Args:
+    #   image_folder : str
+    #       The found folder (None if none has been found).
+    # Returns: nothing.
+    def fnc_setStartDir(self, image_folder):
+        self.IS_START_DIR_PENDING = False
+        self.IMAGE_FOLDER = image_folder
+        if type(image_folder) == type(''):
+            self.__c__['IMAGE_FOLDER'] = image_folder
+        # end of function
+    #!
+    # returns the key of an image folder in self.POSITIONS.
+    # Args:
+    #   image_folder : str
+    # Returns: key : str
+    def fnc_getPositionKey(self, image_folder):
+        return os.path.normcase(os.path.abspath(image_folder))
+        # end of function
+    #!
+    # returns where the browser was in a given image folder (see fnc_setPosition(...)).
+    # Args:
+    #   image_folder : str
+    # Returns: position : dict
+    #   {'file': <str>, 'scale': <int>, 'rotation': <int>, 'flip_lr': <int>, 'flip_tb': <int>}, or None if
+    #   the folder is not known (or its position is not valid).
+    def fnc_getPosition(self, image_folder):
+        if not (type(image_folder) == type('')):
+            return None
+        _position = self.POSITIONS.get(self.fnc_getPositionKey(image_folder))
+        if not isinstance(_position, dict) or not self.fnc_checkType('str', _position.get('file')):
+            return None
+        if not all(self.fnc_checkType('int', _position.get(_key)) for _key in ('scale', 'rotation', 'flip_lr', 'flip_tb')):
+            return None
+        return _position
+        # end of function
+    #!
+    # remembers where the browser is in a given image folder: the shown image (by its name, since the index of
+    #   the image changes as images are added to the folder) and how it is shown. The folders used recently are
+    #   kept: the one used the longest time ago is forgotten, when there are more than self.RESUME_FOLDERS folders.
+    #   The positions are saved with fnc_save(positions=1).
+    # Args:
+    #   image_folder : str
+    #   image_file : str
+    #       The name of the shown image file (the path relative to image_folder, in the recursive mode).
+    #   kwargs : typical kwargs
+    #       'scale', 'rotation', 'flip_lr', 'flip_tb' : int
+    #           The image scale index, the rotation index and the flips. The defaults are 0.
+    # Returns: nothing.
+    def fnc_setPosition(self, image_folder, image_file, **kwargs):
+        _key = self.fnc_getPositionKey(image_folder)
+        # the folders are kept in the order they have been used in (the dicts keep the order of insertion)
+        self.POSITIONS.pop(_key, None)
+        self.POSITIONS[_key] = {'file': image_file,\
+            'scale': kwargs['scale'] if 'scale' in kwargs else 0,\
+            'rotation': kwargs['rotation'] if 'rotation' in kwargs else 0,\
+            'flip_lr': kwargs['flip_lr'] if 'flip_lr' in kwargs else 0,\
+            'flip_tb': kwargs['flip_tb'] if 'flip_tb' in kwargs else 0}
+        while len(self.POSITIONS) > max(1, self.RESUME_FOLDERS):
+            self.POSITIONS.pop(next(iter(self.POSITIONS)))
+        # end of function
     #!
     # removes the given item from self.IMAGE_FILE_EXTENSIONS
     # Args:
@@ -539,6 +935,9 @@ class ImgBrowserStartDir():
         a default folder for when the program is run for the first time.
         If those conditions are not met, Pictures/Saved Pictures/ will be created in the local user folder,
         and a few images will be transfered there from a repo that is supplied with the dist for this program.
+        The folders are read only up to the first image (see fnc_HasImageFiles(...)), not listed in full.
+        This may still take a while (e.g. on a slow disk, or when the images are copied), thus the browser does it
+        in the background (see ShchScan.ImgStartDirFinder).
     Args: legit_extensions :  dict
         The format of legit_extensions is (example): {'png': (1, 0), 'jpg': (1, 0), 'jpeg': (1, 0), 'tiff': (1, 0), }
         Each extension name must be without preciding ".". In other word, .png should be supplied as 'png' not
@@ -559,8 +958,7 @@ class ImgBrowserStartDir():
         # return # uncomment to see how self.IMG_HOME_DIR = None works
 
         if os.path.isdir(_img_folder):
-            _img_files = fnc_GetImageFileList(_img_folder, legit_extensions)
-            if len(_img_files) > 0:
+            if fnc_HasImageFiles(_img_folder, legit_extensions):
                 self.IMG_HOME_DIR = _img_folder
                 if DEBUG_ENABLED:
                     print('startup image folder: ', self.IMG_HOME_DIR)
@@ -572,8 +970,7 @@ class ImgBrowserStartDir():
 
         _img_folder = os.path.dirname(_img_folder) # go level up to ~/Pictures/
         if os.path.isdir(_img_folder):
-            _img_files = fnc_GetImageFileList(_img_folder, legit_extensions)
-            if len(_img_files) > 0:
+            if fnc_HasImageFiles(_img_folder, legit_extensions):
                 self.IMG_HOME_DIR = _img_folder
                 if DEBUG_ENABLED:
                     print('startup image folder: ', self.IMG_HOME_DIR)
@@ -0,0 +1,174 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image as pil_image
+
+from lib import shch_img_browser_io as ShchIO
+
+DEBUG_ENABLED = False
+#!
+# reads what is known about an image from its file header: the pixels are not decoded (see open(...) in Pillow,
+#   which reads the header only; the pixels are decoded by load(...)).
+# Args:
+#   img_path : str
+#       The path to an image file.
+# Returns: meta : dict
+#   The keys are 'width', 'height', 'format' (e.g. 'JPEG'), 'icc' (True if there is an ICC profile),
+#   'orientation' (EXIF orientation, 1..8, 1 if not given), 'taken' (EXIF DateTimeOriginal as
+#   'YYYY:MM:DD HH:MM:SS', or None), 'animated' (True if there is more than one frame, e.g. an animated GIF).
+#   The result is None if the file is not a readable image.
+def fnc_ProbeImage(img_path):
+    try:
+        ShchIO.fnc_LoadPlugin(img_path)
+        with pil_image.open(img_path) as _img:
+            _meta = {'width': _img.size[0], 'height': _img.size[1], 'format': _img.format,\
+                     'icc': bool(_img.info.get('icc_profile')), 'orientation': 1, 'taken': None,\
+                     'animated': False}
+            try:
+                # this looks for the second frame only (the frames are not counted)
+                _meta['animated'] = bool(getattr(_img, 'is_animated', False))
+            except:
+                pass
+            try:
+                _exif = fnc_ReadExif(_img)
+            except:
+                _exif = None
+            if _exif:
+                _orientation = _exif.get(0x0112) # Orientation
+                if isinstance(_orientation, int) and (1 <= _orientation <= 8):
+                    _meta['orientation'] = _orientation
+                try:
+                    _taken = _exif.get_ifd(0x8769).get(0x9003) # Exif IFD, DateTimeOriginal
+                except:
+                    _taken = None
+                if isinstance(_taken, str) and (len(_taken.strip('\0 ')) > 0):
+                    _meta['taken'] = _taken.strip('\0 ')
+            return _meta
+    except:
+        return None
+    # end of function
+#!
+# reads the EXIF data of an opened image from what its header has given (see fnc_ProbeImage(...)).
+#   Note that Image.getexif(...) is not used: for a PNG without an eXIf chunk before the pixels, it decodes
+#   the whole image to look for one after them.
+# Args:
+#   img : PIL.Image.Image
+#       An image just opened (not loaded).
+# Returns: exif : PIL.Image.Exif
+#   This is None if the header has no EXIF data.
+def fnc_ReadExif(img):
+    _exif_info = img.info.get('exif')
+    if (_exif_info is None) and ('Raw profile type exif' in img.info):
+        # ImageMagick writes the EXIF data of a PNG into a text chunk, as hex
+        _exif_info = bytes.fromhex(''.join(img.info['Raw profile type exif'].split('\n')[3:]))
+    _exif = pil_image.Exif()
+    if not (_exif_info is None):
+        _exif.load(_exif_info)
+        return _exif
+    if hasattr(img, 'tag_v2'):
+        # TIFF: the EXIF data is the first IFD of the file, which has been read as the header
+        _exif.endian = img.tag_v2._endian
+        _exif.load_from_fp(img.fp, img.tag_v2._offset)
+        return _exif
+    return None
+    # end of function
+#!
+# makes the info text shown under an image.
+# Args:
+#   meta : dict
+#       See fnc_ProbeImage(...).
+#   rotation : int or None
+#       The rotation the image is shown with (see ShchRender.fnc_RenderImage(...)).
+# Returns: info : str
+def fnc_FormatInfo(meta, rotation):
+    _width, _height = meta['width'], meta['height']
+    if rotation in (pil_image.ROTATE_90, pil_image.ROTATE_270):
+        _width, _height = _height, _width
+    _info = 'width: {}, height: {}'.format(_width, _height)
+    if not (meta['format'] is None):
+        _info += ', {}'.format(meta['format'])
+    if not (meta['taken'] is None):
+        _info += ', taken: {}'.format(meta['taken'])
+    if meta.get('animated'):
+        _info += ', animated'
+    return _info
+    # end of function
+
+class MetadataCache():
+    __doc__ = """
+    keeps the header metadata of image files (see fnc_ProbeImage(...)) in memory, so that a file is probed once.
+        The key is the path and the mtime (and the size) of the file, thus a file is probed anew if it has changed.
+        The methods of this class can be called from worker threads.
+    Args:
+        kwargs : typical kwargs
+            'max_entries' : int
+                How many files to keep (the least recently used ones are dropped). The default is 200000.
+            'workers' : int
+                How many threads probe the files in fnc_getMany(...). The default is 8 (the probing waits
+                for the disk mostly).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, **kwargs):
+        self.MAX_ENTRIES = kwargs['max_entries'] if 'max_entries' in kwargs else 200000
+        self.WORKERS = kwargs['workers'] if 'workers' in kwargs else 8
+        self.LOCK = threading.Lock()
+        self.ENTRIES = OrderedDict() # path -> (stamp, meta)
+        # end of __init__
+    #!
+    # returns the metadata of an image file, probing the file if it is not known (or has changed).
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    # Returns: meta : dict
+    #   See fnc_ProbeImage(...). This is None if the file is not a readable image.
+    def fnc_get(self, img_path):
+        try:
+            _stat = os.stat(img_path)
+        except OSError:
+            return None
+        _stamp = (_stat.st_mtime_ns, _stat.st_size)
+
+        with self.LOCK:
+            _entry = self.ENTRIES.get(img_path)
+            if (_entry is not None) and (_entry[0] == _stamp):
+                self.ENTRIES.move_to_end(img_path)
+                return _entry[1]
+
+        _meta = fnc_ProbeImage(img_path)
+        self.fnc_put(img_path, _stamp, _meta)
+        return _meta
+        # end of function
+    #!
+    # adds the metadata of an image file (e.g. probed by someone else).
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   stamp : tuple
+    #       (mtime in ns, size in bytes) of the file (see ShchRender.fnc_GetFileStamp(...)).
+    #   meta : dict
+    #       See fnc_ProbeImage(...).
+    # Returns: nothing.
+    def fnc_put(self, img_path, stamp, meta):
+        with self.LOCK:
+            self.ENTRIES[img_path] = (stamp, meta)
+            self.ENTRIES.move_to_end(img_path)
+            while len(self.ENTRIES) > self.MAX_ENTRIES:
+                self.ENTRIES.popitem(last=False)
+        # end of function
+    #!
+    # returns the metadata of many image files, probing them in parallel.
+    # Args:
+    #   img_paths : list
+    #       The paths to image files.
+    # Returns: metas : dict
+    #   The keys are the paths, the values are the results of fnc_get(...).
+    def fnc_getMany(self, img_paths):
+        if len(img_paths) < 1:
+            return dict()
+        with ThreadPoolExecutor(max_workers= min(self.WORKERS, len(img_paths))) as _executor:
+            return dict(zip(img_paths, _executor.map(self.fnc_get, img_paths)))
+        # end of function
+    # end of class MetadataCache
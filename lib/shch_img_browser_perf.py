@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+
+DEBUG_ENABLED = False
+
+# the stages of showing an image (and the other timed work), in the order they are listed (see fnc_recent(...))
+STAGES = ('open', 'decode', 'resize', 'transpose', 'photo', 'widget', 'show', 'scan', 'config_load', 'config_save',
+          'start_dir', 'startup')
+# the upper bounds of the histogram buckets (in ms); the last bucket takes everything above the last bound
+HISTOGRAM_BOUNDS = (.1, .25, .5, 1., 2.5, 5., 10., 25., 50., 100., 250., 500., 1000., 2500., 5000.)
+
+class PerfRecorder():
+    __doc__ = """
+    records how long the stages of showing an image (open, decode, resize, transpose, PhotoImage creation, widget
+        update) and the other slow work (the folder scan, the config I/O) take. It is cheap enough to be always on:
+        a timing is a lock, a bisect and two appends.
+        Every stage keeps its recent timings (for the overlay, see ShchImgBrowser.fnc_perfOverlay(...)) and
+        a histogram, which is written to the log (a JSON-lines file) and reset every interval (see fnc_flush(...)).
+        The methods of this class can be called from worker threads (the timings taken in worker processes, see
+        ShchPool, stay there).
+    Args:
+        kwargs : typical kwargs
+            'recent' : int
+                How many of the recent timings are kept per stage. The default is 64.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, **kwargs):
+        self.LOCK = threading.Lock()
+        self.RECENT_COUNT = kwargs['recent'] if 'recent' in kwargs else 64
+        self.RECENT = dict() # stage -> deque of the recent timings (in seconds)
+        self.HISTOGRAMS = dict() # stage -> [count per bucket], since the last flush
+        self.TOTALS = dict() # stage -> [count, total time, max time] (in seconds), since the last flush
+        self.INTERVAL_START = time.time()
+        self.LOG_PATH = None
+        self.MAX_LOG_BYTES = 8 * 1024 * 1024 # the log is rotated (to <log>.1) when it grows larger than this
+        # end of __init__
+    #!
+    # sets the log the histograms are written to (see fnc_flush(...)).
+    # Args:
+    #   log_path : str
+    #       The path to the log file, or None to write no log.
+    # Returns: nothing.
+    def fnc_setLog(self, log_path):
+        self.LOG_PATH = log_path
+        # end of function
+    #!
+    # records a timing of a stage, which started at a given time.
+    # Args:
+    #   stage : str
+    #       One of STAGES (any other name is recorded as well).
+    #   start : float
+    #       When the stage started (time.perf_counter()).
+    # Returns: now : float
+    #   When the stage ended (time.perf_counter()), which is the start of the next one.
+    def fnc_add(self, stage, start):
+        _now = time.perf_counter()
+        self.fnc_record(stage, _now - start)
+        return _now
+        # end of function
+    #!
+    # records a timing of a stage.
+    # Args:
+    #   stage : str
+    #   seconds : float
+    #       How long the stage took.
+    # Returns: nothing.
+    def fnc_record(self, stage, seconds):
+        _bucket = bisect.bisect_left(HISTOGRAM_BOUNDS, 1000. * seconds)
+        with self.LOCK:
+            if not (stage in self.RECENT):
+                self.RECENT[stage] = deque(maxlen= self.RECENT_COUNT)
+            self.RECENT[stage].append(seconds)
+            if not (stage in self.HISTOGRAMS):
+                self.HISTOGRAMS[stage] = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+                self.TOTALS[stage] = [0, 0., 0.]
+            self.HISTOGRAMS[stage][_bucket] += 1
+            _totals = self.TOTALS[stage]
+            _totals[0] += 1
+            _totals[1] += seconds
+            _totals[2] = max(_totals[2], seconds)
+        # end of function
+    #!
+    # returns the recent timings of the stages (e.g. to be shown in the overlay).
+    # Args: none.
+    # Returns: recent : list
+    #   (stage, last, median, max, count) of every stage with timings, in ms; the stages of STAGES go first.
+    def fnc_recent(self):
+        with self.LOCK:
+            _recent = {_stage: list(_timings) for _stage, _timings in self.RECENT.items()}
+        _stages = [_stage for _stage in STAGES if _stage in _recent] +\
+                  sorted(_stage for _stage in _recent if not (_stage in STAGES))
+        _result = []
+        for _stage in _stages:
+            _sorted = sorted(_recent[_stage])
+            _result.append((_stage, 1000. * _recent[_stage][-1], 1000. * _sorted[len(_sorted) // 2],\
+                            1000. * _sorted[-1], len(_sorted)))
+        return _result
+        # end of function
+    #!
+    # writes the histograms of the interval which has just ended to the log (as one JSON line), and starts
+    #   the next interval. Nothing is written if there is no log, or no timings.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_flush(self):
+        with self.LOCK:
+            _histograms, _totals = self.HISTOGRAMS, self.TOTALS
+            self.HISTOGRAMS, self.TOTALS = dict(), dict()
+            _start, self.INTERVAL_START = self.INTERVAL_START, time.time()
+        if (self.LOG_PATH is None) or (len(_totals) < 1):
+            return
+
+        _line = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.INTERVAL_START)),
+            'interval_s': round(self.INTERVAL_START - _start, 1),
+            'bounds_ms': HISTOGRAM_BOUNDS,
+            'stages': {_stage: {'count': _count, 'mean_ms': round(1000. * _total / _count, 3),\
+                                'max_ms': round(1000. * _max, 3), 'histogram': _histograms[_stage]}\
+                       for _stage, (_count, _total, _max) in _totals.items()},
+            }
+        try:
+            os.makedirs(os.path.dirname(self.LOG_PATH), exist_ok= True)
+            if os.path.isfile(self.LOG_PATH) and (os.path.getsize(self.LOG_PATH) > self.MAX_LOG_BYTES):
+                os.replace(self.LOG_PATH, self.LOG_PATH + '.1')
+            with open(self.LOG_PATH, 'a') as _log_file:
+                _log_file.write(json.dumps(_line) + '\n')
+        except:
+            if DEBUG_ENABLED:
+                print('the performance log cannot be written: ', self.LOG_PATH)
+        # end of function
+    # end of class PerfRecorder
+
+# the timings of this program (see PerfRecorder)
+PERF = PerfRecorder()
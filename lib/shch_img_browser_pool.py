@@ -0,0 +1,216 @@
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image as pil_image
+
+from lib import shch_img_browser_render as ShchRender
+from lib import shch_img_browser_io as ShchIO
+
+DEBUG_ENABLED = False
+
+# the most bytes a pixel takes in the images passed through the shared memory (see fnc_PutShared(...))
+MAX_PIXEL_BYTES = 4
+#!
+# writes the pixels of an image into a shared memory block created by the parent process (see ImgDecodePool).
+#   The images whose pixels alone do not make the whole image (palette and bilevel ones) are converted first.
+#   This runs in a worker process.
+# Args:
+#   shm_name : str
+#       The name of the shared memory block.
+#   shm_size : int
+#       Its size in bytes.
+#   image : PIL image
+# Returns: result : tuple
+#   This is (mode, size, nbytes), as needed to make the image again (see fnc_TakeShared(...)).
+def fnc_PutShared(shm_name, shm_size, image):
+    if image.mode in ('P', 'PA'):
+        image = image.convert('RGBA' if ((image.mode == 'PA') or ('transparency' in image.info)) else 'RGB')
+    elif image.mode == '1':
+        image = image.convert('L')
+    _data = image.tobytes()
+    if len(_data) > shm_size:
+        raise ValueError('the image does not fit into the shared memory')
+
+    _shm = shared_memory.SharedMemory(name= shm_name)
+    try:
+        _shm.buf[:len(_data)] = _data
+    finally:
+        _shm.close()
+    return (image.mode, image.size, len(_data))
+    # end of function
+#!
+# makes an image from the pixels written into a shared memory block (see fnc_PutShared(...)).
+# Args:
+#   shm : SharedMemory
+#   result : tuple
+#       (mode, size, nbytes) returned by fnc_PutShared(...).
+# Returns: image : PIL image
+def fnc_TakeShared(shm, result):
+    _mode, _size, _nbytes = result
+    with shm.buf[:_nbytes] as _view, _view.toreadonly() as _data:
+        # the pixels are copied once, straight from the shared memory into the image
+        return pil_image.frombytes(_mode, _size, _data)
+    # end of function
+#!
+# loads the working copy of an image (see ShchRender.fnc_LoadMaster(...)). This runs in a worker process.
+# Args:
+#   shm_name, shm_size : see fnc_PutShared(...).
+#   img_path, max_scale, screen_size : see ShchRender.fnc_LoadMaster(...).
+# Returns: result : tuple
+#   This is (shared, stamp, original_size), where shared is returned by fnc_PutShared(...).
+#   The result is None if the image cannot be loaded.
+def fnc_ChildLoadMaster(shm_name, shm_size, img_path, max_scale, screen_size):
+    _master = ShchRender.fnc_LoadMaster(img_path, max_scale, screen_size)
+    if _master is None:
+        return None
+    return (fnc_PutShared(shm_name, shm_size, _master.IMAGE), _master.STAMP, _master.ORIGINAL_SIZE)
+    # end of function
+#!
+# renders an image (see ShchRender.fnc_RenderImage(...)). This runs in a worker process.
+# Args:
+#   shm_name, shm_size : see fnc_PutShared(...).
+#   img_path, params : see ShchRender.fnc_RenderImage(...).
+# Returns: result : tuple
+#   This is (shared, info), where shared is returned by fnc_PutShared(...) and info is the info text of the frame.
+#   The result is None if the image cannot be loaded.
+def fnc_ChildRender(shm_name, shm_size, img_path, params):
+    _frame = ShchRender.fnc_RenderImage(img_path, *params)
+    if _frame is None:
+        return None
+    return (fnc_PutShared(shm_name, shm_size, _frame.IMAGE), _frame.INFO)
+    # end of function
+
+class ImgDecodePool():
+    __doc__ = """
+    decodes and renders images in a pool of worker processes, so that decoding uses as many cores as there are
+        processes (the worker threads of the prefetcher are partly serialized by the GIL).
+        The pixels come back through shared memory, not pickled: the calling thread reads the image header, creates
+        a shared memory block large enough for the result, and the worker process writes the pixels into it.
+        The block is created (and removed) by this process, thus it lives until the pixels have been taken
+        (on Windows a block is gone as soon as no process has it open).
+        The methods of this class wait for the worker process, thus they are called from worker threads
+        (see ShchRender.ImgPrefetcher), or where the result is needed at once. If the pool does not work, the images
+        are decoded in the calling thread.
+    Args:
+        processes : int
+            The number of worker processes.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, processes):
+        self.PROCESSES = processes
+        # the worker processes are started (on demand) afresh, not forked from the process running Tk
+        self.EXECUTOR = ProcessPoolExecutor(max_workers= processes, mp_context= multiprocessing.get_context('spawn'))
+        self.IS_BROKEN = False
+        self.IS_STOPPED = False
+        # end of __init__
+    #!
+    # reads the size of an image from its header.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    # Returns: size : tuple
+    #   (width, height), or None if the image cannot be opened.
+    def fnc_getSize(self, img_path):
+        try:
+            ShchIO.fnc_LoadPlugin(img_path)
+            with ShchIO.MappedFile(img_path) as _file:
+                return pil_image.open(_file).size
+        except:
+            return None
+        # end of function
+    #!
+    # runs a function in a worker process, with a shared memory block for the pixels of its result.
+    # Args:
+    #   fnc : function
+    #       fnc_ChildLoadMaster or fnc_ChildRender.
+    #   nbytes : int
+    #       The size of the shared memory block.
+    #   args : tuple
+    #       The arguments of fnc (after the name and the size of the block).
+    #   fnc_make : function
+    #       This makes the result (in this process) as fnc_make(image, result), from the image taken from the
+    #       shared memory and the result of fnc.
+    # Returns: result : tuple
+    #   This is (is_done, value): is_done is False if the pool does not work (then the caller decodes the image
+    #   itself); value is what fnc_make(...) returns, or None if the image cannot be loaded.
+    def fnc_run(self, fnc, nbytes, args, fnc_make):
+        if self.IS_BROKEN or self.IS_STOPPED:
+            return (False, None)
+        try:
+            _shm = shared_memory.SharedMemory(create= True, size= max(1, nbytes))
+        except:
+            return (False, None)
+
+        try:
+            try:
+                _result = self.EXECUTOR.submit(fnc, _shm.name, nbytes, *args).result()
+            except (ValueError, MemoryError):
+                # the result is larger than expected: the image is decoded by the caller
+                return (False, None)
+            if _result is None:
+                return (True, None)
+            return (True, fnc_make(fnc_TakeShared(_shm, _result[0]), _result))
+        except:
+            # e.g. a worker process has died, or the pool is shut down
+            if not self.IS_STOPPED:
+                self.IS_BROKEN = True
+                if DEBUG_ENABLED:
+                    print('the decode pool does not work, images are decoded in threads')
+            return (False, None)
+        finally:
+            _shm.close()
+            _shm.unlink()
+        # end of function
+    #!
+    # loads the working copy of an image in a worker process (see ShchRender.fnc_LoadMaster(...)).
+    # Args:
+    #   img_path, max_scale, screen_size : see ShchRender.fnc_LoadMaster(...).
+    # Returns: master : ShchRender.ImgMaster
+    #   This is None if the image cannot be loaded.
+    def fnc_loadMaster(self, img_path, max_scale, screen_size):
+        # the shared memory block is sized before the worker process opens the file, thus the header is read here
+        #   too (the worker process opens the file once, see ShchRender.fnc_LoadMaster(...))
+        _size = self.fnc_getSize(img_path)
+        if _size is None:
+            return None
+        # the working copy is at most twice the target size (see ShchRender.fnc_OpenReduced(...))
+        _target_size = ShchRender.fnc_GetMasterSize(_size, max_scale, screen_size)
+        _width, _height = min(_size[0], 2 * _target_size[0] + 8), min(_size[1], 2 * _target_size[1] + 8)
+        _is_done, _master = self.fnc_run(fnc_ChildLoadMaster, _width * _height * MAX_PIXEL_BYTES,\
+            (img_path, max_scale, screen_size),\
+            lambda image, result: ShchRender.ImgMaster(img_path, result[1], image, result[2]))
+        if not _is_done:
+            return ShchRender.fnc_LoadMaster(img_path, max_scale, screen_size)
+        return _master
+        # end of function
+    #!
+    # renders an image in a worker process (see ShchRender.fnc_RenderImage(...)).
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : see ShchRender.fnc_RenderImage(...).
+    # Returns: frame : ShchRender.RenderedFrame
+    #   This is None if the image cannot be loaded.
+    def fnc_renderImage(self, img_path, *params):
+        _size = self.fnc_getSize(img_path)
+        if _size is None:
+            return None
+        # the rendered image fits into the box of the shown sizes, upright and rotated
+        _width, _height = ShchRender.fnc_GetMasterSize(_size, params[0], params[4])
+        _is_done, _frame = self.fnc_run(fnc_ChildRender, _width * _height * MAX_PIXEL_BYTES, (img_path, params),\
+            lambda image, result: ShchRender.RenderedFrame(image, result[1]))
+        if not _is_done:
+            return ShchRender.fnc_RenderImage(img_path, *params)
+        return _frame
+        # end of function
+    #!
+    # stops the worker processes (e.g. when the main window is being closed).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        self.EXECUTOR.shutdown(wait= False, cancel_futures= True)
+        # end of function
+    # end of class ImgDecodePool
@@ -0,0 +1,827 @@
+import os
+import time
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import ImageTk as pil_image_tk
+from PIL import Image as pil_image
+
+from lib import shch_img_browser_io as ShchIO
+from lib import shch_img_browser_perf as ShchPerf
+
+DEBUG_ENABLED = False
+
+# the resampling filters of the render qualities: 'fast' is used while images are stepped through quickly,
+#   'fine' when the view has settled (see ShchImgBrowser.fnc_getQuality(...))
+RESAMPLE_FILTERS = {'fast': pil_image.BILINEAR, 'fine': pil_image.LANCZOS}
+#!
+# returns the stamp of a file, i.e. its modification time and size. The stamp changes when the file is changed.
+# Args:
+#   file_path : str
+#       The path to a file.
+# Returns: stamp : tuple
+#   This is (mtime in ns, size in bytes), or None if the file cannot be accessed.
+def fnc_GetFileStamp(file_path):
+    try:
+        _stat = os.stat(file_path)
+    except:
+        return None
+    return (_stat.st_mtime_ns, _stat.st_size)
+    # end of function
+#!
+# computes the size an image will have on the screen.
+#   The image is fitted into the screen (keeping its aspect ratio) and then multiplied by scale.
+# Args:
+#   image_size : tuple
+#       (width, height) of the image to show.
+#   screen_size : tuple
+#       (width, height) of the screen.
+#   scale : float
+#       One of the predefined image scales (1 = full screen).
+# Returns: display_size : tuple
+#   This is (width, height) of the image as it is to be shown.
+def fnc_GetDisplaySize(image_size, screen_size, scale):
+    _img_width, _img_height = image_size
+    _screen_width, _screen_height = screen_size
+    _width_ratio = float(_screen_width) /  float(_img_width)
+    _height_ratio = float (_screen_height) / float(_img_height)
+
+    _img_scale = scale * (_width_ratio if (_width_ratio < _height_ratio) else _height_ratio)
+    return (max(1, int(_img_scale * _img_width)), max(1, int(_img_scale * _img_height)))
+    # end of function
+#!
+# opens an image file and decodes it at a reduced resolution, which is still at least the target size.
+#   The reduction is a power of two: for JPEG files the decoder itself is asked for it (see draft(...) in Pillow),
+#   for other files the decoded image is reduced (see reduce(...) in Pillow), which is much faster than resampling.
+# Args:
+#   img_path : str
+#       The path to an image file.
+#   target_size : tuple or function
+#       (width, height) the image is going to be resized to, or a function which returns it, when it is called
+#       with the size of the image in the file (so that the file is opened once, see fnc_LoadMaster(...)).
+# Returns: result : tuple
+#   This is (image, original_size), where image is the decoded PIL image and original_size is
+#   (width, height) of the image in the file. The result is None if the image cannot be loaded.
+def fnc_OpenReduced(img_path, target_size):
+    _file = None
+    try:
+        # the file is read through a memory map, which is closed once the image is decoded (see ShchIO)
+        _start = time.perf_counter()
+        _img, _file = ShchIO.fnc_OpenImage(img_path)
+        _start = ShchPerf.PERF.fnc_add('open', _start)
+        _original_size = _img.size
+        _target_width, _target_height = target_size(_original_size) if callable(target_size) else target_size
+
+        if _img.format == 'JPEG':
+            _img.draft(_img.mode, (_target_width, _target_height))
+        _img.load()
+
+        _factor = 1
+        while ((_img.size[0] // (2 * _factor)) >= _target_width) and ((_img.size[1] // (2 * _factor)) >= _target_height):
+            _factor *= 2
+    except:
+        return None
+    finally:
+        if not (_file is None):
+            _file.close()
+
+    if _factor > 1:
+        # reduce(...) does not work with every mode (e.g. palette images), such images are converted first
+        if _img.mode == 'P':
+            _img = _img.convert('RGBA' if ('transparency' in _img.info) else 'RGB')
+        elif _img.mode == '1':
+            _img = _img.convert('L')
+        elif _img.mode.startswith('I;'):
+            _img = _img.convert('I')
+        try:
+            _img = _img.reduce(_factor)
+        except:
+            pass
+    ShchPerf.PERF.fnc_add('decode', _start)
+
+    return (_img, _original_size)
+    # end of function
+#!
+# returns the single transpose operation which has the same effect as flipping an image (left-right, then top-bottom)
+#   and then rotating it. Any combination of flips and rotations by 90 degrees is one of the 8 transpose operations
+#   of Pillow, thus the image is transposed once instead of up to three times.
+# Args:
+#   flip_left_right : int
+#       If not 0, the image is flipped left-right.
+#   flip_top_bottom : int
+#       If not 0, the image is flipped top-bottom.
+#   rotation : int or None
+#       One of pil_image.ROTATE_90, pil_image.ROTATE_180, pil_image.ROTATE_270, or None (no rotation).
+# Returns: orientation : int or None
+#   One of the transpose operations of Pillow, or None if the image is not to be changed.
+def fnc_GetOrientation(flip_left_right, flip_top_bottom, rotation):
+    _key = (not (flip_left_right == 0), not (flip_top_bottom == 0), rotation)
+    if not (_key in __ORIENTATIONS__):
+        # the operations are applied to a small matrix, which is then compared to the results of the single ones
+        _probe = ((1, 2, 3), (4, 5, 6))
+        _matrix = _probe
+        if _key[0]:
+            _matrix = __TRANSPOSES__[pil_image.FLIP_LEFT_RIGHT](_matrix)
+        if _key[1]:
+            _matrix = __TRANSPOSES__[pil_image.FLIP_TOP_BOTTOM](_matrix)
+        if not (rotation is None):
+            _matrix = __TRANSPOSES__[rotation](_matrix)
+        __ORIENTATIONS__[_key] = None
+        for _orientation, _fnc in __TRANSPOSES__.items():
+            if _fnc(_probe) == _matrix:
+                __ORIENTATIONS__[_key] = _orientation
+                break
+    return __ORIENTATIONS__[_key]
+    # end of function
+
+# what the transpose operations of Pillow do to a matrix (a tuple of rows), see fnc_GetOrientation(...)
+__TRANSPOSES__ = {
+    None: lambda m: tuple(m),
+    pil_image.FLIP_LEFT_RIGHT: lambda m: tuple(tuple(reversed(_row)) for _row in m),
+    pil_image.FLIP_TOP_BOTTOM: lambda m: tuple(reversed(m)),
+    pil_image.ROTATE_90: lambda m: tuple(reversed(tuple(zip(*m)))), # counter clockwise
+    pil_image.ROTATE_180: lambda m: tuple(tuple(reversed(_row)) for _row in reversed(m)),
+    pil_image.ROTATE_270: lambda m: tuple(zip(*reversed(m))), # clockwise
+    pil_image.TRANSPOSE: lambda m: tuple(zip(*m)),
+    pil_image.TRANSVERSE: lambda m: tuple(tuple(reversed(_row)) for _row in reversed(tuple(zip(*m)))),
+    }
+__ORIENTATIONS__ = dict() # (flip left-right, flip top-bottom, rotation) -> transpose operation
+#!
+# returns the size an image is decoded at to be shown at the largest scale, upright or rotated by 90 degrees
+#   (see fnc_LoadMaster(...)). The decoded image may be up to twice as large (see fnc_OpenReduced(...)).
+# Args:
+#   image_size : tuple
+#       (width, height) of the image in the file.
+#   max_scale : float
+#       The largest of the predefined image scales.
+#   screen_size : tuple
+#       (width, height) of the screen.
+# Returns: target_size : tuple
+#   (width, height) in the coordinates of the file.
+def fnc_GetMasterSize(image_size, max_scale, screen_size):
+    _img_width, _img_height = image_size
+    _upright_size = fnc_GetDisplaySize((_img_width, _img_height), screen_size, max_scale)
+    _rotated_size = fnc_GetDisplaySize((_img_height, _img_width), screen_size, max_scale)
+    return (max(_upright_size[0], _rotated_size[1]), max(_upright_size[1], _rotated_size[0]))
+    # end of function
+#!
+# loads an image from a file at the resolution needed to show it at the largest scale (in any orientation), so that
+#   it can then be rendered at any scale, flip and rotation without reading the file again (see ImgMaster).
+#   This function does not touch Tk, thus it can be run in a worker thread.
+# Args:
+#   img_path : str
+#       The path to an image file.
+#   max_scale : float
+#       The largest of the predefined image scales.
+#   screen_size : tuple
+#       (width, height) of the screen.
+# Returns: master : ImgMaster
+#   This is None if the image cannot be loaded.
+def fnc_LoadMaster(img_path, max_scale, screen_size):
+    _stamp = fnc_GetFileStamp(img_path)
+    # the size the image is decoded at is known once its header has been read
+    _result = fnc_OpenReduced(img_path, lambda _size: fnc_GetMasterSize(_size, max_scale, screen_size))
+    if _result is None:
+        return None
+    return ImgMaster(img_path, _stamp, _result[0], _result[1])
+    # end of function
+#!
+# loads an image from a file, flips it, rotates it and resizes it, so that it is ready to be shown.
+#   The image is decoded at a reduced resolution (see fnc_LoadMaster(...)), resized, and then flipped and rotated
+#   with a single transpose (see ImgMaster.fnc_render(...)).
+#   This function does not touch Tk, thus it can be run in a worker thread.
+# Args:
+#   img_path : str
+#       The path to an image file.
+#   scale : float
+#       One of the predefined image scales (1 = full screen).
+#   flip_left_right : int
+#       If not 0, the image is flipped left-right.
+#   flip_top_bottom : int
+#       If not 0, the image is flipped top-bottom.
+#   rotation : int or None
+#       One of pil_image.ROTATE_90, pil_image.ROTATE_180, pil_image.ROTATE_270, or None (no rotation).
+#   screen_size : tuple
+#       (width, height) of the screen.
+#   quality : str
+#       One of RESAMPLE_FILTERS (the default is 'fine').
+# Returns: frame : RenderedFrame
+#   This is None if the image cannot be loaded.
+def fnc_RenderImage(img_path, scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality= 'fine'):
+    _master = fnc_LoadMaster(img_path, scale, screen_size)
+    if _master is None:
+        return None
+    return _master.fnc_render(scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality)
+    # end of function
+
+class ImgMaster():
+    __doc__ = """
+    holds the decoded image of the shown file (the working copy), at the resolution needed for the largest
+        image scale, so that changing the scale, the flips or the rotation does not read the file again.
+    Args:
+        img_path : str
+            The path to the image file.
+        stamp : tuple
+            The stamp of the file when it was read (see fnc_GetFileStamp(...)).
+        image : PIL image
+            The decoded image (upright, i.e. as it is in the file).
+        original_size : tuple
+            (width, height) of the image in the file.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, img_path, stamp, image, original_size):
+        self.IMG_PATH = img_path
+        self.STAMP = stamp
+        self.IMAGE = image
+        self.ORIGINAL_SIZE = original_size
+        # end of __init__
+    #!
+    # checks if this is the working copy of a given file, as the file is now.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   stamp : tuple
+    #       The current stamp of the file (see fnc_GetFileStamp(...)).
+    # Returns: result : bool
+    def fnc_isOf(self, img_path, stamp):
+        return (img_path == self.IMG_PATH) and (stamp == self.STAMP) and not (stamp is None)
+        # end of function
+    #!
+    # renders the image: it is resized first, and then flipped and rotated with a single transpose
+    #   (see fnc_GetOrientation(...)), thus only the small image is transposed.
+    # Args:
+    #   scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality : see fnc_RenderImage(...).
+    # Returns: frame : RenderedFrame
+    #   This is None if the image cannot be resized.
+    def fnc_render(self, scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality= 'fine'):
+        _img_width, _img_height = self.ORIGINAL_SIZE
+        # rotating by 90 or 270 degrees swaps the width and the height
+        _is_swapped = rotation in (pil_image.ROTATE_90, pil_image.ROTATE_270)
+        if _is_swapped:
+            _img_width, _img_height = _img_height, _img_width
+        _img_info = 'width: {}, height: {}'.format(_img_width, _img_height)
+
+        _display_size = fnc_GetDisplaySize((_img_width, _img_height), screen_size, scale)
+        _start = time.perf_counter()
+        try:
+            _img = self.IMAGE.resize(tuple(reversed(_display_size)) if _is_swapped else _display_size,\
+                                     RESAMPLE_FILTERS.get(quality, pil_image.LANCZOS))
+        except:
+            return None
+        _start = ShchPerf.PERF.fnc_add('resize', _start)
+
+        _orientation = fnc_GetOrientation(flip_left_right, flip_top_bottom, rotation)
+        if not (_orientation is None):
+            try:
+                _img = _img.transpose(_orientation)
+            except:
+                pass
+            ShchPerf.PERF.fnc_add('transpose', _start)
+
+        return RenderedFrame(_img, _img_info)
+        # end of function
+    # end of class ImgMaster
+
+class RenderedFrame():
+    __doc__ = """
+    holds an image which is flipped, rotated and resized, i.e. ready to be shown, along with the info text
+        to be shown under it.
+    Args:
+        image : PIL image
+            The image to be shown.
+        info : str
+            The info text about the image (e.g. its width and height).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, image, info):
+        self.IMAGE = image
+        self.INFO = info
+        self.PHOTO = None
+        # end of __init__
+    #!
+    # returns the PhotoImage to be placed into a Tk label. It is created only once.
+    #   This function must be called from the Tk thread.
+    # Args: none.
+    # Returns: photo : PhotoImage
+    def fnc_getPhoto(self):
+        if self.PHOTO is None:
+            _start = time.perf_counter()
+            self.PHOTO = pil_image_tk.PhotoImage(self.IMAGE)
+            ShchPerf.PERF.fnc_add('photo', _start)
+        return self.PHOTO
+        # end of function
+    #!
+    # returns the (estimated) memory taken by this image, i.e. by its PIL image and its PhotoImage.
+    # Args: none.
+    # Returns: nbytes : int
+    def fnc_getSizeInBytes(self):
+        _width, _height = self.IMAGE.size
+        # a PhotoImage keeps 4 bytes per pixel
+        return _width * _height * (len(self.IMAGE.getbands()) + 4)
+        # end of function
+    # end of class RenderedFrame
+
+class FrameCache():
+    __doc__ = """
+    keeps the most recently shown (or prefetched) rendered images, so that going back and forth over the recent images
+        does not load them again. The least recently used images are dropped when the cache takes more memory
+        than allowed.
+        The key of an image is the path and the stamp (mtime and size) of its file along with the render parameters
+        (scale, flips, rotation, screen size and quality).
+    Args:
+        max_bytes : int
+            The memory budget of the cache (in bytes).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, max_bytes):
+        self.MAX_BYTES = max_bytes
+        self.BYTES = 0
+        self.FRAMES = OrderedDict() # (img_path, params) -> (stamp, frame, nbytes)
+        # counters to tune the budget with (see fnc_stats(...))
+        self.HITS = 0
+        self.MISSES = 0
+        self.EVICTIONS = 0
+        # end of __init__
+    #!
+    # returns the rendered image, if it is in the cache and its file has not changed since.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    # Returns: frame : RenderedFrame
+    #   This is None if the image is not in the cache.
+    def fnc_get(self, img_path, params):
+        _key = (img_path, tuple(params))
+        if _key in self.FRAMES:
+            _stamp, _frame, _nbytes = self.FRAMES[_key]
+            if _stamp == fnc_GetFileStamp(img_path):
+                self.FRAMES.move_to_end(_key)
+                self.HITS += 1
+                return _frame
+            self.fnc_drop(_key)
+
+        self.MISSES += 1
+        return None
+        # end of function
+    #!
+    # checks if the rendered image is in the cache (without checking if its file has changed since).
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    # Returns: result : bool
+    def fnc_has(self, img_path, params):
+        return (img_path, tuple(params)) in self.FRAMES
+        # end of function
+    #!
+    # puts a rendered image into the cache. The least recently used images are dropped to stay within the budget.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    #   stamp : tuple
+    #       The stamp of the file when it was loaded (see fnc_GetFileStamp(...)).
+    #   frame : RenderedFrame
+    #       The rendered image.
+    # Returns: nothing.
+    def fnc_put(self, img_path, params, stamp, frame):
+        if (stamp is None) or (frame is None):
+            return
+
+        _key = (img_path, tuple(params))
+        self.fnc_drop(_key)
+
+        _nbytes = frame.fnc_getSizeInBytes()
+        if _nbytes > self.MAX_BYTES:
+            return
+
+        self.FRAMES[_key] = (stamp, frame, _nbytes)
+        self.BYTES += _nbytes
+        while self.BYTES > self.MAX_BYTES:
+            _key, _entry = self.FRAMES.popitem(last=False)
+            self.BYTES -= _entry[2]
+            self.EVICTIONS += 1
+            if DEBUG_ENABLED:
+                print('evicted: ', _key[0])
+        # end of function
+    #!
+    # removes an image from the cache (it is not counted as an eviction).
+    # Args:
+    #   key : tuple
+    #       This is (img_path, params).
+    # Returns: nothing.
+    def fnc_drop(self, key):
+        if key in self.FRAMES:
+            self.BYTES -= self.FRAMES.pop(key)[2]
+        # end of function
+    #!
+    # removes all images from the cache.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_clear(self):
+        self.FRAMES = OrderedDict()
+        self.BYTES = 0
+        # end of function
+    #!
+    # returns the cache counters.
+    # Args: none.
+    # Returns: stats : dict
+    #   The keys are 'hits', 'misses', 'evictions', 'frames', 'bytes' and 'max_bytes'.
+    def fnc_stats(self):
+        return {'hits': self.HITS, 'misses': self.MISSES, 'evictions': self.EVICTIONS,\
+                'frames': len(self.FRAMES), 'bytes': self.BYTES, 'max_bytes': self.MAX_BYTES}
+        # end of function
+    # end of class FrameCache
+
+class ImgPrefetcher():
+    __doc__ = """
+    prepares (in a pool of worker threads) the images next to the one being shown, so that moving back and forth
+        shows an already rendered image. The rendered images are passed back to the Tk loop through a queue which
+        is polled with after(...), and are put into the frame cache.
+    Args:
+        tk_root : Tk
+            The main window (used to poll the queue with the rendered images).
+        frame_cache : FrameCache
+            The cache the rendered images are put into.
+        kwargs : typical kwargs
+            'workers' : int
+                The number of worker threads (default is 2).
+            'ahead' : int
+                How many images after the current one to prepare (default is 3).
+            'behind' : int
+                How many images before the current one to prepare (default is 1).
+            'callback' : function
+                If given, this is called (in the Tk loop) as callback(img_path, params) when an image has been
+                rendered and put into the frame cache.
+            'pool' : ShchPool.ImgDecodePool
+                If given, the images are rendered in its worker processes (the worker threads wait for them).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, tk_root, frame_cache, **kwargs):
+        self.tk_root = tk_root
+        self.FRAME_CACHE = frame_cache
+        self.callback = kwargs['callback'] if 'callback' in kwargs else None
+        self.POOL = kwargs['pool'] if 'pool' in kwargs else None
+        self.AHEAD = kwargs['ahead'] if 'ahead' in kwargs else 3
+        self.BEHIND = kwargs['behind'] if 'behind' in kwargs else 1
+        self.POLL_INTERVAL = 25 # in ms.
+
+        self.EXECUTOR = ThreadPoolExecutor(max_workers= kwargs['workers'] if 'workers' in kwargs else 2)
+        self.RESULTS = queue.Queue()
+        self.PENDING = dict() # (img_path, params) -> future of the image being rendered
+        self.POLL_QUEUE = []
+        self.IS_STOPPED = False
+        # end of __init__
+    #!
+    # returns the rendered image for the given file and parameters, if it is being prefetched.
+    #   Since the image is being rendered in a worker thread, this waits for it (it is sooner than starting over).
+    #   The image is put into the frame cache as well.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    # Returns: frame : RenderedFrame
+    #   This is None if the image is not being prefetched (or has not been).
+    def fnc_take(self, img_path, params):
+        _key = (img_path, tuple(params))
+        self.fnc_poll(once=1)
+
+        if _key in self.PENDING:
+            _future = self.PENDING.pop(_key)
+            if _future.cancel():
+                return None
+            try:
+                _stamp, _frame = _future.result()
+            except:
+                return None
+            self.FRAME_CACHE.fnc_put(img_path, params, _stamp, _frame)
+            return _frame
+        # the image may have just been moved to the frame cache by the poll above
+        return self.FRAME_CACHE.fnc_get(img_path, params)
+        # end of function
+    #!
+    # requests the images around the current one to be rendered. The requests for the images which are not around
+    #   any more are canceled (unless they are already being rendered).
+    # Args:
+    #   image_folder : str
+    #       The folder with images.
+    #   image_files : list
+    #       The list of image files (e.g. ShchImgBrowser.IMAGE_FILES_LIST).
+    #   current_index : int
+    #       The index of the image being shown.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    #   kwargs : typical kwargs
+    #       'wrap' : <any value>
+    #           If this is set, the images after the last one are taken from the beginning of the list
+    #           (this is the way images are autoplayed).
+    # Returns: nothing.
+    def fnc_schedule(self, image_folder, image_files, current_index, params, **kwargs):
+        if self.IS_STOPPED or len(image_files) < 1:
+            return
+
+        _last_index = len(image_files) - 1
+        _indices = []
+        # the nearest images go first
+        for _step in range(1, max(self.AHEAD, self.BEHIND) + 1):
+            if _step <= self.AHEAD:
+                _index = current_index + _step
+                if (_index > _last_index) and ('wrap' in kwargs):
+                    _index -= _last_index + 1
+                if (_index <= _last_index) and not (_index == current_index):
+                    _indices.append(_index)
+            if _step <= self.BEHIND:
+                _index = current_index - _step
+                if _index >= 0:
+                    _indices.append(_index)
+
+        _params = tuple(params)
+        _paths = [os.path.join(image_folder, image_files[_index]) for _index in _indices]
+        _wanted = set((_path, _params) for _path in _paths)
+
+        for _key in [_key for _key in self.PENDING if not (_key in _wanted)]:
+            if self.PENDING[_key].cancel():
+                self.PENDING.pop(_key)
+
+        for _path in _paths:
+            _key = (_path, _params)
+            if (_key in self.PENDING) or self.FRAME_CACHE.fnc_has(_path, _params):
+                continue
+            self.PENDING[_key] = self.EXECUTOR.submit(self.fnc_work, _path, _params)
+
+        if (len(self.PENDING) > 0) and (len(self.POLL_QUEUE) < 1):
+            self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # requests one image to be rendered (e.g. the shown one, in a better quality). The request is canceled by
+    #   the next fnc_schedule(...), unless it is already being rendered.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    #   kwargs : typical kwargs
+    #       'exclusive' : <any value>
+    #           If this is set, all other requests are canceled (unless they are already being rendered), so that
+    #           this image is rendered as soon as a worker thread is free.
+    # Returns: nothing.
+    def fnc_request(self, img_path, params, **kwargs):
+        _key = (img_path, tuple(params))
+        if self.IS_STOPPED:
+            return
+        if 'exclusive' in kwargs:
+            for _other_key in [_each for _each in self.PENDING if not (_each == _key)]:
+                if self.PENDING[_other_key].cancel():
+                    self.PENDING.pop(_other_key)
+        if _key in self.PENDING:
+            return
+        self.PENDING[_key] = self.EXECUTOR.submit(self.fnc_work, img_path, tuple(params))
+        if len(self.POLL_QUEUE) < 1:
+            self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # renders one image. This runs in a worker thread and must not touch Tk.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    # Returns: result : tuple
+    #   This is (stamp, frame), see fnc_GetFileStamp(...) and fnc_RenderImage(...).
+    def fnc_work(self, img_path, params):
+        _stamp = fnc_GetFileStamp(img_path)
+        if self.POOL is None:
+            _frame = fnc_RenderImage(img_path, *params)
+        else:
+            _frame = self.POOL.fnc_renderImage(img_path, *params)
+        self.RESULTS.put((img_path, params, _stamp, _frame))
+        return (_stamp, _frame)
+        # end of function
+    #!
+    # moves the rendered images from the queue (filled by worker threads) to the frame cache.
+    #   This is called by the Tk loop (through after(...)) for as long as there are images being rendered.
+    # Args:
+    #   kwargs : typical kwargs
+    #       'once' : <any value>
+    #           If this is set, the queue is emptied but polling is not rescheduled.
+    # Returns: nothing.
+    def fnc_poll(self, **kwargs):
+        if not ('once' in kwargs):
+            self.POLL_QUEUE = []
+        if self.IS_STOPPED:
+            return
+
+        while True:
+            try:
+                _img_path, _params, _stamp, _frame = self.RESULTS.get_nowait()
+            except queue.Empty:
+                break
+            _key = (_img_path, _params)
+            if _key in self.PENDING:
+                self.PENDING.pop(_key)
+                self.FRAME_CACHE.fnc_put(_img_path, _params, _stamp, _frame)
+                if not (self.callback is None):
+                    self.callback(_img_path, _params)
+            if DEBUG_ENABLED:
+                print('prefetched: ', _img_path, _frame is not None)
+
+        if ('once' in kwargs) or (len(self.PENDING) < 1):
+            return
+        self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # stops prefetching (e.g. when the main window is being closed).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        for _each in self.POLL_QUEUE:
+            try:
+                self.tk_root.after_cancel(_each)
+            except:
+                pass
+        self.POLL_QUEUE = []
+        for _future in self.PENDING.values():
+            _future.cancel()
+        self.PENDING = dict()
+        self.EXECUTOR.shutdown(wait=False)
+        # end of function
+    # end of class ImgPrefetcher
+
+class ImgFrameSource():
+    __doc__ = """
+    gets the rendered image of a file, from wherever it is the soonest: the frame cache (the fine image is taken
+        instead of the fast one, if there is one), the working copy of the image shown before (when only the scale,
+        the flips or the rotation have changed), the prefetcher, or the file itself. The images stepped through
+        quickly (the 'fast' quality) are decoded at the shown size only; otherwise the working copy is loaded
+        (in the background, if the image has been found elsewhere).
+        This does not touch Tk, thus the same steps are taken by the browser and by the replay of a recorded
+        session (see ShchSession.SessionPlayer).
+    Args:
+        frame_cache : FrameCache
+        prefetcher : ImgPrefetcher
+        max_scale : float
+            The largest image scale (the working copy is loaded for it, see fnc_LoadMaster(...)).
+        kwargs : typical kwargs
+            'pool' : ShchPool.ImgDecodePool
+                If given, the images are decoded in its worker processes.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, frame_cache, prefetcher, max_scale, **kwargs):
+        self.FRAME_CACHE = frame_cache
+        self.PREFETCHER = prefetcher
+        self.MAX_SCALE = max_scale
+        self.POOL = kwargs['pool'] if 'pool' in kwargs else None
+        # the decoded working copy of the last image loaded in full (see ImgMaster)
+        self.MASTER = None
+        # the working copy of the shown image is loaded in the background if its frame has come from elsewhere
+        #   (the frame cache, the prefetcher), so that scaling, flipping or rotating it does not read the file
+        self.EXECUTOR = ThreadPoolExecutor(max_workers=1)
+        self.MASTER_PENDING = None # (img_path, future of the working copy being loaded)
+        self.IS_STOPPED = False
+        # end of __init__
+    #!
+    # returns the rendered image of a file.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    # Returns: result : tuple
+    #   This is (frame, params): the frame is None if the image cannot be loaded; params are those of the frame
+    #   (the quality is 'fine' if the fine image has been found instead of the fast one).
+    def fnc_getFrame(self, img_path, params):
+        _frame = None
+        if params[5] == 'fast':
+            _frame = self.FRAME_CACHE.fnc_get(img_path, params[:5] + ('fine',))
+            if not (_frame is None):
+                params = params[:5] + ('fine',)
+        if _frame is None:
+            _frame = self.FRAME_CACHE.fnc_get(img_path, params)
+        if not (_frame is None):
+            self.fnc_keepMaster(img_path, params)
+            return (_frame, params)
+
+        _img_stamp = fnc_GetFileStamp(img_path)
+        if self.fnc_getMaster(img_path, _img_stamp, wait=1):
+            # the same image with another scale, flip or rotation: the working copy is used
+            _frame = self.MASTER.fnc_render(*params)
+            self.FRAME_CACHE.fnc_put(img_path, params, _img_stamp, _frame)
+        if _frame is None:
+            _frame = self.PREFETCHER.fnc_take(img_path, params)
+        if (_frame is None) and (params[5] == 'fast'):
+            if self.POOL is None:
+                _frame = fnc_RenderImage(img_path, *params)
+            else:
+                _frame = self.POOL.fnc_renderImage(img_path, *params)
+            self.FRAME_CACHE.fnc_put(img_path, params, _img_stamp, _frame)
+        if _frame is None:
+            self.MASTER = self.fnc_loadMaster(img_path, params[4])
+            _frame = self.MASTER.fnc_render(*params) if not (self.MASTER is None) else None
+            self.FRAME_CACHE.fnc_put(img_path, params, _img_stamp, _frame)
+        else:
+            self.fnc_keepMaster(img_path, params)
+        return (_frame, params)
+        # end of function
+    #!
+    # loads the working copy of a file (in the worker processes, if there are any).
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   screen_size : tuple
+    #       (width, height) as in fnc_LoadMaster(...)
+    # Returns: master : ImgMaster
+    #   This is None if the image cannot be loaded.
+    def fnc_loadMaster(self, img_path, screen_size):
+        if self.POOL is None:
+            return fnc_LoadMaster(img_path, self.MAX_SCALE, screen_size)
+        return self.POOL.fnc_loadMaster(img_path, self.MAX_SCALE, screen_size)
+        # end of function
+    #!
+    # makes the working copy of a file the current one, if it is at hand: either it is already, or it has been
+    #   loaded in the background (see fnc_keepMaster(...)).
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   img_stamp : tuple
+    #       See fnc_GetFileStamp(...).
+    #   kwargs : typical kwargs
+    #       'wait' : <any value>
+    #           If this is set, the working copy being loaded in the background is waited for
+    #           (it is sooner than starting over).
+    # Returns: result : bool
+    #   This is True if the working copy of the file (as the file is now) is in self.MASTER.
+    def fnc_getMaster(self, img_path, img_stamp, **kwargs):
+        if not (self.MASTER is None) and self.MASTER.fnc_isOf(img_path, img_stamp):
+            return True
+        if (self.MASTER_PENDING is None) or not (self.MASTER_PENDING[0] == img_path):
+            return False
+
+        _future = self.MASTER_PENDING[1]
+        if not ('wait' in kwargs) and not _future.done():
+            return False
+        self.MASTER_PENDING = None
+        if _future.cancel():
+            return False
+        try:
+            _master = _future.result()
+        except:
+            _master = None
+        if (_master is None) or not _master.fnc_isOf(img_path, img_stamp):
+            return False
+        self.MASTER = _master
+        return True
+        # end of function
+    #!
+    # loads the working copy of the shown image in the background, unless it is at hand or is being loaded.
+    #   The images stepped through quickly (the 'fast' quality) are skipped; the working copy being loaded
+    #   for another image is canceled, if it has not started yet.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   params : tuple
+    #       (scale, flip_left_right, flip_top_bottom, rotation, screen_size, quality) as in fnc_RenderImage(...)
+    # Returns: nothing.
+    def fnc_keepMaster(self, img_path, params):
+        if self.IS_STOPPED or (params[5] == 'fast'):
+            return
+        _img_stamp = fnc_GetFileStamp(img_path)
+        if self.fnc_getMaster(img_path, _img_stamp) or\
+           (not (self.MASTER_PENDING is None) and (self.MASTER_PENDING[0] == img_path)):
+            return
+        if not (self.MASTER_PENDING is None):
+            self.MASTER_PENDING[1].cancel()
+        self.MASTER_PENDING = (img_path, self.EXECUTOR.submit(self.fnc_loadMaster, img_path, params[4]))
+        # end of function
+    #!
+    # checks if the working copy of a file (as the file is now) is at hand, i.e. if the file can be rendered
+    #   without reading it again.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    # Returns: result : bool
+    def fnc_hasMaster(self, img_path):
+        return self.fnc_getMaster(img_path, fnc_GetFileStamp(img_path))
+        # end of function
+    #!
+    # stops loading the working copies (e.g. when the main window is being closed).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        if not (self.MASTER_PENDING is None):
+            self.MASTER_PENDING[1].cancel()
+            self.MASTER_PENDING = None
+        self.EXECUTOR.shutdown(wait=False)
+        # end of function
+    # end of class ImgFrameSource
@@ -0,0 +1,679 @@
+import os
+import sys
+import time
+import queue
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+from lib import shch_img_browser_lib as Shch
+from lib import shch_img_browser_perf as ShchPerf
+
+DEBUG_ENABLED = False
+
+class ImgFolderScanner():
+    __doc__ = """
+    lists the image files in a folder (and, in the recursive mode, in its subfolders) in a background thread, and
+        passes them to the Tk loop in batches (through a queue which is polled with after(...)). The first image is
+        passed on as soon as it is found, thus it can be shown (and browsed) while the rest of the folder
+        is being listed.
+    Args:
+        tk_root : Tk
+            The main window (used to poll the queue with the found files).
+        image_folder : str
+            The folder with images.
+        legit_extensions : dict
+            See Shch.fnc_GetImageFileList(...).
+        callback : function
+            This is called (in the Tk loop) as callback(image_files, is_done), where image_files is the list of newly
+            found file names, and is_done is True for the last call.
+        kwargs : typical kwargs
+            'recursive' : <any value>
+                If this is set, the subfolders are listed too (see Shch.fnc_IterImageFilesRecursive(...)), and the
+                file names are paths relative to image_folder.
+            'max_depth' : int
+                How deep to go into the subfolders (see Shch.fnc_IterImageFilesRecursive(...)).
+            'include' : list
+                The glob patterns of the files to list (see Shch.fnc_IterImageFilesRecursive(...)).
+            'exclude' : list
+                The glob patterns of the files and folders to skip (see Shch.fnc_IterImageFilesRecursive(...)).
+            'on_folder' : function
+                This is called (in the background thread) with every folder which is walked
+                (see Shch.fnc_IterImageFilesRecursive(...)), e.g. ImgFolderWatcher.fnc_addFolder.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, tk_root, image_folder, legit_extensions, callback, **kwargs):
+        self.tk_root = tk_root
+        self.callback = callback
+        self.BATCH_SIZE = 2000 # the files are passed on at least every BATCH_SIZE files ...
+        self.BATCH_INTERVAL = .1 # ... or every BATCH_INTERVAL seconds
+        self.POLL_INTERVAL = 30 # in ms.
+
+        self.RESULTS = queue.Queue()
+        self.POLL_QUEUE = []
+        self.IS_STOPPED = False
+        self.IS_DONE = False
+
+        self.WALK_KWARGS = {_key: kwargs[_key] for _key in ('max_depth', 'include', 'exclude', 'on_folder')\
+                            if _key in kwargs}
+        self.IS_RECURSIVE = 'recursive' in kwargs
+
+        self.THREAD = threading.Thread(target= self.fnc_work, args= (image_folder, legit_extensions), daemon= True)
+        self.THREAD.start()
+        self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of __init__
+    #!
+    # lists the folder. This runs in the background thread and must not touch Tk.
+    # Args:
+    #   image_folder : str
+    #       The folder with images.
+    #   legit_extensions : dict
+    #       See Shch.fnc_GetImageFileList(...).
+    # Returns: nothing.
+    def fnc_work(self, image_folder, legit_extensions):
+        _batch = []
+        _is_first = True # the very first file goes at once, so that it can be shown
+        _last_time = _start_time = time.perf_counter()
+        # the walker is used for the flat mode as well, when there are include/exclude patterns
+        if self.IS_RECURSIVE or (len(self.WALK_KWARGS.get('include', [])) > 0) or\
+           (len(self.WALK_KWARGS.get('exclude', [])) > 0):
+            _walk_kwargs = dict(self.WALK_KWARGS)
+            if not self.IS_RECURSIVE:
+                _walk_kwargs['max_depth'] = 0
+            _image_files = Shch.fnc_IterImageFilesRecursive(image_folder, legit_extensions, **_walk_kwargs)
+        else:
+            _image_files = Shch.fnc_IterImageFiles(image_folder, legit_extensions)
+
+        try:
+            for _image_file in _image_files:
+                if self.IS_STOPPED:
+                    return
+                _batch.append(_image_file)
+                _time = time.perf_counter()
+                if _is_first or (len(_batch) >= self.BATCH_SIZE) or (_time - _last_time >= self.BATCH_INTERVAL):
+                    _is_first = False
+                    self.RESULTS.put(_batch)
+                    _batch = []
+                    _last_time = _time
+        finally:
+            self.RESULTS.put(_batch)
+            self.RESULTS.put(None) # marks the end of the folder
+            if not self.IS_STOPPED:
+                ShchPerf.PERF.fnc_add('scan', _start_time)
+        # end of function
+    #!
+    # passes the found files to the callback. This is called by the Tk loop (through after(...)) until the folder
+    #   is listed.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_poll(self):
+        self.POLL_QUEUE = []
+        if self.IS_STOPPED:
+            return
+
+        _image_files = []
+        while True:
+            try:
+                _batch = self.RESULTS.get_nowait()
+            except queue.Empty:
+                break
+            if _batch is None:
+                self.IS_DONE = True
+                break
+            _image_files.extend(_batch)
+
+        if (len(_image_files) > 0) or self.IS_DONE:
+            if DEBUG_ENABLED:
+                print('scanned: ', len(_image_files), ' done: ', self.IS_DONE)
+            self.callback(_image_files, self.IS_DONE)
+
+        if not (self.IS_DONE or self.IS_STOPPED):
+            self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # stops listing the folder (e.g. when another folder is selected).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        for _each in self.POLL_QUEUE:
+            try:
+                self.tk_root.after_cancel(_each)
+            except:
+                pass
+        self.POLL_QUEUE = []
+        # end of function
+    # end of class ImgFolderScanner
+
+class ImgStartDirFinder():
+    __doc__ = """
+    looks for the image folder to start with when this program is run for the first time (see Shch.ImgBrowserStartDir)
+        in a background thread, so that the main window is shown at once. The found folder is passed to the Tk loop
+        (through a queue which is polled with after(...)).
+    Args:
+        tk_root : Tk
+            The main window (used to poll the queue).
+        legit_extensions : dict
+            See Shch.fnc_GetImageFileList(...).
+        home_dir : str
+            The folder of this program (the sample images are copied from there, see Shch.ImgBrowserStartDir).
+        callback : function
+            This is called (in the Tk loop) as callback(image_folder), where image_folder is None if no folder
+            has been found.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, tk_root, legit_extensions, home_dir, callback):
+        self.tk_root = tk_root
+        self.callback = callback
+        self.POLL_INTERVAL = 30 # in ms.
+
+        self.RESULTS = queue.Queue()
+        self.POLL_QUEUE = []
+        self.IS_STOPPED = False
+
+        self.THREAD = threading.Thread(target= self.fnc_work, args= (legit_extensions, home_dir), daemon= True)
+        self.THREAD.start()
+        self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of __init__
+    #!
+    # looks for the folder. This runs in the background thread and must not touch Tk.
+    # Args:
+    #   legit_extensions, home_dir : see above.
+    # Returns: nothing.
+    def fnc_work(self, legit_extensions, home_dir):
+        _image_folder = None
+        _start_time = time.perf_counter()
+        try:
+            _image_folder = Shch.ImgBrowserStartDir(legit_extensions, home_dir).fnc_getStartDir()
+        finally:
+            self.RESULTS.put(_image_folder)
+            ShchPerf.PERF.fnc_add('start_dir', _start_time)
+        # end of function
+    #!
+    # passes the found folder to the callback. This is called by the Tk loop (through after(...)) until the folder
+    #   is found.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_poll(self):
+        self.POLL_QUEUE = []
+        if self.IS_STOPPED:
+            return
+        try:
+            _image_folder = self.RESULTS.get_nowait()
+        except queue.Empty:
+            self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+            return
+        self.IS_STOPPED = True
+        if DEBUG_ENABLED:
+            print('start folder: ', _image_folder)
+        self.callback(_image_folder)
+        # end of function
+    #!
+    # stops waiting for the folder (e.g. when another folder is selected, or the main window is being closed).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        for _each in self.POLL_QUEUE:
+            try:
+                self.tk_root.after_cancel(_each)
+            except:
+                pass
+        self.POLL_QUEUE = []
+        # end of function
+    # end of class ImgStartDirFinder
+
+class ImgFolderWatcher():
+    __doc__ = """
+    watches the image folder (and, in the recursive mode, its subfolders) for image files being added or removed,
+        and passes the changes to the Tk loop (through a queue which is polled with after(...)).
+        On Linux the changes are reported by the kernel (inotify, through ctypes), thus the cost depends on the
+        number of changed files only. Elsewhere the mtime of every watched folder is checked every few seconds,
+        and only the folders which have changed are listed again; every folder is listed again (less often) to find
+        the files overwritten in place, which do not change the mtime of their folder.
+        A file which is written (or replaced) while it is known is reported as removed and added, so that what is
+        known about it (e.g. its sort keys) is read again.
+        The folders to watch are added with fnc_addFolder(...) (e.g. by the folder walker, as it finds them), and
+        the files already known are added with fnc_seed(...). A file is reported only once, either by fnc_seed(...),
+        or as a change.
+    Args:
+        tk_root : Tk
+            The main window (used to poll the queue with the changes).
+        image_folder : str
+            The folder with images.
+        legit_extensions : dict
+            See Shch.fnc_GetImageFileList(...).
+        callback : function
+            This is called (in the Tk loop) as callback(added, removed), where added and removed are lists of
+            file names (paths relative to image_folder).
+        kwargs : typical kwargs
+            'recursive', 'max_depth', 'include', 'exclude' : see ImgFolderScanner.
+            'poll_interval' : float
+                How often the folders are checked when inotify is not available (in seconds, default is 2).
+            'full_poll_interval' : float
+                How often every folder is listed again when inotify is not available (in seconds, default is 30).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, tk_root, image_folder, legit_extensions, callback, **kwargs):
+        self.tk_root = tk_root
+        self.IMAGE_FOLDER = image_folder
+        self.callback = callback
+        self.IS_RECURSIVE = 'recursive' in kwargs
+        self.MAX_DEPTH = (kwargs['max_depth'] if 'max_depth' in kwargs else 8) if self.IS_RECURSIVE else 0
+        self.INCLUDE = kwargs['include'] if 'include' in kwargs else []
+        self.EXCLUDE = kwargs['exclude'] if 'exclude' in kwargs else []
+        self.POLL_INTERVAL = kwargs['poll_interval'] if 'poll_interval' in kwargs else 2.
+        self.FULL_POLL_INTERVAL = kwargs['full_poll_interval'] if 'full_poll_interval' in kwargs else 30.
+        self.FULL_POLL_TIME = time.monotonic() # when every folder was listed last (see fnc_pollFolders(...))
+        self.TK_POLL_INTERVAL = 300 # in ms.
+        self.fnc_isMatching = Shch.fnc_GetExtensionMatcher(legit_extensions)
+
+        self.LOCK = threading.Lock()
+        self.FILES = dict() # relative folder path -> set of the image file names in it
+        self.GONE = set() # files removed before they were seeded (see fnc_seed(...))
+        self.MTIMES = dict() # relative folder path -> mtime (for polling)
+        self.STAMPS = dict() # relative file path -> (mtime, size) (for polling, see fnc_rescanFolder(...))
+        self.WATCHES = dict() # inotify watch descriptor -> relative folder path
+        self.ADDED = [] # changes found by the background thread, not yet put into self.RESULTS
+        self.REMOVED = []
+        self.RESULTS = queue.Queue()
+        self.POLL_QUEUE = []
+        self.IS_STOPPED = False
+        self.STOP_EVENT = threading.Event()
+
+        self.INOTIFY = fnc_GetInotify()
+        self.INOTIFY_FD = None
+        if not (self.INOTIFY is None):
+            try:
+                self.INOTIFY_FD = self.INOTIFY['init'](self.INOTIFY['IN_NONBLOCK'] | self.INOTIFY['IN_CLOEXEC'])
+            except:
+                self.INOTIFY_FD = None
+            if (self.INOTIFY_FD is not None) and (self.INOTIFY_FD < 0):
+                self.INOTIFY_FD = None
+        if DEBUG_ENABLED:
+            print('watching with inotify: ', self.INOTIFY_FD is not None)
+
+        self.fnc_addFolder('')
+        self.THREAD = threading.Thread(target= self.fnc_work, daemon= True)
+        self.THREAD.start()
+        self.POLL_QUEUE = [self.tk_root.after(self.TK_POLL_INTERVAL, self.fnc_poll)]
+        # end of __init__
+    #!
+    # starts watching a folder. This can be called from any thread (e.g. by the folder walker).
+    # Args:
+    #   rel_folder : str
+    #       The path of the folder relative to the image folder ('' is the image folder itself).
+    # Returns: nothing.
+    def fnc_addFolder(self, rel_folder):
+        _path = os.path.join(self.IMAGE_FOLDER, rel_folder)
+        with self.LOCK:
+            if rel_folder in self.FILES:
+                return
+            self.FILES[rel_folder] = set()
+            if self.INOTIFY_FD is not None:
+                _wd = self.INOTIFY['add_watch'](self.INOTIFY_FD, os.fsencode(_path), self.INOTIFY['MASK'])
+                if _wd >= 0:
+                    self.WATCHES[_wd] = rel_folder
+            try:
+                self.MTIMES[rel_folder] = os.stat(_path).st_mtime_ns
+            except OSError:
+                self.MTIMES[rel_folder] = None
+        # end of function
+    #!
+    # adds the files found by the folder scanner, and returns those which are not known yet (i.e. not reported as
+    #   added, or removed, by the watcher in the meantime).
+    # Args:
+    #   image_files : list
+    #       The file names (paths relative to the image folder).
+    # Returns: image_files : list
+    #   The files to append to the list of images.
+    def fnc_seed(self, image_files):
+        _new_files = []
+        with self.LOCK:
+            for _image_file in image_files:
+                _rel_folder, _name = os.path.split(_image_file)
+                if _image_file in self.GONE:
+                    self.GONE.discard(_image_file)
+                    continue
+                _names = self.FILES.setdefault(_rel_folder, set())
+                if _name in _names:
+                    continue
+                _names.add(_name)
+                _new_files.append(_image_file)
+        return _new_files
+        # end of function
+    #!
+    # forgets the files which have been found to be gone by other means (e.g. by comparing with the folder index).
+    # Args:
+    #   image_files : list
+    #       The file names (paths relative to the image folder).
+    # Returns: nothing.
+    def fnc_forget(self, image_files):
+        with self.LOCK:
+            for _image_file in image_files:
+                _rel_folder, _name = os.path.split(_image_file)
+                if _rel_folder in self.FILES:
+                    self.FILES[_rel_folder].discard(_name)
+        # end of function
+    #!
+    # checks if a file (given by its path relative to the image folder) is to be shown.
+    # Args:
+    #   rel_path : str
+    # Returns: result : bool
+    def fnc_isImageFile(self, rel_path):
+        if not self.fnc_isMatching(os.path.basename(rel_path)):
+            return False
+        if (len(self.INCLUDE) > 0) and not Shch.fnc_IsMatchingGlobs(rel_path, self.INCLUDE):
+            return False
+        return not Shch.fnc_IsMatchingGlobs(rel_path, self.EXCLUDE)
+        # end of function
+    #!
+    # checks if a subfolder (given by its path relative to the image folder) is to be watched.
+    # Args:
+    #   rel_folder : str
+    # Returns: result : bool
+    def fnc_isWatchedFolder(self, rel_folder):
+        if not self.IS_RECURSIVE:
+            return False
+        if len(rel_folder.split(os.sep)) > self.MAX_DEPTH:
+            return False
+        return not Shch.fnc_IsMatchingGlobs(rel_folder, self.EXCLUDE)
+        # end of function
+    #!
+    # records an added or removed file. This must be called with self.LOCK held.
+    # Args:
+    #   rel_folder : str
+    #   name : str
+    #   is_added : bool
+    # Returns: nothing.
+    def fnc_record(self, rel_folder, name, is_added):
+        _rel_path = os.path.join(rel_folder, name) if (len(rel_folder) > 0) else name
+        _names = self.FILES.setdefault(rel_folder, set())
+        if is_added:
+            self.GONE.discard(_rel_path)
+            if (not (name in _names)) and self.fnc_isImageFile(_rel_path):
+                _names.add(name)
+                self.ADDED.append(_rel_path)
+        else:
+            self.STAMPS.pop(_rel_path, None)
+            if name in _names:
+                _names.discard(name)
+                # a file added (or changed) since the last report is not reported as added
+                if _rel_path in self.ADDED:
+                    self.ADDED.remove(_rel_path)
+                if not (_rel_path in self.REMOVED):
+                    self.REMOVED.append(_rel_path)
+            elif self.fnc_isImageFile(_rel_path):
+                self.GONE.add(_rel_path)
+        # end of function
+    #!
+    # records a file which has been written (or replaced). A known file is recorded as removed and added,
+    #   a file which is not known as added. This must be called with self.LOCK held.
+    # Args:
+    #   rel_folder : str
+    #   name : str
+    # Returns: nothing.
+    def fnc_recordChanged(self, rel_folder, name):
+        _rel_path = os.path.join(rel_folder, name) if (len(rel_folder) > 0) else name
+        if not (name in self.FILES.get(rel_folder, set())):
+            self.fnc_record(rel_folder, name, True)
+            return
+        if not (_rel_path in self.ADDED):
+            self.REMOVED.append(_rel_path)
+            self.ADDED.append(_rel_path)
+        # end of function
+    #!
+    # lists a folder which has appeared (or changed), and records the differences. New subfolders are listed too.
+    #   When polling (no inotify), the mtimes and the sizes of the image files are kept too, and the known files
+    #   whose mtimes (or sizes) have changed are recorded as changed (the first listing of a file only keeps them).
+    # Args:
+    #   rel_folder : str
+    # Returns: nothing.
+    def fnc_rescanFolder(self, rel_folder):
+        _names = set()
+        _stamps = dict() # name -> (mtime, size), when polling
+        _subfolders = []
+        try:
+            with os.scandir(os.path.join(self.IMAGE_FOLDER, rel_folder)) as _entries:
+                for _entry in _entries:
+                    try:
+                        if _entry.is_dir():
+                            _subfolders.append(os.path.join(rel_folder, _entry.name) if (len(rel_folder) > 0) else _entry.name)
+                        elif _entry.is_file():
+                            _names.add(_entry.name)
+                            if (self.INOTIFY_FD is None) and self.fnc_isMatching(_entry.name):
+                                # (on Windows the stat comes with the listing)
+                                _stat = _entry.stat()
+                                _stamps[_entry.name] = (_stat.st_mtime_ns, _stat.st_size)
+                    except OSError:
+                        pass
+        except OSError:
+            self.fnc_dropFolder(rel_folder)
+            return
+
+        with self.LOCK:
+            _known = set(self.FILES.get(rel_folder, set()))
+            for _name in _names - _known:
+                self.fnc_record(rel_folder, _name, True)
+            for _name in _known - _names:
+                self.fnc_record(rel_folder, _name, False)
+            for _name, _stamp in _stamps.items():
+                _rel_path = os.path.join(rel_folder, _name) if (len(rel_folder) > 0) else _name
+                _old_stamp = self.STAMPS.get(_rel_path)
+                self.STAMPS[_rel_path] = _stamp
+                if (_name in _known) and not (_old_stamp is None) and not (_old_stamp == _stamp):
+                    self.fnc_recordChanged(rel_folder, _name)
+
+        for _subfolder in _subfolders:
+            if self.fnc_isWatchedFolder(_subfolder) and not (_subfolder in self.FILES):
+                self.fnc_addFolder(_subfolder)
+                self.fnc_rescanFolder(_subfolder)
+        # end of function
+    #!
+    # stops watching a folder which has disappeared, and records its files (and those in its subfolders) as removed.
+    # Args:
+    #   rel_folder : str
+    # Returns: nothing.
+    def fnc_dropFolder(self, rel_folder):
+        _prefix = rel_folder + os.sep
+        with self.LOCK:
+            for _folder in [_each for _each in self.FILES if (_each == rel_folder) or _each.startswith(_prefix)]:
+                for _name in list(self.FILES[_folder]):
+                    self.fnc_record(_folder, _name, False)
+                if len(_folder) > 0:
+                    self.FILES.pop(_folder)
+                    self.MTIMES.pop(_folder, None)
+                    for _wd in [_wd for _wd, _each in self.WATCHES.items() if _each == _folder]:
+                        self.WATCHES.pop(_wd)
+                        try:
+                            self.INOTIFY['rm_watch'](self.INOTIFY_FD, _wd)
+                        except:
+                            pass
+        # end of function
+    #!
+    # reads and applies the pending inotify events.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_readEvents(self):
+        try:
+            _buffer = os.read(self.INOTIFY_FD, 65536)
+        except OSError:
+            return
+
+        _rescans = []
+        _offset = 0
+        while _offset + 16 <= len(_buffer):
+            _wd, _mask, _cookie, _length = struct.unpack_from('iIII', _buffer, _offset)
+            _name = os.fsdecode(_buffer[_offset + 16: _offset + 16 + _length].rstrip(b'\0'))
+            _offset += 16 + _length
+
+            if _mask & self.INOTIFY['IN_Q_OVERFLOW']:
+                # some events are lost: all folders are listed again
+                _rescans = list(self.FILES)
+                continue
+            _rel_folder = self.WATCHES.get(_wd)
+            if _rel_folder is None:
+                continue
+            _rel_path = os.path.join(_rel_folder, _name) if (len(_rel_folder) > 0) else _name
+
+            if _mask & self.INOTIFY['IN_ISDIR']:
+                if _mask & (self.INOTIFY['IN_CREATE'] | self.INOTIFY['IN_MOVED_TO']):
+                    if self.fnc_isWatchedFolder(_rel_path):
+                        _rescans.append(_rel_path)
+                elif _mask & (self.INOTIFY['IN_DELETE'] | self.INOTIFY['IN_MOVED_FROM']):
+                    self.fnc_dropFolder(_rel_path)
+                continue
+
+            with self.LOCK:
+                if _mask & (self.INOTIFY['IN_CLOSE_WRITE'] | self.INOTIFY['IN_MOVED_TO']):
+                    # a new file, or a known one overwritten in place (or replaced by a rename)
+                    self.fnc_recordChanged(_rel_folder, _name)
+                elif _mask & (self.INOTIFY['IN_DELETE'] | self.INOTIFY['IN_MOVED_FROM']):
+                    self.fnc_record(_rel_folder, _name, False)
+
+        for _rel_folder in _rescans:
+            self.fnc_addFolder(_rel_folder)
+            self.fnc_rescanFolder(_rel_folder)
+        # end of function
+    #!
+    # checks the mtime of every watched folder, and lists again those which have changed (when there is no inotify).
+    #   Every self.FULL_POLL_INTERVAL seconds every folder is listed again (see fnc_rescanFolder(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_pollFolders(self):
+        with self.LOCK:
+            _folders = list(self.MTIMES.items())
+        _is_full = time.monotonic() - self.FULL_POLL_TIME >= self.FULL_POLL_INTERVAL
+        if _is_full:
+            self.FULL_POLL_TIME = time.monotonic()
+
+        for _rel_folder, _mtime in _folders:
+            if self.IS_STOPPED:
+                return
+            try:
+                _new_mtime = os.stat(os.path.join(self.IMAGE_FOLDER, _rel_folder)).st_mtime_ns
+            except OSError:
+                if len(_rel_folder) > 0:
+                    self.fnc_dropFolder(_rel_folder)
+                continue
+            if (_new_mtime == _mtime) and not _is_full:
+                continue
+            with self.LOCK:
+                self.MTIMES[_rel_folder] = _new_mtime
+            self.fnc_rescanFolder(_rel_folder)
+        # end of function
+    #!
+    # watches the folders. This runs in the background thread and must not touch Tk.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_work(self):
+        while not self.IS_STOPPED:
+            if self.INOTIFY_FD is not None:
+                try:
+                    _ready = select.select([self.INOTIFY_FD], [], [], .5)[0]
+                except (OSError, ValueError):
+                    break
+                if len(_ready) > 0:
+                    self.fnc_readEvents()
+            else:
+                if self.STOP_EVENT.wait(self.POLL_INTERVAL):
+                    break
+                self.fnc_pollFolders()
+
+            with self.LOCK:
+                if (len(self.ADDED) > 0) or (len(self.REMOVED) > 0):
+                    self.RESULTS.put((self.ADDED, self.REMOVED))
+                    self.ADDED = []
+                    self.REMOVED = []
+
+        if self.INOTIFY_FD is not None:
+            try:
+                os.close(self.INOTIFY_FD)
+            except OSError:
+                pass
+        # end of function
+    #!
+    # passes the changes to the callback. This is called by the Tk loop (through after(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_poll(self):
+        self.POLL_QUEUE = []
+        if self.IS_STOPPED:
+            return
+
+        # the batches are merged in the order they were found in: a file added and then removed is dropped, a file
+        #   removed and then added (or changed, i.e. reported as both, see fnc_recordChanged(...)) is changed
+        _changes = dict() # rel path -> 'added', 'removed' or 'changed'
+        while True:
+            try:
+                _each_added, _each_removed = self.RESULTS.get_nowait()
+            except queue.Empty:
+                break
+            for _each in _each_removed:
+                if _changes.get(_each) == 'added':
+                    _changes.pop(_each)
+                else:
+                    _changes[_each] = 'removed'
+            for _each in _each_added:
+                _changes[_each] = 'changed' if (_changes.get(_each) in ('removed', 'changed')) else 'added'
+
+        _added = [_each for _each, _change in _changes.items() if not (_change == 'removed')]
+        _removed = [_each for _each, _change in _changes.items() if not (_change == 'added')]
+        if (len(_added) > 0) or (len(_removed) > 0):
+            if DEBUG_ENABLED:
+                print('watched: added ', len(_added), ' removed ', len(_removed))
+            self.callback(_added, _removed)
+
+        self.POLL_QUEUE = [self.tk_root.after(self.TK_POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # stops watching (e.g. when another folder is selected).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        self.STOP_EVENT.set()
+        for _each in self.POLL_QUEUE:
+            try:
+                self.tk_root.after_cancel(_each)
+            except:
+                pass
+        self.POLL_QUEUE = []
+        # end of function
+    # end of class ImgFolderWatcher
+
+#!
+# loads the inotify functions from the C library (Linux only).
+# Args: none.
+# Returns: inotify : dict
+#   The functions ('init', 'add_watch', 'rm_watch') and the constants; None if inotify is not available.
+def fnc_GetInotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno= True)
+        _init = _libc.inotify_init1
+        _init.argtypes = [ctypes.c_int]
+        _init.restype = ctypes.c_int
+        _add_watch = _libc.inotify_add_watch
+        _add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _add_watch.restype = ctypes.c_int
+        _rm_watch = _libc.inotify_rm_watch
+        _rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _rm_watch.restype = ctypes.c_int
+    except:
+        return None
+
+    _inotify = {'init': _init, 'add_watch': _add_watch, 'rm_watch': _rm_watch,
+                'IN_CLOSE_WRITE': 0x8, 'IN_MOVED_FROM': 0x40, 'IN_MOVED_TO': 0x80, 'IN_CREATE': 0x100,
+                'IN_DELETE': 0x200, 'IN_Q_OVERFLOW': 0x4000, 'IN_ISDIR': 0x40000000,
+                'IN_NONBLOCK': 0o4000, 'IN_CLOEXEC': 0o2000000}
+    _inotify['MASK'] = _inotify['IN_CLOSE_WRITE'] | _inotify['IN_MOVED_FROM'] | _inotify['IN_MOVED_TO'] |\
+                       _inotify['IN_CREATE'] | _inotify['IN_DELETE']
+    return _inotify
+    # end of function
@@ -0,0 +1,330 @@
+import os
+import json
+import time
+import heapq
+
+from lib import shch_img_browser_lib as Shch
+from lib import shch_img_browser_render as ShchRender
+from lib import shch_img_browser_sort as ShchSort
+from lib import shch_img_browser_io as ShchIO
+
+DEBUG_ENABLED = False
+
+# the operations which render an image (the rest only change what is rendered next, or are not replayed)
+RENDER_OPS = ('show',)
+#!
+# returns the path of a new session file: CACHE_PATH/sessions/session_<date>_<time>.jsonl
+# Args:
+#   cache_path : str
+#       The folder of the caches (see ShchImgBrowser.CONFIG.CACHE_PATH).
+# Returns: session_path : str
+def fnc_GetSessionPath(cache_path):
+    return os.path.join(cache_path, 'sessions', 'session_{}.jsonl'.format(time.strftime('%Y%m%d_%H%M%S')))
+    # end of function
+
+class SessionRecorder():
+    __doc__ = """
+    records what the browser is asked to do (the operations: showing an image, moving to the next one, autoplay,
+        scaling, rotating, flipping, switching the folder, changing the fonts) as a timestamped trace, so that
+        a slowdown seen by someone else can be replayed (see SessionPlayer).
+        The trace is a JSON-lines file: every line is {"t": <seconds since the start>, "op": <operation>, ...}.
+        The file is line buffered, thus the trace is kept up to the last operation if the program is killed.
+        The methods of this class are called from the Tk loop only.
+    Args:
+        session_path : str
+            The path to the session file (see fnc_GetSessionPath(...)); its folder is created if needed.
+        kwargs : typical kwargs
+            The settings the session is replayed with (see SessionPlayer.fnc_setUp(...)), e.g. 'max_scale',
+            'frame_cache_mb', 'read_ahead_files', 'read_ahead_mb'; they are recorded with the 'start' op.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, session_path, **kwargs):
+        self.SESSION_PATH = session_path
+        os.makedirs(os.path.dirname(session_path), exist_ok= True)
+        self.FILE = open(session_path, 'a', buffering= 1)
+        self.START = time.perf_counter()
+        self.fnc_record('start', time= time.strftime('%Y-%m-%dT%H:%M:%S'), **kwargs)
+        # end of __init__
+    #!
+    # appends an operation to the trace. Nothing is raised if the file cannot be written.
+    # Args:
+    #   op : str
+    #       The name of the operation.
+    #   at : float
+    #       When the operation started (time.perf_counter()); now by default.
+    #   kwargs : typical kwargs
+    #       The arguments of the operation (anything JSON can write; tuples are written as lists).
+    # Returns: nothing.
+    def fnc_record(self, op, at= None, **kwargs):
+        if self.FILE is None:
+            return
+        _line = {'t': round((time.perf_counter() if (at is None) else at) - self.START, 4), 'op': op}
+        _line.update(kwargs)
+        try:
+            self.FILE.write(json.dumps(_line) + '\n')
+        except:
+            if DEBUG_ENABLED:
+                print('the session cannot be written: ', self.SESSION_PATH)
+        # end of function
+    #!
+    # ends the trace.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_close(self):
+        if self.FILE is None:
+            return
+        self.fnc_record('stop')
+        try:
+            self.FILE.close()
+        except:
+            pass
+        self.FILE = None
+        # end of function
+    # end of class SessionRecorder
+#!
+# reads a session file (see SessionRecorder). The lines which cannot be read (e.g. the last one, cut off when
+#   the program was killed) are skipped.
+# Args:
+#   session_path : str
+# Returns: ops : list
+#   The operations (dicts), in the order they were recorded.
+def fnc_LoadSession(session_path):
+    _ops = []
+    with open(session_path, 'r') as _file:
+        for _line in _file:
+            try:
+                _op = json.loads(_line)
+            except ValueError:
+                continue
+            if isinstance(_op, dict) and ('op' in _op) and ('t' in _op):
+                _ops.append(_op)
+    return _ops
+    # end of function
+
+class HeadlessLoop():
+    __doc__ = """
+    runs the callbacks scheduled with after(...) without Tk, so that the parts of the browser which are polled
+        by the Tk loop (e.g. ShchRender.ImgPrefetcher) can be driven without a display.
+    Args: none.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self):
+        self.QUEUE = [] # heap of (due time, id, callback)
+        self.CANCELED = set()
+        self.NEXT_ID = 0
+        # end of __init__
+    #!
+    # schedules a callback, as Tk.after(...) does.
+    # Args:
+    #   delay_ms : int
+    #   fnc : function
+    # Returns: after_id : int
+    def after(self, delay_ms, fnc):
+        self.NEXT_ID += 1
+        heapq.heappush(self.QUEUE, (time.perf_counter() + .001 * delay_ms, self.NEXT_ID, fnc))
+        return self.NEXT_ID
+        # end of function
+    #!
+    # cancels a scheduled callback, as Tk.after_cancel(...) does.
+    # Args:
+    #   after_id : int
+    # Returns: nothing.
+    def after_cancel(self, after_id):
+        self.CANCELED.add(after_id)
+        # end of function
+    #!
+    # runs the callbacks which are due, until a given time (sleeping in between), or only those due now.
+    # Args:
+    #   until : float
+    #       The time (time.perf_counter()) to run until; if None, only the callbacks due now are run.
+    # Returns: nothing.
+    def fnc_run(self, until= None):
+        while True:
+            _now = time.perf_counter()
+            if (len(self.QUEUE) > 0) and (self.QUEUE[0][0] <= _now):
+                _due, _id, _fnc = heapq.heappop(self.QUEUE)
+                if _id in self.CANCELED:
+                    self.CANCELED.discard(_id)
+                    continue
+                _fnc()
+                continue
+            if (until is None) or (_now >= until):
+                return
+            time.sleep(min(until, self.QUEUE[0][0]) - _now if (len(self.QUEUE) > 0) else until - _now)
+        # end of function
+    # end of class HeadlessLoop
+
+class SessionPlayer():
+    __doc__ = """
+    replays a recorded session (see SessionRecorder) without a display: the images are rendered the same way
+        the browser renders them (see ShchRender.ImgFrameSource), with the frame cache, the prefetcher and
+        the read-ahead set up as they were, and the operations are paced as they were recorded (or faster).
+        The time every operation takes is collected, along with the time it took when it was recorded.
+        The widgets are not replayed: the font changes are only counted, and the PhotoImages are created only
+        if a function to create them is given.
+        The folder is listed by the player and sorted by name (in the recorded direction) whatever the recorded
+        sort mode was; the images are shown by their names, thus only the images prefetched may differ.
+    Args:
+        session_path : str
+            The path to a session file.
+        kwargs : typical kwargs
+            'folder' : str
+                The image folder to replay in (e.g. a copy of the recorded one); the recorded folder by default.
+            'speed' : float
+                How much faster than recorded to replay (e.g. 2 is twice as fast); 0 replays the operations back
+                to back. The default is 1.
+            'photo' : function
+                If given, this is called with every rendered frame (e.g. to create its PhotoImage, see
+                ShchRender.RenderedFrame.fnc_getPhoto(...)); it is timed as a part of showing the image.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, session_path, **kwargs):
+        self.OPS = fnc_LoadSession(session_path)
+        self.FOLDER_OVERRIDE = kwargs['folder'] if 'folder' in kwargs else None
+        self.SPEED = kwargs['speed'] if 'speed' in kwargs else 1.
+        self.fnc_photo = kwargs['photo'] if 'photo' in kwargs else None
+
+        self.LOOP = HeadlessLoop()
+        self.FRAME_CACHE = None
+        self.PREFETCHER = None
+        self.READ_AHEAD = None
+        self.FRAMES = None
+        self.IMAGE_FOLDER = None
+        self.IMAGE_FILES_LIST = []
+        self.IMAGE_INDEXES = dict() # image file -> its index in self.IMAGE_FILES_LIST
+        self.AUTOPLAY = 0
+        self.TIMINGS = dict() # op -> the replayed timings (in seconds)
+        self.RECORDED = dict() # op -> the recorded timings (in seconds), of the ops they were recorded for
+        self.MISSING = 0 # the images which could not be rendered
+        # end of __init__
+    #!
+    # sets up the frame cache, the prefetcher and the read-ahead as the browser had them (see the 'start' op).
+    # Args:
+    #   op : dict
+    #       The 'start' op.
+    # Returns: nothing.
+    def fnc_setUp(self, op):
+        self.fnc_tearDown()
+        self.FRAME_CACHE = ShchRender.FrameCache(op.get('frame_cache_mb', 256) * 1024 * 1024)
+        self.PREFETCHER = ShchRender.ImgPrefetcher(self.LOOP, self.FRAME_CACHE, workers=2, ahead=3, behind=1)
+        self.READ_AHEAD = ShchIO.ImgReadAhead(ahead= op.get('read_ahead_files', 16),\
+                                              max_bytes= op.get('read_ahead_mb', 256) * 1024 * 1024)
+        self.FRAMES = ShchRender.ImgFrameSource(self.FRAME_CACHE, self.PREFETCHER, op.get('max_scale', .75))
+        # end of function
+    #!
+    # stops the prefetcher, the read-ahead and the loading of the working copies.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_tearDown(self):
+        if not (self.FRAMES is None):
+            self.FRAMES.fnc_stop()
+            self.FRAMES = None
+        if not (self.PREFETCHER is None):
+            self.PREFETCHER.fnc_stop()
+            self.PREFETCHER = None
+        if not (self.READ_AHEAD is None):
+            self.READ_AHEAD.fnc_stop()
+            self.READ_AHEAD = None
+        # end of function
+    #!
+    # lists the image folder as the browser did (see the 'folder' op).
+    # Args:
+    #   op : dict
+    #       The 'folder' op.
+    # Returns: nothing.
+    def fnc_listFolder(self, op):
+        self.IMAGE_FOLDER = self.FOLDER_OVERRIDE if not (self.FOLDER_OVERRIDE is None) else op.get('folder', '')
+        _extensions = op.get('extensions', {})
+        if op.get('recursive') == 1:
+            _image_files = list(Shch.fnc_IterImageFilesRecursive(self.IMAGE_FOLDER, _extensions,\
+                max_depth= op.get('depth', 8), include= op.get('include', []), exclude= op.get('exclude', [])))
+        else:
+            _image_files = Shch.fnc_GetImageFileList(self.IMAGE_FOLDER, _extensions)
+        _image_files.sort(key= ShchSort.fnc_GetNaturalKey, reverse= op.get('reverse') == 1)
+        self.IMAGE_FILES_LIST = _image_files
+        self.IMAGE_INDEXES = {_image_file: _index for _index, _image_file in enumerate(_image_files)}
+        # end of function
+    #!
+    # renders an image as the browser did (see the 'show' op).
+    # Args:
+    #   op : dict
+    #       The 'show' op.
+    # Returns: nothing.
+    def fnc_show(self, op):
+        _img_path = Shch.fnc_GetImageFilePath(self.IMAGE_FOLDER, op['file'])
+        _img_params = fnc_GetParams(op['params'])
+        _frame, _img_params = self.FRAMES.fnc_getFrame(_img_path, _img_params)
+        if _frame is None:
+            self.MISSING += 1
+            return
+        if not (self.fnc_photo is None):
+            self.fnc_photo(_frame)
+        # end of function
+    #!
+    # gets the images around the shown one ready, as the browser did after moving to it (see the 'next' op), or
+    #   before showing it in the fine quality (see the 'refine' op).
+    # Args:
+    #   op : dict
+    #       The 'next' or 'refine' op.
+    # Returns: nothing.
+    def fnc_next(self, op):
+        _index = self.IMAGE_INDEXES.get(op.get('file'))
+        if _index is None:
+            return
+        _kwargs = {'wrap': 1} if (self.AUTOPLAY == 1) else {}
+        self.PREFETCHER.fnc_schedule(self.IMAGE_FOLDER, self.IMAGE_FILES_LIST, _index,\
+                                     fnc_GetParams(op['params']), **_kwargs)
+        self.READ_AHEAD.fnc_schedule(self.IMAGE_FOLDER, self.IMAGE_FILES_LIST, _index, **_kwargs)
+        # end of function
+    #!
+    # replays the session.
+    # Args: none.
+    # Returns: nothing.
+    #   The timings are in self.TIMINGS and self.RECORDED (op -> list of seconds); the ops which render
+    #   an image are keyed by their quality too (e.g. 'show:fast').
+    def fnc_play(self):
+        if (len(self.OPS) < 1) or not (self.OPS[0]['op'] == 'start'):
+            self.fnc_setUp({})
+        _start = time.perf_counter()
+        _base = self.OPS[0]['t'] if (len(self.OPS) > 0) else 0.
+        try:
+            for _op in self.OPS:
+                # the callbacks of the prefetcher run in between, as they would in the Tk loop
+                if self.SPEED > 0:
+                    self.LOOP.fnc_run(_start + (_op['t'] - _base) / self.SPEED)
+                else:
+                    self.LOOP.fnc_run()
+
+                _name = _op['op']
+                if _name in RENDER_OPS:
+                    _name = '{}:{}'.format(_name, _op['params'][5])
+                _op_start = time.perf_counter()
+                if _op['op'] == 'start':
+                    self.fnc_setUp(_op)
+                elif _op['op'] == 'folder':
+                    self.fnc_listFolder(_op)
+                elif _op['op'] == 'show':
+                    self.fnc_show(_op)
+                elif _op['op'] in ('next', 'refine'):
+                    self.fnc_next(_op)
+                elif _op['op'] == 'autoplay':
+                    self.AUTOPLAY = 1 if _op.get('on') == 1 else 0
+                self.TIMINGS.setdefault(_name, []).append(time.perf_counter() - _op_start)
+                if 'ms' in _op:
+                    self.RECORDED.setdefault(_name, []).append(.001 * _op['ms'])
+        finally:
+            self.fnc_tearDown()
+        # end of function
+    # end of class SessionPlayer
+#!
+# makes the render params of an image (see ShchRender.fnc_RenderImage(...)) from those recorded.
+# Args:
+#   params : list
+#       The recorded params (JSON has no tuples).
+# Returns: params : tuple
+def fnc_GetParams(params):
+    return tuple(tuple(_param) if isinstance(_param, list) else _param for _param in params)
+    # end of function
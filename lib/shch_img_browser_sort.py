@@ -0,0 +1,271 @@
+import os
+import re
+import queue
+import threading
+
+from lib import shch_img_browser_render as ShchRender
+
+DEBUG_ENABLED = False
+
+# the sort modes: the natural order of the file names, the modification time, the file size, the capture date
+SORT_MODES = ('name', 'mtime', 'size', 'taken')
+#!
+# returns the key of the natural order of file names, in which the numbers are compared by their values
+#   (e.g. img_2.jpg goes before img_10.jpg), and the case is ignored.
+# Args:
+#   image_file : str
+#       The file name.
+# Returns: key : tuple
+#   The text parts and the numbers alternate in it (it always starts with a text part, thus two keys can be compared).
+def fnc_GetNaturalKey(image_file):
+    _parts = re.split(r'(\d+)', image_file.casefold())
+    return tuple(int(_part) if (_index % 2 == 1) else _part for _index, _part in enumerate(_parts))
+    # end of function
+#!
+# inserts a file into a sorted list of files, keeping the list sorted (by binary search).
+# Args:
+#   image_files : list
+#       The sorted list (it is changed in place).
+#   image_file : str
+#       The file to insert.
+#   key : function
+#       The sort key (see ImgSortKeys.fnc_getKey(...)).
+#   reverse : bool
+#       True if image_files is sorted in the reverse order.
+# Returns: index : int
+#   The position the file is inserted at.
+def fnc_InsertSorted(image_files, image_file, key, reverse):
+    _key = key(image_file)
+    _low, _high = 0, len(image_files)
+    while _low < _high:
+        _middle = (_low + _high) // 2
+        _middle_key = key(image_files[_middle])
+        if (_key < _middle_key) if not reverse else (_middle_key < _key):
+            _high = _middle
+        else:
+            _low = _middle + 1
+    image_files.insert(_low, image_file)
+    return _low
+    # end of function
+#!
+# takes the sort keys out of what the folder index knows about the files.
+# Args:
+#   info : dict
+#       See ShchIndex.FolderIndex.fnc_getInfo(...).
+# Returns: result : tuple
+#   This is (stats, dates) as ImgSortKeys.STATS and ImgSortKeys.DATES.
+def fnc_GetIndexKeys(info):
+    _stats = dict()
+    _dates = dict()
+    for _name, _row in info.items():
+        if not ((_row['size'] is None) or (_row['mtime'] is None)):
+            _stats[_name] = (_row['size'], _row['mtime'])
+        if not (_row['width'] is None):
+            # the index has probed the file, thus a missing date means that there is none
+            _dates[_name] = _row['taken'] or ''
+    return (_stats, _dates)
+    # end of function
+
+class ImgSortKeys():
+    __doc__ = """
+    keeps the sort keys of the image files of a folder (the size, the mtime, the capture date), so that the list of
+        images can be sorted again (e.g. in another mode, or in the reverse order) without touching the disk.
+        The keys are taken from the folder index and the metadata cache, where possible; the missing ones are read
+        (stat, or the file header for the capture date) in the background thread, which loads the folder index
+        as well.
+    Args:
+        tk_root : Tk
+            The main window (used to poll the background thread with after(...)).
+        image_folder : str
+            The folder with images.
+        metadata : ShchMeta.MetadataCache
+            The cache used to get the capture dates.
+        callback : function
+            This is called (in the Tk loop, without arguments) when the requested keys have been read.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, tk_root, image_folder, metadata, callback):
+        self.tk_root = tk_root
+        self.IMAGE_FOLDER = image_folder
+        self.METADATA = metadata
+        self.callback = callback
+        self.POLL_INTERVAL = 50 # in ms.
+
+        self.NAMES = dict() # file name -> natural key
+        self.STATS = dict() # file name -> (size, mtime in ns)
+        self.DATES = dict() # file name -> capture date ('' if there is none)
+        self.IS_INFO_ADDED = False # True once the keys known from the folder index have been taken
+        self.FORGOTTEN = set() # the files forgotten before that (the index may not know they have changed)
+        self.RESULTS = queue.Queue()
+        self.POLL_QUEUE = []
+        self.THREAD = None
+        self.GENERATION = 0 # the background thread quits when this changes (see fnc_request(...))
+        self.IS_STOPPED = False
+        # end of __init__
+    #!
+    # adds the keys known from the folder index (see fnc_GetIndexKeys(...)). The keys already known are kept,
+    #   and those of the forgotten files are skipped.
+    # Args:
+    #   stats : dict
+    #   dates : dict
+    # Returns: nothing.
+    def fnc_addIndexKeys(self, stats, dates):
+        self.IS_INFO_ADDED = True
+        for _image_file in self.FORGOTTEN:
+            stats.pop(_image_file, None)
+            dates.pop(_image_file, None)
+        self.FORGOTTEN = set()
+        stats.update(self.STATS)
+        dates.update(self.DATES)
+        self.STATS = stats
+        self.DATES = dates
+        # end of function
+    #!
+    # forgets the keys of the files which have changed (or are gone).
+    # Args:
+    #   image_files : list
+    # Returns: nothing.
+    def fnc_forget(self, image_files):
+        if not self.IS_INFO_ADDED:
+            self.FORGOTTEN.update(image_files)
+        for _image_file in image_files:
+            self.STATS.pop(_image_file, None)
+            self.DATES.pop(_image_file, None)
+        # end of function
+    #!
+    # returns the sort key function for a sort mode. The keys must be known (see fnc_request(...)).
+    # Args:
+    #   mode : str
+    #       One of SORT_MODES.
+    # Returns: key : function
+    #   This is called with a file name. The natural order of the names is used for equal keys.
+    def fnc_getKey(self, mode):
+        _names = self.NAMES
+        def fnc_Name(image_file):
+            _key = _names.get(image_file)
+            if _key is None:
+                _key = _names[image_file] = fnc_GetNaturalKey(image_file)
+            return _key
+
+        if mode == 'mtime':
+            return lambda image_file: (self.STATS.get(image_file, (0, 0))[1], fnc_Name(image_file))
+        if mode == 'size':
+            return lambda image_file: (self.STATS.get(image_file, (0, 0))[0], fnc_Name(image_file))
+        if mode == 'taken':
+            # the images without the capture date go after those with it
+            return lambda image_file: (len(self.DATES.get(image_file, '')) < 1, self.DATES.get(image_file, ''),\
+                                       fnc_Name(image_file))
+        return fnc_Name
+        # end of function
+    #!
+    # checks that the keys of a sort mode are known for all files, and starts reading the missing ones
+    #   in the background thread if they are not (self.callback is called when they have been read).
+    # Args:
+    #   image_files : list
+    #       The file names.
+    #   mode : str
+    #       One of SORT_MODES.
+    #   kwargs : typical kwargs
+    #       'index' : ShchIndex.FolderIndex
+    #           If given, the keys it knows are loaded (once) in the background thread before the missing ones
+    #           are read.
+    # Returns: result : bool
+    #   True if all keys are known, i.e. the files can be sorted at once.
+    def fnc_request(self, image_files, mode, **kwargs):
+        if mode == 'mtime' or mode == 'size':
+            _missing = [_each for _each in image_files if not (_each in self.STATS)]
+        elif mode == 'taken':
+            _missing = [_each for _each in image_files if not (_each in self.DATES)]
+        else:
+            return True
+        if len(_missing) < 1:
+            return True
+
+        self.GENERATION += 1
+        _index = kwargs['index'] if ('index' in kwargs) and not self.IS_INFO_ADDED else None
+        self.THREAD = threading.Thread(target= self.fnc_work, args= (_missing, mode, self.GENERATION, _index),\
+                                       daemon= True)
+        self.THREAD.start()
+        if len(self.POLL_QUEUE) < 1:
+            self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        return False
+        # end of function
+    #!
+    # reads the missing keys. This runs in the background thread and must not touch Tk.
+    # Args:
+    #   image_files : list
+    #       The files with the missing keys.
+    #   mode : str
+    #       One of SORT_MODES.
+    #   generation : int
+    #       See self.GENERATION.
+    #   index : ShchIndex.FolderIndex
+    #       The folder index to load the keys from first (None if they have been loaded).
+    # Returns: nothing.
+    def fnc_work(self, image_files, mode, generation, index):
+        _index_keys = None
+        if not (index is None):
+            _index_keys = fnc_GetIndexKeys(index.fnc_getInfo())
+            _known = _index_keys[1] if (mode == 'taken') else _index_keys[0]
+            image_files = [_each for _each in image_files if not (_each in _known)]
+
+        _stats = dict()
+        _dates = dict()
+        for _start in range(0, len(image_files), 256):
+            if self.IS_STOPPED or not (generation == self.GENERATION):
+                if not (_index_keys is None):
+                    # the keys loaded from the index are not lost
+                    self.RESULTS.put((generation, _index_keys, dict(), dict()))
+                return
+            _paths = [os.path.join(self.IMAGE_FOLDER, _each) for _each in image_files[_start: _start + 256]]
+            if mode == 'taken':
+                _metas = self.METADATA.fnc_getMany(_paths)
+            for _image_file, _path in zip(image_files[_start: _start + 256], _paths):
+                _stamp = ShchRender.fnc_GetFileStamp(_path)
+                _stats[_image_file] = (_stamp[1], _stamp[0]) if (_stamp is not None) else (0, 0)
+                if mode == 'taken':
+                    _meta = _metas.get(_path)
+                    _dates[_image_file] = (_meta['taken'] or '') if (_meta is not None) else ''
+        self.RESULTS.put((generation, _index_keys, _stats, _dates))
+        # end of function
+    #!
+    # takes the keys read by the background thread. This is called by the Tk loop (through after(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_poll(self):
+        self.POLL_QUEUE = []
+        if self.IS_STOPPED:
+            return
+
+        _is_done = False
+        while True:
+            try:
+                _generation, _index_keys, _stats, _dates = self.RESULTS.get_nowait()
+            except queue.Empty:
+                break
+            if not ((_index_keys is None) or self.IS_INFO_ADDED):
+                self.fnc_addIndexKeys(*_index_keys)
+            self.STATS.update(_stats)
+            self.DATES.update(_dates)
+            _is_done = _is_done or (_generation == self.GENERATION)
+
+        if _is_done:
+            self.callback()
+        else:
+            self.POLL_QUEUE = [self.tk_root.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # stops reading the keys (e.g. when another folder is selected).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        for _each in self.POLL_QUEUE:
+            try:
+                self.tk_root.after_cancel(_each)
+            except:
+                pass
+        self.POLL_QUEUE = []
+        # end of function
+    # end of class ImgSortKeys
@@ -0,0 +1,246 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from PIL import Image as pil_image
+
+from lib import shch_img_browser_render as ShchRender
+
+DEBUG_ENABLED = False
+
+class ThumbnailStore():
+    __doc__ = """
+    keeps small previews (thumbnails) of image files on the disk, so that they are not decoded from the image
+        files again (even after the program is restarted). The thumbnails of an image are made all at once in a few
+        fixed sizes, from a single reduced decode of the image file.
+        The key of a thumbnail is the path, the size and the mtime of its image file, thus the thumbnail is made anew
+        if the file has changed. When the cache takes more space than allowed, the least recently used thumbnails
+        are removed.
+        The methods of this class can be called from worker threads.
+    Args:
+        cache_dir : str
+            The folder to keep the thumbnails in (it is created when needed).
+        max_bytes : int
+            The disk space the thumbnails may take (in bytes).
+        kwargs : typical kwargs
+            'sizes' : tuple
+                The sizes of thumbnails (the longer side, in pixels). The default is (128, 256).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, cache_dir, max_bytes, **kwargs):
+        self.CACHE_DIR = os.path.join(cache_dir, 'thumbs')
+        self.MAX_BYTES = max_bytes
+        self.SIZES = tuple(sorted(kwargs['sizes'])) if 'sizes' in kwargs else (128, 256)
+        self.BACKGROUND = (217, 217, 217) # transparent images are flattened over the default Tk background
+
+        self.LOCK = threading.Lock()
+        self.ENTRIES = None # thumbnail path -> size in bytes, least recently used first (see fnc_loadEntries(...))
+        self.BYTES = 0
+        # end of __init__
+    #!
+    # returns the thumbnail of an image file. If it is not on the disk yet, it is made (along with all other sizes).
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   size : int
+    #       The wanted size of the thumbnail (the longer side, in pixels). The smallest of self.SIZES which is not
+    #       less than size is returned (or the largest one).
+    # Returns: thumbnail : PIL image
+    #   This is None if the image cannot be loaded.
+    def fnc_get(self, img_path, size):
+        _stamp = ShchRender.fnc_GetFileStamp(img_path)
+        if _stamp is None:
+            return None
+
+        _size = self.fnc_snapSize(size)
+        _thumb_path = self.fnc_getThumbPath(img_path, _stamp, _size)
+        try:
+            _thumb = pil_image.open(_thumb_path)
+            _thumb.load()
+            self.fnc_touch(_thumb_path)
+            return _thumb
+        except:
+            pass
+
+        _thumbs = self.fnc_make(img_path, _stamp)
+        return _thumbs[_size] if (_thumbs is not None) else None
+        # end of function
+    #!
+    # checks if the thumbnail of an image file is on the disk.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   size : int
+    #       The wanted size of the thumbnail (see fnc_get(...)).
+    # Returns: result : bool
+    def fnc_has(self, img_path, size):
+        _stamp = ShchRender.fnc_GetFileStamp(img_path)
+        if _stamp is None:
+            return False
+        return os.path.isfile(self.fnc_getThumbPath(img_path, _stamp, self.fnc_snapSize(size)))
+        # end of function
+    #!
+    # returns the smallest of self.SIZES which is not less than size (or the largest one).
+    # Args:
+    #   size : int
+    #       The wanted size.
+    # Returns: size : int
+    def fnc_snapSize(self, size):
+        for _size in self.SIZES:
+            if _size >= size:
+                return _size
+        return self.SIZES[-1]
+        # end of function
+    #!
+    # returns the path of a thumbnail. The thumbnails are spread over 256 subfolders.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   stamp : tuple
+    #       The stamp of the image file (see ShchRender.fnc_GetFileStamp(...)).
+    #   size : int
+    #       One of self.SIZES.
+    # Returns: thumb_path : str
+    def fnc_getThumbPath(self, img_path, stamp, size):
+        _key = hashlib.sha1('{}|{}|{}'.format(os.path.abspath(img_path), stamp[1], stamp[0]).encode('utf-8')).hexdigest()
+        return os.path.join(self.CACHE_DIR, _key[:2], '{}_{}.jpg'.format(_key, size))
+        # end of function
+    #!
+    # makes the thumbnails of all sizes for an image file, and writes them to the disk.
+    # Args:
+    #   img_path : str
+    #       The path to an image file.
+    #   stamp : tuple
+    #       The stamp of the image file (see ShchRender.fnc_GetFileStamp(...)).
+    # Returns: thumbnails : dict
+    #   The keys are self.SIZES, the values are PIL images. This is None if the image cannot be loaded.
+    def fnc_make(self, img_path, stamp):
+        _largest = self.SIZES[-1]
+        _result = ShchRender.fnc_OpenReduced(img_path, (_largest, _largest))
+        if _result is None:
+            return None
+        _img = _result[0]
+
+        try:
+            if _img.mode in ('RGBA', 'LA', 'P', 'PA'):
+                _img = _img.convert('RGBA')
+                _flat = pil_image.new('RGB', _img.size, self.BACKGROUND)
+                _flat.paste(_img, mask= _img.split()[-1])
+                _img = _flat
+            elif not (_img.mode in ('RGB', 'L')):
+                _img = _img.convert('RGB')
+        except:
+            return None
+
+        _thumbs = dict()
+        for _size in reversed(self.SIZES):
+            _img = _img.copy()
+            _img.thumbnail((_size, _size), pil_image.LANCZOS)
+            _thumbs[_size] = _img
+            self.fnc_write(self.fnc_getThumbPath(img_path, stamp, _size), _img)
+        return _thumbs
+        # end of function
+    #!
+    # writes a thumbnail to the disk. The file is written under a temporary name, and then renamed, so that
+    #   a thumbnail is either complete or missing (never truncated).
+    # Args:
+    #   thumb_path : str
+    #       The path of the thumbnail (see fnc_getThumbPath(...)).
+    #   thumb : PIL image
+    #       The thumbnail.
+    # Returns: nothing.
+    def fnc_write(self, thumb_path, thumb):
+        _thumb_folder = os.path.dirname(thumb_path)
+        _tmp_path = None
+        try:
+            os.makedirs(_thumb_folder, exist_ok=True)
+            _fd, _tmp_path = tempfile.mkstemp(suffix='.tmp', dir=_thumb_folder)
+            with os.fdopen(_fd, 'wb') as _tmp_file:
+                thumb.save(_tmp_file, 'JPEG', quality=85)
+            os.replace(_tmp_path, thumb_path)
+            _tmp_path = None
+            _nbytes = os.path.getsize(thumb_path)
+        except:
+            if DEBUG_ENABLED:
+                print('thumbnail is not saved: ', thumb_path)
+            if not (_tmp_path is None):
+                try:
+                    os.remove(_tmp_path)
+                except:
+                    pass
+            return
+
+        with self.LOCK:
+            self.fnc_loadEntries()
+            if thumb_path in self.ENTRIES:
+                self.BYTES -= self.ENTRIES.pop(thumb_path)
+            self.ENTRIES[thumb_path] = _nbytes
+            self.BYTES += _nbytes
+            if self.BYTES > self.MAX_BYTES:
+                self.fnc_prune()
+        # end of function
+    #!
+    # marks a thumbnail as the most recently used one (its mtime is updated, thus this is kept between sessions).
+    # Args:
+    #   thumb_path : str
+    #       The path of the thumbnail.
+    # Returns: nothing.
+    def fnc_touch(self, thumb_path):
+        try:
+            os.utime(thumb_path)
+        except:
+            pass
+        with self.LOCK:
+            if (self.ENTRIES is not None) and (thumb_path in self.ENTRIES):
+                self.ENTRIES.move_to_end(thumb_path)
+        # end of function
+    #!
+    # finds all thumbnails on the disk (once), and orders them from the least to the most recently used.
+    #   This must be called with self.LOCK held.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_loadEntries(self):
+        if self.ENTRIES is not None:
+            return
+
+        _entries = []
+        try:
+            for _sub in os.scandir(self.CACHE_DIR):
+                if not _sub.is_dir():
+                    continue
+                for _entry in os.scandir(_sub.path):
+                    if _entry.name.endswith('.tmp'):
+                        continue
+                    try:
+                        _stat = _entry.stat()
+                    except:
+                        continue
+                    _entries.append((_stat.st_mtime, _entry.path, _stat.st_size))
+        except:
+            pass
+        _entries.sort()
+
+        self.ENTRIES = OrderedDict((_path, _nbytes) for _mtime, _path, _nbytes in _entries)
+        self.BYTES = sum(self.ENTRIES.values())
+        # end of function
+    #!
+    # removes the least recently used thumbnails until the cache takes 90% of the allowed space.
+    #   This must be called with self.LOCK held.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_prune(self):
+        _target = int(0.9 * self.MAX_BYTES)
+        while (self.BYTES > _target) and (len(self.ENTRIES) > 0):
+            _path, _nbytes = self.ENTRIES.popitem(last=False)
+            self.BYTES -= _nbytes
+            try:
+                os.remove(_path)
+            except:
+                pass
+            if DEBUG_ENABLED:
+                print('thumbnail is pruned: ', _path)
+        # end of function
+    # end of class ThumbnailStore
@@ -0,0 +1,656 @@
+import math
+import queue
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import ImageTk as pil_image_tk
+from PIL import Image as pil_image
+import tkinter as tk
+
+from lib import shch_img_browser_render as ShchRender
+from lib import shch_img_browser_io as ShchIO
+
+DEBUG_ENABLED = False
+
+# the bytes per pixel of the raw modes which can be decoded by regions (see ImgTileSource)
+RAW_PIXEL_BYTES = {'L': 1, 'LA': 2, 'La': 2,\
+                   'RGB': 3, 'BGR': 3, 'RGBX': 4, 'RGBA': 4, 'RGBa': 4, 'BGRX': 4, 'BGRA': 4, 'CMYK': 4,\
+                   'I;16': 2, 'I;16B': 2, 'I;16L': 2, 'I;16N': 2, 'I;32': 4, 'I;32B': 4, 'F;32F': 4, 'F;32BF': 4,\
+                   'RGB;16B': 6, 'RGB;16L': 6, 'RGBA;16B': 8, 'RGBA;16L': 8}
+# the most pixels of an image which the zoom view opens (a sanity bound, since the pixels are decoded by regions;
+#   Pillow's own bound, pil_image.MAX_IMAGE_PIXELS, is not changed, see fnc_OpenLarge(...))
+LARGE_MAX_PIXELS = 4 * 1024 * 1024 * 1024
+#!
+# opens an image file however large it is, up to LARGE_MAX_PIXELS (Pillow refuses to open images with more pixels
+#   than twice pil_image.MAX_IMAGE_PIXELS, which are taken for decompression bombs; here the pixels are decoded
+#   by regions, see ImgTileSource).
+#   The global pil_image.MAX_IMAGE_PIXELS is not changed, since other threads open images meanwhile: a file which
+#   Pillow refuses is identified again by fnc_OpenUnchecked(...), which checks the size against LARGE_MAX_PIXELS.
+# Args:
+#   img_file : file object
+#       The image file, opened for reading in the binary mode (it is not closed by Pillow).
+# Returns: image : PIL image
+#   The image is not loaded (only its header is read).
+def fnc_OpenLarge(img_file):
+    try:
+        return pil_image.open(img_file)
+    except pil_image.DecompressionBombError:
+        pass
+    img_file.seek(0)
+    _img = fnc_OpenUnchecked(img_file)
+    if _img.size[0] * _img.size[1] > LARGE_MAX_PIXELS:
+        raise pil_image.DecompressionBombError('the image has {} pixels, which is more than {}'.format(\
+                                               _img.size[0] * _img.size[1], LARGE_MAX_PIXELS))
+    return _img
+    # end of function
+#!
+# identifies an image file as pil_image.open(...) does, but without its decompression bomb check: the plugins of
+#   Pillow are tried one by one (the common ones first, then all of them).
+# Args:
+#   img_file : file object
+#       The image file, opened for reading in the binary mode.
+# Returns: image : PIL image
+#   The image is not loaded. pil_image.UnidentifiedImageError is raised if no plugin takes the file.
+def fnc_OpenUnchecked(img_file):
+    _prefix = img_file.read(16)
+    pil_image.preinit()
+    for _is_init in (False, True):
+        if _is_init:
+            pil_image.init()
+        for _id in pil_image.ID:
+            try:
+                _factory, _accept = pil_image.OPEN[_id]
+                # (newer Pillow returns a message, instead of False, for the files it knows but cannot open)
+                _result = (_accept is None) or _accept(_prefix)
+                if isinstance(_result, str) or not _result:
+                    continue
+                img_file.seek(0)
+                return _factory(img_file, '')
+            except (SyntaxError, IndexError, TypeError, struct.error):
+                continue
+    raise pil_image.UnidentifiedImageError('cannot identify image file')
+    # end of function
+
+class ImgTileSource():
+    __doc__ = """
+    decodes the tiles of the zoom pyramid of an image file (see ImgZoomView): the tile at level 0 is 1:1, and every
+        next level halves the resolution. The methods of this class can be called from worker threads.
+        If the pixels are stored in the file as they are (uncompressed TIFF, in strips or in tiles; BMP; PPM), only
+        the region of a tile is read from the file, thus the whole image is never in memory. The coarse levels read
+        every n-th row of the region only.
+        Other files (compressed ones) cannot be decoded by regions: they are decoded once at the resolution which
+        fits into max_pixels (JPEG files are decoded at a reduced resolution, see fnc_OpenReduced(...)), and
+        the tiles are cut from that image. Such files with more pixels than max_pixels cannot be zoomed.
+    Args:
+        img_path : str
+            The path to an image file.
+        kwargs : typical kwargs
+            'tile_size' : int
+                The size of tiles (in pixels). The default is 256.
+            'max_pixels' : int
+                The pixels of an image which is decoded as a whole. The default is 64M.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, img_path, **kwargs):
+        self.IMG_PATH = img_path
+        self.STAMP = ShchRender.fnc_GetFileStamp(img_path)
+        self.TILE_SIZE = kwargs['tile_size'] if 'tile_size' in kwargs else 256
+        self.MAX_PIXELS = kwargs['max_pixels'] if 'max_pixels' in kwargs else 64 * 1024 * 1024
+        self.CHUNK_WIDTH = 4096 # a region is decoded in chunks of this width, to limit the memory taken
+
+        self.SIZE = None
+        self.MODE = None
+        self.RAW_TILES = None # the raw tiles of the file, if it can be decoded by regions
+        self.BASE = None # the image decoded as a whole (if it cannot be decoded by regions) ...
+        self.BASE_FACTOR = 1 # ... and its reduction
+        self.LOCK = threading.Lock()
+        self.ERROR = None
+        try:
+            ShchIO.fnc_LoadPlugin(img_path)
+            with open(img_path, 'rb') as _file:
+                _img = fnc_OpenLarge(_file)
+                self.SIZE = _img.size
+                self.MODE = _img.mode
+                self.RAW_TILES = self.fnc_getRawTiles(_img)
+                _format = _img.format
+        except:
+            self.ERROR = 'the image cannot be opened'
+            return
+        if (self.RAW_TILES is None) and (self.SIZE[0] * self.SIZE[1] > self.MAX_PIXELS) and not (_format == 'JPEG'):
+            self.ERROR = 'the image is too large to be decoded as a whole (it is not stored uncompressed)'
+        # the coarsest level is the one which fits into a tile
+        self.MAX_LEVEL = 0 if (self.SIZE is None) else\
+            max(0, int(math.ceil(math.log(max(self.SIZE) / float(self.TILE_SIZE), 2))))
+        # end of __init__
+    #!
+    # returns the tiles of the file, if the pixels are stored uncompressed (see pil_image.tile), with their strides.
+    # Args:
+    #   image : PIL image
+    #       The opened image (not loaded).
+    # Returns: tiles : list
+    #   Every tile is (extents, offset, rawmode, stride, orientation). This is None if the image cannot be decoded
+    #   by regions.
+    def fnc_getRawTiles(self, image):
+        _tiles = []
+        try:
+            for _tile in image.tile:
+                _decoder, _extents, _offset, _args = _tile[0], _tile[1], _tile[2], _tile[3]
+                if not (_decoder == 'raw'):
+                    return None
+                _args = _args if isinstance(_args, tuple) else (_args,)
+                _rawmode = _args[0]
+                _stride = _args[1] if len(_args) > 1 else 0
+                _orientation = _args[2] if len(_args) > 2 else 1
+                if not (_rawmode in RAW_PIXEL_BYTES) or not (_orientation in (1, -1)) or (image.mode == 'P'):
+                    return None
+                if _stride <= 0:
+                    _stride = (_extents[2] - _extents[0]) * RAW_PIXEL_BYTES[_rawmode]
+                _tiles.append((tuple(_extents), _offset, _rawmode, _stride, _orientation))
+        except:
+            return None
+        return _tiles if (len(_tiles) > 0) else None
+        # end of function
+    #!
+    # decodes a region of the image from the file: only the rows of the region are read (and only their part which
+    #   is in the region), thus a tile costs the same however large the image is.
+    # Args:
+    #   box : tuple
+    #       (left, upper, right, lower) of the region, at level 0.
+    #   step : int
+    #       Every step-th row of the region is decoded (1 - all rows).
+    # Returns: image : PIL image
+    #   Its width is the width of the region, its height is the number of rows decoded.
+    def fnc_decodeRegion(self, box, step):
+        _x0, _y0, _x1, _y1 = box
+        _img = pil_image.new(self.MODE, (_x1 - _x0, (_y1 - _y0 + step - 1) // step))
+        with open(self.IMG_PATH, 'rb') as _file:
+            for (_tx0, _ty0, _tx1, _ty1), _offset, _rawmode, _stride, _orientation in self.RAW_TILES:
+                _ix0, _ix1 = max(_x0, _tx0), min(_x1, _tx1)
+                _iy0, _iy1 = max(_y0, _ty0), min(_y1, _ty1)
+                _first_row, _last_row = (_iy0 - _y0 + step - 1) // step, (_iy1 - 1 - _y0) // step
+                if (_ix0 >= _ix1) or (_first_row > _last_row):
+                    continue
+                _offset += (_ix0 - _tx0) * RAW_PIXEL_BYTES[_rawmode]
+                _row_bytes = (_ix1 - _ix0) * RAW_PIXEL_BYTES[_rawmode]
+                _data = bytearray()
+                for _row in range(_first_row, _last_row + 1):
+                    _y = _y0 + _row * step
+                    # the rows of some files (e.g. BMP) are stored bottom-up
+                    _file.seek(_offset + ((_y - _ty0) if (_orientation == 1) else (_ty1 - 1 - _y)) * _stride)
+                    _data += _file.read(_row_bytes).ljust(_row_bytes, b'\0')
+                _img.paste(pil_image.frombytes(self.MODE, (_ix1 - _ix0, _last_row - _first_row + 1), bytes(_data),\
+                                               'raw', _rawmode, _row_bytes, 1), (_ix0 - _x0, _first_row))
+        return _img
+        # end of function
+    #!
+    # decodes the whole image once (for the files which cannot be decoded by regions).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_loadBase(self):
+        with self.LOCK:
+            if not (self.BASE is None) or not (self.ERROR is None):
+                return
+            _width, _height = self.SIZE
+            _factor = 1
+            while (_width // _factor) * (_height // _factor) > self.MAX_PIXELS:
+                _factor *= 2
+            _result = ShchRender.fnc_OpenReduced(self.IMG_PATH, (max(1, _width // _factor), max(1, _height // _factor)))
+            if _result is None:
+                self.ERROR = 'the image cannot be decoded'
+                return
+            self.BASE = _result[0]
+            self.BASE_FACTOR = float(_width) / self.BASE.size[0]
+        # end of function
+    #!
+    # makes a tile of the pyramid.
+    # Args:
+    #   level : int
+    #       The pyramid level (0 is 1:1, the resolution halves with every level).
+    #   tile_x, tile_y : int
+    #       The column and the row of the tile at its level.
+    # Returns: tile : PIL image
+    #   Its size is self.TILE_SIZE, or less at the right and the bottom edges. This is None if the tile cannot be made.
+    def fnc_makeTile(self, level, tile_x, tile_y):
+        if not (self.ERROR is None):
+            return None
+        _factor = 2 ** level
+        _span = self.TILE_SIZE * _factor
+        _x0, _y0 = tile_x * _span, tile_y * _span
+        _x1, _y1 = min(self.SIZE[0], _x0 + _span), min(self.SIZE[1], _y0 + _span)
+        if (_x0 >= _x1) or (_y0 >= _y1):
+            return None
+        _size = ((_x1 - _x0 + _factor - 1) // _factor, (_y1 - _y0 + _factor - 1) // _factor)
+
+        try:
+            if self.RAW_TILES is None:
+                self.fnc_loadBase()
+                if self.BASE is None:
+                    return None
+                _box = tuple(int(_each / self.BASE_FACTOR) for _each in (_x0, _y0, _x1, _y1))
+                _box = (_box[0], _box[1], max(_box[0] + 1, _box[2]), max(_box[1] + 1, _box[3]))
+                return self.BASE.crop(_box).resize(_size, pil_image.BOX)
+
+            if _factor == 1:
+                return self.fnc_decodeRegion((_x0, _y0, _x1, _y1), 1)
+            # up to 4 rows are decoded for every row of the tile, and the region is decoded in chunks
+            _step = max(1, _factor // 4)
+            _chunk = max(_factor, self.CHUNK_WIDTH)
+            _tile = None
+            for _cx0 in range(_x0, _x1, _chunk):
+                _cx1 = min(_x1, _cx0 + _chunk)
+                _part = self.fnc_decodeRegion((_cx0, _y0, _cx1, _y1), _step)
+                _part = _part.resize(((_cx1 - _cx0 + _factor - 1) // _factor, _size[1]), pil_image.BOX)
+                if _tile is None:
+                    _tile = pil_image.new(_part.mode, _size)
+                _tile.paste(_part, ((_cx0 - _x0) // _factor, 0))
+            return _tile
+        except:
+            if DEBUG_ENABLED:
+                print('tile cannot be made: ', self.IMG_PATH, level, tile_x, tile_y)
+            return None
+        # end of function
+    # end of class ImgTileSource
+
+class TileCache():
+    __doc__ = """
+    keeps the most recently shown tiles of the zoom pyramids (see ImgTileSource), within a memory budget.
+        The key of a tile is the path and the stamp of its file, the level and the position of the tile.
+        The methods of this class are called from the Tk thread only.
+    Args:
+        max_bytes : int
+            The memory budget of the cache (in bytes).
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, max_bytes):
+        self.MAX_BYTES = max_bytes
+        self.BYTES = 0
+        self.TILES = OrderedDict() # key -> (tile, nbytes)
+        # end of __init__
+    #!
+    # returns a tile, if it is in the cache.
+    # Args:
+    #   key : tuple
+    #       (img_path, stamp, level, tile_x, tile_y).
+    # Returns: tile : PIL image
+    #   This is None if the tile is not in the cache.
+    def fnc_get(self, key):
+        if key in self.TILES:
+            self.TILES.move_to_end(key)
+            return self.TILES[key][0]
+        return None
+        # end of function
+    #!
+    # puts a tile into the cache. The least recently used tiles are dropped to stay within the budget.
+    # Args:
+    #   key : tuple
+    #       See fnc_get(...).
+    #   tile : PIL image
+    # Returns: nothing.
+    def fnc_put(self, key, tile):
+        if key in self.TILES:
+            self.BYTES -= self.TILES.pop(key)[1]
+        _nbytes = tile.size[0] * tile.size[1] * len(tile.getbands())
+        self.TILES[key] = (tile, _nbytes)
+        self.BYTES += _nbytes
+        while (self.BYTES > self.MAX_BYTES) and (len(self.TILES) > 1):
+            self.BYTES -= self.TILES.popitem(last=False)[1][1]
+        # end of function
+    # end of class TileCache
+
+class ImgZoomView():
+    __doc__ = """
+    shows an image at any zoom (from fitting the window to 1:1 and beyond) on a canvas, which can be dragged
+        with the mouse to pan. The mouse wheel (or +/-) zooms at the pointer, 1 zooms to 1:1, 0 fits the image into
+        the window, Escape closes the view.
+        Only the tiles of the pyramid which are visible are decoded (see ImgTileSource), in a pool of worker threads,
+        and passed back to the Tk loop through a queue which is polled with after(...). The pyramid is built lazily:
+        the coarsest level first (it is shown, enlarged, where the finer tiles are not ready yet), and then the tiles
+        the view needs.
+    Args:
+        parent : Tk widget
+            The widget to place the view in (it is packed into it).
+        img_path : str
+            The path to the image file.
+        tiles : TileCache
+            The cache of tiles (it is kept between the views).
+        callback : function
+            This is called (without arguments) when the view is to be closed.
+        kwargs : typical kwargs
+            'max_zoom' : float
+                The largest zoom (screen pixels per image pixel). The default is 8.
+            'font_size' : int
+                The font size of the zoom label.
+    Returns: instance of this class.
+    """
+    #!
+    def __init__(self, parent, img_path, tiles, callback, **kwargs):
+        self.IMG_PATH = img_path
+        self.TILES = tiles
+        self.callback = callback
+        self.MAX_ZOOM = kwargs['max_zoom'] if 'max_zoom' in kwargs else 8.
+        self.FONT_SIZE = kwargs['font_size'] if 'font_size' in kwargs else 10
+        self.POLL_INTERVAL = 25 # in ms.
+        self.ZOOM_STEP = 1.25
+
+        self.SOURCE = ImgTileSource(img_path)
+        self.TILE_SIZE = self.SOURCE.TILE_SIZE
+        self.ZOOM = None # screen pixels per image pixel (None until the view is laid out)
+        self.CENTER = (0., 0.) # the image point (at level 0) in the middle of the canvas
+        self.DRAG_FROM = None
+        self.ITEMS = dict() # (level, tile_x, tile_y) -> canvas item
+        self.PHOTOS = dict() # (level, tile_x, tile_y) -> (PhotoImage, is_final); for the current zoom only
+        self.WANTED = set() # the tiles which are still needed (see fnc_work(...))
+        self.REQUESTED = set() # the tiles submitted to the worker threads
+        self.FAILED = set()
+        self.EXECUTOR = ThreadPoolExecutor(max_workers=2)
+        self.RESULTS = queue.Queue()
+        self.POLL_QUEUE = []
+        self.IS_STOPPED = False
+
+        self.FRAME = tk.Frame(parent)
+        self.FRAME.pack(fill= 'both', expand= 'yes')
+        self.CANVAS = tk.Canvas(self.FRAME, highlightthickness= 0, background= '#404040')
+        self.CANVAS.pack(fill= 'both', expand= 'yes')
+        self.LABEL = self.CANVAS.create_text(8, 8, anchor= 'nw', fill= 'white', font= ('Times', self.FONT_SIZE))
+
+        self.CANVAS.bind('<Configure>', lambda event: self.fnc_refresh())
+        self.CANVAS.bind('<ButtonPress-1>', self.fnc_dragStart)
+        self.CANVAS.bind('<B1-Motion>', self.fnc_drag)
+        self.CANVAS.bind('<MouseWheel>', lambda event: self.fnc_zoomBy(\
+            self.ZOOM_STEP if event.delta > 0 else 1. / self.ZOOM_STEP, event.x, event.y))
+        self.CANVAS.bind('<Button-4>', lambda event: self.fnc_zoomBy(self.ZOOM_STEP, event.x, event.y))
+        self.CANVAS.bind('<Button-5>', lambda event: self.fnc_zoomBy(1. / self.ZOOM_STEP, event.x, event.y))
+        self.CANVAS.bind('<plus>', lambda event: self.fnc_zoomBy(self.ZOOM_STEP))
+        self.CANVAS.bind('<KP_Add>', lambda event: self.fnc_zoomBy(self.ZOOM_STEP))
+        self.CANVAS.bind('<minus>', lambda event: self.fnc_zoomBy(1. / self.ZOOM_STEP))
+        self.CANVAS.bind('<KP_Subtract>', lambda event: self.fnc_zoomBy(1. / self.ZOOM_STEP))
+        self.CANVAS.bind('1', lambda event: self.fnc_zoomTo(1.))
+        self.CANVAS.bind('0', lambda event: self.fnc_zoomTo(None))
+        self.CANVAS.bind('<Escape>', lambda event: self.callback())
+        self.CANVAS.focus_set()
+
+        # the coarsest level is made first, to be shown where the finer tiles are not ready yet
+        if self.SOURCE.ERROR is None:
+            self.fnc_submit((self.SOURCE.MAX_LEVEL, 0, 0))
+        # end of __init__
+    #!
+    # returns the zoom at which the whole image fits into the canvas.
+    # Args: none.
+    # Returns: zoom : float
+    def fnc_getFitZoom(self):
+        _width, _height = max(1, self.CANVAS.winfo_width()), max(1, self.CANVAS.winfo_height())
+        return min(1., float(_width) / self.SOURCE.SIZE[0], float(_height) / self.SOURCE.SIZE[1])
+        # end of function
+    #!
+    # sets the zoom, keeping the image point under the canvas point (x, y) in place.
+    # Args:
+    #   zoom : float
+    #       The new zoom; None fits the image into the canvas.
+    #   x, y : int
+    #       The canvas point (the middle of the canvas, if None).
+    # Returns: nothing.
+    def fnc_zoomTo(self, zoom, x= None, y= None):
+        if self.IS_STOPPED or not (self.SOURCE.ERROR is None) or (self.ZOOM is None):
+            return
+        _fit_zoom = self.fnc_getFitZoom()
+        if zoom is None:
+            self.ZOOM = _fit_zoom
+            self.CENTER = (self.SOURCE.SIZE[0] / 2., self.SOURCE.SIZE[1] / 2.)
+            self.fnc_refresh(is_zoomed=1)
+            return
+
+        _zoom = max(_fit_zoom, min(self.MAX_ZOOM, zoom))
+        _width, _height = self.CANVAS.winfo_width(), self.CANVAS.winfo_height()
+        _x = (_width / 2.) if (x is None) else x
+        _y = (_height / 2.) if (y is None) else y
+        # the image point under (x, y) ...
+        _px = self.CENTER[0] + (_x - _width / 2.) / self.ZOOM
+        _py = self.CENTER[1] + (_y - _height / 2.) / self.ZOOM
+        # ... stays under it
+        self.CENTER = (_px - (_x - _width / 2.) / _zoom, _py - (_y - _height / 2.) / _zoom)
+        self.ZOOM = _zoom
+        self.fnc_refresh(is_zoomed=1)
+        # end of function
+    #!
+    # changes the zoom by a factor (see fnc_zoomTo(...)).
+    # Args:
+    #   factor : float
+    #   x, y : int
+    #       The canvas point to zoom at (the middle of the canvas, if None).
+    # Returns: nothing.
+    def fnc_zoomBy(self, factor, x= None, y= None):
+        if not (self.ZOOM is None):
+            self.fnc_zoomTo(self.ZOOM * factor, x, y)
+        # end of function
+    #!
+    # callback for pressing the mouse button on the canvas: dragging starts.
+    # Args:
+    #   event : Tk event
+    # Returns: nothing.
+    def fnc_dragStart(self, event):
+        self.CANVAS.focus_set()
+        self.DRAG_FROM = (event.x, event.y)
+        # end of function
+    #!
+    # callback for moving the mouse with the button pressed: the image is dragged along.
+    # Args:
+    #   event : Tk event
+    # Returns: nothing.
+    def fnc_drag(self, event):
+        if (self.DRAG_FROM is None) or (self.ZOOM is None):
+            return
+        _dx, _dy = event.x - self.DRAG_FROM[0], event.y - self.DRAG_FROM[1]
+        self.DRAG_FROM = (event.x, event.y)
+        self.CENTER = (self.CENTER[0] - _dx / self.ZOOM, self.CENTER[1] - _dy / self.ZOOM)
+        self.fnc_refresh()
+        # end of function
+    #!
+    # returns the pyramid level the tiles are taken from at the current zoom: the finest level which is not finer
+    #   than the screen (thus the tiles are reduced, not enlarged, unless the zoom is beyond 1:1).
+    # Args: none.
+    # Returns: level : int
+    def fnc_getLevel(self):
+        if self.ZOOM >= 1.:
+            return 0
+        return max(0, min(self.SOURCE.MAX_LEVEL, int(math.floor(math.log(1. / self.ZOOM, 2) + 1e-9))))
+        # end of function
+    #!
+    # places the visible tiles on the canvas, and requests the missing ones.
+    # Args:
+    #   kwargs : typical kwargs
+    #       'is_zoomed' : <any value>
+    #           If this is set, the zoom has changed, thus the shown tiles are made anew.
+    # Returns: nothing.
+    def fnc_refresh(self, **kwargs):
+        if self.IS_STOPPED:
+            return
+        if not (self.SOURCE.ERROR is None):
+            self.CANVAS.itemconfigure(self.LABEL, text= 'Cannot zoom: {}. (Esc: back)'.format(self.SOURCE.ERROR))
+            return
+
+        _width, _height = max(1, self.CANVAS.winfo_width()), max(1, self.CANVAS.winfo_height())
+        if self.ZOOM is None:
+            # the first layout: the image fits into the canvas
+            self.ZOOM = self.fnc_getFitZoom()
+            self.CENTER = (self.SOURCE.SIZE[0] / 2., self.SOURCE.SIZE[1] / 2.)
+            kwargs['is_zoomed'] = 1
+        if 'is_zoomed' in kwargs:
+            [self.CANVAS.delete(_item) for _item in self.ITEMS.values()]
+            self.ITEMS = dict()
+            self.PHOTOS = dict()
+
+        # the image is kept on the canvas
+        _half_width, _half_height = _width / 2. / self.ZOOM, _height / 2. / self.ZOOM
+        _cx = min(max(self.CENTER[0], min(_half_width, self.SOURCE.SIZE[0] / 2.)),\
+                  max(self.SOURCE.SIZE[0] - _half_width, self.SOURCE.SIZE[0] / 2.))
+        _cy = min(max(self.CENTER[1], min(_half_height, self.SOURCE.SIZE[1] / 2.)),\
+                  max(self.SOURCE.SIZE[1] - _half_height, self.SOURCE.SIZE[1] / 2.))
+        self.CENTER = (_cx, _cy)
+
+        _level = self.fnc_getLevel()
+        _span = self.TILE_SIZE * (2 ** _level) # a tile covers this many image pixels
+        _left, _top = _cx - _half_width, _cy - _half_height
+        _columns = (self.SOURCE.SIZE[0] + _span - 1) // _span
+        _rows = (self.SOURCE.SIZE[1] + _span - 1) // _span
+        _first_x, _last_x = max(0, int(_left // _span)), min(_columns - 1, int((_left + 2 * _half_width) // _span))
+        _first_y, _last_y = max(0, int(_top // _span)), min(_rows - 1, int((_top + 2 * _half_height) // _span))
+
+        _visible = []
+        for _tile_y in range(_first_y, _last_y + 1):
+            for _tile_x in range(_first_x, _last_x + 1):
+                _visible.append((_level, _tile_x, _tile_y))
+        for _key in [_key for _key in self.ITEMS if not (_key in _visible)]:
+            self.CANVAS.delete(self.ITEMS.pop(_key))
+            self.PHOTOS.pop(_key, None)
+
+        for _key in _visible:
+            _x = int(round((_key[1] * _span - _left) * self.ZOOM))
+            _y = int(round((_key[2] * _span - _top) * self.ZOOM))
+            if not (_key in self.PHOTOS) or not self.PHOTOS[_key][1]:
+                _photo = self.fnc_getPhoto(_key)
+                if not (_photo is None):
+                    self.PHOTOS[_key] = _photo
+            if not (_key in self.ITEMS):
+                self.ITEMS[_key] = self.CANVAS.create_image(_x, _y, anchor= 'nw',\
+                    image= self.PHOTOS[_key][0] if (_key in self.PHOTOS) else '')
+            else:
+                self.CANVAS.coords(self.ITEMS[_key], _x, _y)
+                if _key in self.PHOTOS:
+                    self.CANVAS.itemconfigure(self.ITEMS[_key], image= self.PHOTOS[_key][0])
+        self.CANVAS.tag_raise(self.LABEL)
+        self.CANVAS.itemconfigure(self.LABEL, text= '{:.0f}%   {} x {}   (wheel: zoom, drag: pan, 1: 1:1, 0: fit, Esc: back)'.format(\
+            100. * self.ZOOM, self.SOURCE.SIZE[0], self.SOURCE.SIZE[1]))
+
+        # the visible tiles first (from the middle out), then the ones around them
+        _middle = ((_first_x + _last_x) / 2., (_first_y + _last_y) / 2.)
+        _visible.sort(key= lambda _key: abs(_key[1] - _middle[0]) + abs(_key[2] - _middle[1]))
+        _around = [(_level, _tile_x, _tile_y) for _tile_y in range(max(0, _first_y - 1), min(_rows, _last_y + 2))\
+                   for _tile_x in range(max(0, _first_x - 1), min(_columns, _last_x + 2))\
+                   if not ((_level, _tile_x, _tile_y) in _visible)]
+        self.WANTED = set(_visible + _around + [(self.SOURCE.MAX_LEVEL, 0, 0)])
+        for _key in _visible + _around:
+            self.fnc_submit(_key)
+        # end of function
+    #!
+    # returns the PhotoImage of a tile at the current zoom. If the tile is not ready, the part of a coarser tile
+    #   which covers it is enlarged instead (it is replaced when the tile is ready).
+    # Args:
+    #   key : tuple
+    #       (level, tile_x, tile_y).
+    # Returns: result : tuple
+    #   This is (PhotoImage, is_final), or None if there is nothing to show yet.
+    def fnc_getPhoto(self, key):
+        _level, _tile_x, _tile_y = key
+        for _coarse_level in range(_level, self.SOURCE.MAX_LEVEL + 1):
+            _shift = _coarse_level - _level
+            _coarse_key = (_coarse_level, _tile_x >> _shift, _tile_y >> _shift)
+            _tile = self.TILES.fnc_get((self.IMG_PATH, self.SOURCE.STAMP) + _coarse_key)
+            if _tile is None:
+                continue
+            if _shift > 0:
+                # the part of the coarse tile which covers this tile
+                _part = self.TILE_SIZE >> _shift
+                _px, _py = (_tile_x % (1 << _shift)) * _part, (_tile_y % (1 << _shift)) * _part
+                _box = (_px, _py, min(_tile.size[0], _px + _part), min(_tile.size[1], _py + _part))
+                if (_box[0] >= _box[2]) or (_box[1] >= _box[3]):
+                    continue
+                _tile = _tile.crop(_box)
+            # the size of the tile on the screen (at the current zoom)
+            _scale = self.ZOOM * (2 ** _coarse_level)
+            _size = (max(1, int(round(_tile.size[0] * _scale))), max(1, int(round(_tile.size[1] * _scale))))
+            try:
+                if not (_size == _tile.size):
+                    _tile = _tile.resize(_size, pil_image.NEAREST if (self.ZOOM >= 1.) else pil_image.BILINEAR)
+                return (pil_image_tk.PhotoImage(_tile), _shift == 0)
+            except:
+                return None
+        return None
+        # end of function
+    #!
+    # submits a tile to the worker threads, unless it is in the cache (or being made).
+    # Args:
+    #   key : tuple
+    #       (level, tile_x, tile_y).
+    # Returns: nothing.
+    def fnc_submit(self, key):
+        if (key in self.REQUESTED) or (key in self.FAILED) or\
+           not (self.TILES.fnc_get((self.IMG_PATH, self.SOURCE.STAMP) + key) is None):
+            return
+        self.WANTED.add(key)
+        self.REQUESTED.add(key)
+        self.EXECUTOR.submit(self.fnc_work, key)
+        if len(self.POLL_QUEUE) < 1:
+            self.POLL_QUEUE = [self.CANVAS.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # makes one tile. This runs in a worker thread and must not touch Tk.
+    #   The tiles which went out of sight before their turn came are skipped.
+    # Args:
+    #   key : tuple
+    #       (level, tile_x, tile_y).
+    # Returns: nothing.
+    def fnc_work(self, key):
+        if self.IS_STOPPED or not (key in self.WANTED):
+            self.RESULTS.put((key, None, True))
+            return
+        self.RESULTS.put((key, self.SOURCE.fnc_makeTile(*key), False))
+        # end of function
+    #!
+    # puts the made tiles into the cache, and shows them. This is called by the Tk loop (through after(...)) for
+    #   as long as there are tiles being made.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_poll(self):
+        self.POLL_QUEUE = []
+        if self.IS_STOPPED:
+            return
+
+        _is_changed = False
+        while True:
+            try:
+                _key, _tile, _is_skipped = self.RESULTS.get_nowait()
+            except queue.Empty:
+                break
+            self.REQUESTED.discard(_key)
+            if _is_skipped:
+                # the tile may have come into sight again (after it was skipped) while it was still requested
+                if _key in self.WANTED:
+                    self.fnc_submit(_key)
+                continue
+            if _tile is None:
+                self.FAILED.add(_key)
+                continue
+            self.TILES.fnc_put((self.IMG_PATH, self.SOURCE.STAMP) + _key, _tile)
+            _is_changed = True
+
+        if _is_changed:
+            self.fnc_refresh()
+        # fnc_submit(...) may have scheduled the next poll already
+        if (len(self.REQUESTED) > 0) and (len(self.POLL_QUEUE) < 1):
+            self.POLL_QUEUE = [self.CANVAS.after(self.POLL_INTERVAL, self.fnc_poll)]
+        # end of function
+    #!
+    # destroys the view and stops making tiles.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_stop(self):
+        self.IS_STOPPED = True
+        self.WANTED = set()
+        for _each in self.POLL_QUEUE:
+            try:
+                self.CANVAS.after_cancel(_each)
+            except:
+                pass
+        self.POLL_QUEUE = []
+        self.EXECUTOR.shutdown(wait=False)
+        self.PHOTOS = dict()
+        try:
+            self.FRAME.destroy()
+        except:
+            pass
+        # end of function
+    # end of class ImgZoomView
@@ -1,10 +1,22 @@
 import lib.shch_img_browser_lib as Shch
+import lib.shch_img_browser_render as ShchRender
+import lib.shch_img_browser_scan as ShchScan
+import lib.shch_img_browser_meta as ShchMeta
+import lib.shch_img_browser_sort as ShchSort
+import lib.shch_img_browser_io as ShchIO
+import lib.shch_img_browser_perf as ShchPerf
+# the modules of the views and features which are not needed to show the first image (the decode worker processes,
+#   the zoom view, the grid of thumbnails, animations, sessions, the folder index) are imported where they are
+#   first used, so that the browser starts sooner
+
+import os
+import time
 
-from PIL import ImageTk as pil_image_tk
 from PIL import Image as pil_image
 import tkinter as tk
 from tkinter import messagebox as tk_messagebox
 from tkinter import filedialog as tk_filedialog
+from tkinter import simpledialog as tk_simpledialog
 
 DEBUG_ENABLED = False
 
@@ -16,6 +28,17 @@ class ShchImgBrowser():
     This app is to browse image files in a specified folder.
     To select the folder of choice, use |Folder| > |Select Folder| in the main menu.
     To select/unselect image files' extensions use |Extensions| > |Select Extensions|.
+    To browse the subfolders too, use |Folder| > |Subfolders Too: On / Off|.
+    Images copied into (or deleted from) the folder show up (or disappear) without reloading the folder.
+    A folder is opened again at the image shown last in it (with its scale, rotation and flips).
+    The images can be sorted by name, date modified, size or date taken (|Browse| > |Sort by ...|).
+    Animated images (GIF, PNG, WebP) are played; autoplay waits for an animation to play once.
+    To see an image 1:1 (and closer), double-click it or use |Image| > |Zoom & Pan|: the mouse wheel zooms,
+    dragging pans, Escape goes back.
+    F12 (or |Mics| > |Performance Overlay|) shows how long the stages of showing an image take.
+    |Mics| > |Record Session| records what the browser is asked to do, so that it can be replayed
+    (see shch_img_browser_bench.py replay).
+    The arrow keys, PageUp/PageDown (10 images) and Home/End move through the images.
     The middle button under the shown image can be used to autoplay images.
     The sliding bar under it can be moved to adjust the frequency at which images are autoplayed.
     The two side buttons further under with the (-) and (+) symbols will change the image size.
@@ -23,10 +46,12 @@ class ShchImgBrowser():
     __doc__ = __program_version__ + __application_help__
     #!
     def __init__(self, tk_window_main):
-        self.CONFIG = Shch.ImgBrowserConfig()
+        self.START_TIME = time.perf_counter()
+        # on the first run the image folder is looked for once the window is shown (see fnc_startUp(...))
+        self.CONFIG = Shch.ImgBrowserConfig(start_dir_later=1)
 
         self.IMAGE_SCALES = (.1, .15, .2, .25, .3, .35, .4, .45, .5, .55, .6, .65, .7, .75) # predefined image scales (1 = full screen).
-        # self.CONFIG.IMAGE_SCALE_INDEX is normalized in the function  fnc_showImage(...)
+        # self.CONFIG.IMAGE_SCALE_INDEX is normalized in the function  fnc_getRenderParams(...)
         self.IMAGE_FLIP_LEFT_RIGHT = 0
         self.IMAGE_FLIP_TOP_BOTTOM = 0
         self.IMAGE_ROTATIONS = (None, pil_image.ROTATE_90, pil_image.ROTATE_180, pil_image.ROTATE_270)
@@ -39,14 +64,197 @@ class ShchImgBrowser():
         self.AUTOPLAY = 0 # if 0 - no autoplay; if 1 - autoplay (to be used by fnc_autoplay(...))
         self.AUTOPLAY_QUEUE = []
         self.AUTOPLAY_INTERVAL = 15 # in tics (one tic = 100 ms).
+        # the images are autoplayed on absolute deadlines (see fnc_autoplaySchedule(...)), thus the time it takes
+        #   to show an image does not add up to the interval
+        self.AUTOPLAY_DEADLINE = 0. # when the next image is to be on the screen (time.perf_counter())
+        self.AUTOPLAY_SHOW_TIME = 0. # how long it takes to show an image (a moving average, in seconds)
+        self.AUTOPLAY_TOLERANCE = .02 # an image shown later than this after its deadline misses it (in seconds)
+        self.AUTOPLAY_FRAMES = 0 # the images autoplayed ...
+        self.AUTOPLAY_MISSED = 0 # ... and how many of them missed their deadlines
+
+        # the images are resized with a fast filter while they are stepped through quickly (or autoplayed with
+        #   a short interval), and with the fine filter once the view has settled (see fnc_getQuality(...))
+        self.QUALITY_FAST_STEP = .35 # steps closer than this (in seconds) are quick
+        self.QUALITY_FAST_AUTOPLAY = 5 # autoplay intervals up to this (in tics) are short
+        self.QUALITY_QUEUE = [] # the pending fnc_refine(...)
+        self.QUALITY_PENDING = None # (img_path, params) of the fine image being rendered for fnc_refine(...)
+        self.LAST_STEP_TIME = 0. # see fnc_next(...)
+        self.IS_QUICK_STEP = False
+        # the keyboard navigation shows only the newest image asked for (see fnc_key(...))
+        self.NAV_DELAY = 10 # in ms. The keys pressed within this time are coalesced
+        self.NAV_QUEUE = [] # the pending fnc_navRender(...)
+        self.NAV_PENDING = None # (img_path, params) of the image being rendered for fnc_navRender(...)
+        # the timings of the stages of showing an image (see ShchPerf.PERF) are shown in the overlay, and logged
+        self.PERF_OVERLAY = None # the label of the overlay, when it is shown (see fnc_perfOverlay(...))
+        self.PERF_OVERLAY_QUEUE = []
+        self.PERF_OVERLAY_INTERVAL = 500 # in ms.
+        self.PERF_LOG_QUEUE = []
+        if self.CONFIG.PERF_LOG == 1:
+            ShchPerf.PERF.fnc_setLog(os.path.join(self.CONFIG.CACHE_PATH, 'perf.jsonl'))
 
         self.tk_main = tk_window_main
         self.tk_main.protocol("WM_DELETE_WINDOW", self.fnc_paintStop)
+        # keeps the recently shown images, so that they are not loaded again (see fnc_showImage(...))
+        self.FRAME_CACHE = ShchRender.FrameCache(self.CONFIG.FRAME_CACHE_MB * 1024 * 1024)
+        # decodes the images in worker processes, if this is enabled (DECODE_PROCESSES in the config file)
+        self.POOL = None
+        if self.CONFIG.DECODE_PROCESSES > 0:
+            import lib.shch_img_browser_pool as ShchPool
+            self.POOL = ShchPool.ImgDecodePool(self.CONFIG.DECODE_PROCESSES)
+        # renders the images next to the shown one in the background (see fnc_next(...)); with the worker processes,
+        #   as many images are rendered at once as there are processes
+        if self.POOL is None:
+            self.PREFETCHER = ShchRender.ImgPrefetcher(self.tk_main, self.FRAME_CACHE, workers=2, ahead=3, behind=1,\
+                                                       callback=self.fnc_prefetched)
+        else:
+            self.PREFETCHER = ShchRender.ImgPrefetcher(self.tk_main, self.FRAME_CACHE,\
+                workers= max(2, self.POOL.PROCESSES), ahead= max(3, self.POOL.PROCESSES), behind=1,\
+                callback=self.fnc_prefetched, pool=self.POOL)
+        # gets the rendered images from the frame cache, the prefetcher or the files (see fnc_showImage(...)); it keeps
+        #   the decoded working copy of the shown image, so that scaling, flipping and rotating it does not read
+        #   the file again
+        self.FRAMES = ShchRender.ImgFrameSource(self.FRAME_CACHE, self.PREFETCHER, max(self.IMAGE_SCALES),\
+                                                **({} if (self.POOL is None) else {'pool': self.POOL}))
+        # reads the image files further ahead into the page cache, so that the prefetcher does not wait for the disk
+        self.READ_AHEAD = ShchIO.ImgReadAhead(ahead= self.CONFIG.READ_AHEAD_FILES,\
+                                              max_bytes= self.CONFIG.READ_AHEAD_MB * 1024 * 1024)
+        # keeps small previews of the images on the disk (shared by all views which show previews); it is made when
+        #   the grid of thumbnails is first shown (see fnc_gridView(...))
+        self.THUMBNAILS = None
+        # keeps the header metadata (dimensions, format, capture date, ...) of the images, probed once per file
+        self.METADATA = ShchMeta.MetadataCache()
+        self.ANIMATION = None # plays the shown image, if it is animated (see fnc_showImage(...))
+        self.GRID = None # the grid of thumbnails, when it is shown (see fnc_gridView(...))
+        self.ZOOM = None # the zoom view, when it is shown (see fnc_zoomView(...))
+        # keeps the tiles of the zoom view, so that zooming back and forth does not decode them again; it is made
+        #   when the zoom view is first shown (see fnc_zoomView(...))
+        self.ZOOM_TILES = None
+        self.SCANNER = None # lists the image folder in the background (see fnc_paint(...))
+        self.WATCHER = None # reports the images added to / removed from the image folder (see fnc_paint(...))
+        self.INDEX = None # keeps the last known list of images of the image folder (see fnc_scanStart(...))
+        # the images loaded from self.INDEX (or resumed, see fnc_resume(...)), which the scanner has not found (yet)
+        self.INDEX_UNSEEN = None
+        self.SORTER = None # keeps the sort keys of the images (see fnc_sortList(...))
+        self.IMAGE_FILES_LIST = []
+        self.CURRENT_IMAGE_INDEX = 0
+        # records the operations to be replayed (see fnc_session(...)), if this is enabled (RECORD_SESSION in the config)
+        self.SESSION = None
+        if self.CONFIG.RECORD_SESSION == 1:
+            self.fnc_session(quiet=1)
+        self.START_DIR_FINDER = None # looks for the image folder on the first run (see fnc_startUp(...))
+        # where the browser is in the image folder is saved once it has not changed for a while (see fnc_positionLater(...)),
+        #   and the folder is opened there next time (see fnc_resume(...))
+        self.POSITION_QUEUE = []
+        self.POSITION_DELAY = 2000 # in ms.
+        self.POSITION_FOLDER = None # the folder self.IMAGE_FILES_LIST is of
         self.fnc_paintStart()
-        # below we use fnc_paint(...) to obtain the list of image files in a given folder (see self.CONFIG.IMAGE_FOLDER above)
-        self.fnc_paint()
+        self.fnc_perfLog(start=1)
+        # the window and its menus are shown first: the image folder is listed once the Tk loop runs
+        #   (see fnc_startUp(...)), thus the window does not wait for the disk
+        self.tk_main.update_idletasks()
+        self.STARTUP_QUEUE = [self.tk_main.after(1, self.fnc_startUp)]
         # end of __init__
     #!
+    # lists the image folder (see fnc_paint(...)), or, on the first run, looks for it in the background
+    #   (see ShchScan.ImgStartDirFinder). This is called by the Tk loop once the window is shown.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_startUp(self):
+        self.STARTUP_QUEUE = []
+        if self.IS_CLOSING:
+            return
+        ShchPerf.PERF.fnc_add('startup', self.START_TIME)
+
+        if self.CONFIG.IS_START_DIR_PENDING:
+            self.START_DIR_FINDER = ShchScan.ImgStartDirFinder(self.tk_main, self.CONFIG.IMAGE_FILE_EXTENSIONS,\
+                                                               self.CONFIG.HOME_DIR, self.fnc_startDir)
+            return
+        # below we use fnc_paint(...) to obtain the list of image files in a given folder (see self.CONFIG.IMAGE_FOLDER)
+        self.fnc_paint()
+        # end of function
+    #!
+    # lists the image folder found on the first run. This function is a callback used by the start folder finder
+    #   (see fnc_startUp(...)).
+    # Args:
+    #   image_folder : str
+    #       The found folder (None if none has been found).
+    # Returns: nothing.
+    def fnc_startDir(self, image_folder):
+        self.START_DIR_FINDER = None
+        self.CONFIG.fnc_setStartDir(image_folder)
+        self.fnc_paint()
+        # end of function
+    #!
+    # saves where the browser is in the image folder (see fnc_positionSave(...)) once it has not changed for
+    #   self.POSITION_DELAY ms, thus stepping through the images does not write the config for every image.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_positionLater(self):
+        if not (self.CONFIG.RESUME == 1):
+            return
+        [self.tk_main.after_cancel(_each) for _each in self.POSITION_QUEUE]
+        self.POSITION_QUEUE = [self.tk_main.after(self.POSITION_DELAY, self.fnc_positionSave)]
+        # end of function
+    #!
+    # saves where the browser is in the image folder: the current image, the image scale, the rotation and the flips
+    #   (see Shch.ImgBrowserConfig.fnc_setPosition(...)). The config is written in the background.
+    # Args:
+    #   kwargs : typical kwargs
+    #       'wait' : <any value>
+    #           If this is set, this function returns once the config has been written.
+    # Returns: nothing.
+    def fnc_positionSave(self, **kwargs):
+        [self.tk_main.after_cancel(_each) for _each in self.POSITION_QUEUE]
+        self.POSITION_QUEUE = []
+        if not (self.CONFIG.RESUME == 1) or (self.POSITION_FOLDER is None) or (len(self.IMAGE_FILES_LIST) < 1):
+            return
+
+        _index = max(0, min(self.CURRENT_IMAGE_INDEX, len(self.IMAGE_FILES_LIST) - 1))
+        self.CONFIG.fnc_setPosition(self.POSITION_FOLDER, self.IMAGE_FILES_LIST[_index],\
+            scale= self.CONFIG.IMAGE_SCALE_INDEX, rotation= self.IMAGE_ROTATION_INDEX,\
+            flip_lr= self.IMAGE_FLIP_LEFT_RIGHT, flip_tb= self.IMAGE_FLIP_TOP_BOTTOM)
+        self.CONFIG.fnc_save(positions=1, **({'wait': 1} if ('wait' in kwargs) else {}))
+        # end of function
+    #!
+    # goes to where the browser was when the image folder was left (see fnc_positionSave(...)). The image is found
+    #   by its name in the list loaded from the folder index; if it is not there, and the file is still in the folder,
+    #   it is put in the list at once (see self.INDEX_UNSEEN), thus it is shown before the folder has been listed.
+    #   This is called by fnc_paint(...) once the folder listing has been started.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_resume(self):
+        self.POSITION_FOLDER = self.CONFIG.IMAGE_FOLDER
+        if not (self.CONFIG.RESUME == 1):
+            return
+        _position = self.CONFIG.fnc_getPosition(self.CONFIG.IMAGE_FOLDER)
+        if _position is None:
+            return
+
+        _image_file = _position['file']
+        try:
+            self.CURRENT_IMAGE_INDEX = self.IMAGE_FILES_LIST.index(_image_file)
+        except ValueError:
+            if (len(os.path.dirname(_image_file)) > 0) and not (self.CONFIG.RECURSIVE == 1):
+                return
+            if not Shch.fnc_HasLegitExtension(os.path.basename(_image_file), self.CONFIG.IMAGE_FILE_EXTENSIONS):
+                return
+            if not Shch.fnc_IsExistingFile(Shch.fnc_GetImageFilePath(self.CONFIG.IMAGE_FOLDER, _image_file)):
+                return
+            if not (self.WATCHER is None):
+                self.WATCHER.fnc_seed([_image_file])
+            if self.INDEX_UNSEEN is None:
+                self.INDEX_UNSEEN = set()
+            # the scanner does not add it again; if it does not find it, it is removed (see fnc_scanBatch(...))
+            self.INDEX_UNSEEN.add(_image_file)
+            self.IMAGE_FILES_LIST.append(_image_file)
+            self.CURRENT_IMAGE_INDEX = len(self.IMAGE_FILES_LIST) - 1
+
+        self.CONFIG.IMAGE_SCALE_INDEX = _position['scale']
+        self.IMAGE_ROTATION_INDEX = _position['rotation'] % len(self.IMAGE_ROTATIONS)
+        self.IMAGE_FLIP_LEFT_RIGHT = 1 if (_position['flip_lr'] == 1) else 0
+        self.IMAGE_FLIP_TOP_BOTTOM = 1 if (_position['flip_tb'] == 1) else 0
+        # end of function
+    #!
     # shows little help about this application.
     # Args: none.
     # Returns: nothing.
@@ -61,6 +269,23 @@ class ShchImgBrowser():
         tk_messagebox.showinfo('About this program:', ShchImgBrowser.__program_version__)
         # end of function
     #!
+    # shows the counters of the cache of rendered images (to tune the cache budget, FRAME_CACHE_MB in the config file),
+    #   of the autoplay deadlines, and of reading the image files (see ShchIO.IO_STATS).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_cacheStats(self):
+        _stats = self.FRAME_CACHE.fnc_stats()
+        _io = ShchIO.IO_STATS.fnc_stats()
+        _lookups = _stats['hits'] + _stats['misses']
+        tk_messagebox.showinfo('Cache Statistics:',\
+            'hits: {}, misses: {} (hit rate: {:.0f}%)\nevictions: {}\nimages: {}, memory: {:.1f} MB of {:.0f} MB'.format(\
+            _stats['hits'], _stats['misses'], (100. * _stats['hits'] / _lookups) if _lookups > 0 else 0.,\
+            _stats['evictions'], _stats['frames'], _stats['bytes'] / 1048576., _stats['max_bytes'] / 1048576.) +\
+            '\nautoplayed: {}, missed deadlines: {}'.format(self.AUTOPLAY_FRAMES, self.AUTOPLAY_MISSED) +\
+            '\nfiles opened: {}, read: {:.1f} MB, blocked: {:.2f} s\nread ahead: {} files, {:.1f} MB'.format(\
+            _io['opened'], _io['bytes_read'] / 1048576., _io['blocked'], _io['advised'], _io['advised_bytes'] / 1048576.))
+        # end of function
+    #!
     # stops this program.It will show a prompt to confirm the user choice.
     # Args:
     #   kwargs : (typical kwargs)
@@ -77,25 +302,24 @@ class ShchImgBrowser():
 
     #!
     # starts construction of the slide show main window.
-    #   This method creates all menus.
+    #   This method creates all menus. It is called once: the fonts of the menus are changed in place
+    #   (see fnc_applyFonts(...)).
     # Args: none.
     # Returns: nothing.
     def fnc_paintStart(self, **kwargs):
-        if ('paint_again' in kwargs):
-            if len(self.__m__) > 0:
-                self.tk_menu_main.delete(0, len(self.__m__))
-        else:
-            self.tk_main.title('-- Shch Image Browser --')
-            if Shch.fnc_IsExistingFile(self.CONFIG.ICO_PATH):
-                self.tk_main.iconbitmap(self.CONFIG.ICO_PATH)
-            # creating a menu to be able to navigate to a desired folder, or select desired files' extentions, etc
-            self.tk_menu_main = tk.Menu(self.tk_main)
-            self.tk_main.config(menu= self.tk_menu_main)
-            # creating a dict to hold the references to the menu drop-downs
-            self.__m__ = dict()
-            # creating list to hold references to frames
-            self.__f__ = dict() # it is used extensively in fnc_paint(...)
-            self.IS_CLOSING = False
+        self.tk_main.title('-- Shch Image Browser --')
+        if Shch.fnc_IsExistingFile(self.CONFIG.ICO_PATH):
+            self.tk_main.iconbitmap(self.CONFIG.ICO_PATH)
+        # creating a menu to be able to navigate to a desired folder, or select desired files' extentions, etc
+        self.tk_menu_main = tk.Menu(self.tk_main)
+        self.tk_main.config(menu= self.tk_menu_main)
+        # creating a dict to hold the references to the menu drop-downs
+        self.__m__ = dict()
+        # creating list to hold references to frames
+        self.__f__ = dict() # it is used extensively in fnc_paint(...)
+        # creating list to hold the widgets which fonts follow the button scale: (widget, font family, font(...) kwarg)
+        self.__w__ = [] # it is used by fnc_applyFonts(...)
+        self.IS_CLOSING = False
 
         self.__m__['tk_menu_folder'] = tk.Menu(self.tk_menu_main, font=('TkTextFont', self.font(cuarto=1)))
         self.tk_menu_main.add_cascade(label= 'Folder', menu= self.__m__['tk_menu_folder'])
@@ -109,11 +333,15 @@ class ShchImgBrowser():
         self.tk_menu_main.add_cascade(label= 'Display', menu= self.__m__['tk_menu_display'])
         self.__m__['tk_menu_misc'] = tk.Menu(self.tk_menu_main, font=('TkTextFont', self.font(cuarto=1)))
         self.tk_menu_main.add_cascade(label= 'Mics', menu= self.__m__['tk_menu_misc'])
+        self.__w__ += [(self.__m__[_key], 'TkTextFont', 'cuarto') for _key in self.__m__]
 
         # creating menu commands
         # Folder commands
         self.__m__['tk_menu_folder'].add_command(label= 'Select Folder', command= self.fnc_selectImageFolder)
         self.__m__['tk_menu_folder'].add_command(label= '-?- Remember Folder', command= lambda: self.CONFIG.fnc_save(folder=1))
+        self.__m__['tk_menu_folder'].add_command(label= 'Subfolders Too: On / Off', command= self.fnc_recursive)
+        self.__m__['tk_menu_folder'].add_command(label= 'Include / Exclude Patterns', command= self.fnc_globs)
+        self.__m__['tk_menu_folder'].add_command(label= '-?- Remember Subfolder Settings', command= lambda: self.CONFIG.fnc_save(recursive=1))
 
         # Extensions commands
         self.__m__['tk_menu_extensions'].add_command(label= 'Select Extensions', command= lambda: self.fnc_adjustExtensions(0))
@@ -129,10 +357,18 @@ class ShchImgBrowser():
         self.__m__['tk_menu_image'].add_command(label= '|| Flip, Left-Right', command= lambda: self.fnc_flip(1))
         self.__m__['tk_menu_image'].add_command(label= '= Flip, Top-Buttom', command= lambda: self.fnc_flip(-1))
         self.__m__['tk_menu_image'].add_command(label= '. Reset', command= self.fnc_reset)
+        self.__m__['tk_menu_image'].add_command(label= '[1:1] Zoom && Pan', command= self.fnc_zoomView)
         self.__m__['tk_menu_image'].add_command(label= '-?- Remember Image Scale', command= lambda: self.CONFIG.fnc_save(image_scale=1))
 
         # Browser commands
         self.__m__['tk_menu_browser'].add_command(label= 'Play / Pause', command= lambda: self.fnc_autoplay())
+        self.__m__['tk_menu_browser'].add_command(label= '[::] Grid View', command= self.fnc_gridView)
+        self.__m__['tk_menu_browser'].add_command(label= 'Sort by Name', command= lambda: self.fnc_sort('name'))
+        self.__m__['tk_menu_browser'].add_command(label= 'Sort by Date Modified', command= lambda: self.fnc_sort('mtime'))
+        self.__m__['tk_menu_browser'].add_command(label= 'Sort by Size', command= lambda: self.fnc_sort('size'))
+        self.__m__['tk_menu_browser'].add_command(label= 'Sort by Date Taken', command= lambda: self.fnc_sort('taken'))
+        self.__m__['tk_menu_browser'].add_command(label= 'Reverse Order: On / Off', command= self.fnc_sortReverse)
+        self.__m__['tk_menu_browser'].add_command(label= '-?- Remember Sort Order', command= lambda: self.CONFIG.fnc_save(sort=1))
         self.__m__['tk_menu_browser'].add_command(label= '>> +10 Forward, Fast', command= lambda: self.fnc_next(10))
         self.__m__['tk_menu_browser'].add_command(label= '>> +25 Forward, Fast Super', command= lambda: self.fnc_next(25))
         self.__m__['tk_menu_browser'].add_command(label= '>>+100 Forward, Fast Ultra', command= lambda: self.fnc_next(100))
@@ -148,81 +384,151 @@ class ShchImgBrowser():
         # Miscellaneous commands
         self.__m__['tk_menu_misc'].add_command(label= 'Help', command= self.fnc_help)
         self.__m__['tk_menu_misc'].add_command(label= 'About', command= self.fnc_about)
+        self.__m__['tk_menu_misc'].add_command(label= 'Cache Statistics', command= self.fnc_cacheStats)
+        self.__m__['tk_menu_misc'].add_command(label= 'Performance Overlay: On / Off', command= self.fnc_perfOverlay)
+        self.__m__['tk_menu_misc'].add_command(label= 'Record Session: On / Off', command= self.fnc_session)
         self.__m__['tk_menu_misc'].add_command(label= 'Exit', command= self.fnc_exit)
         self.__m__['tk_menu_misc'].add_command(label= 'Remember & Exit', command= lambda: self.fnc_exit(save=1))
+
+        # keyboard navigation
+        self.tk_main.bind('<Left>', lambda event: self.fnc_key(-1))
+        self.tk_main.bind('<Right>', lambda event: self.fnc_key(1))
+        self.tk_main.bind('<Prior>', lambda event: self.fnc_key(-10))
+        self.tk_main.bind('<Next>', lambda event: self.fnc_key(10))
+        self.tk_main.bind('<Home>', lambda event: self.fnc_key(0, first=1))
+        self.tk_main.bind('<End>', lambda event: self.fnc_key(0, last=1))
+        self.tk_main.bind('<F12>', lambda event: self.fnc_perfOverlay())
         # end of function
     #!
     # completes constrution of the slide show main window.
     # Updates self.CURRENT_IMAGE_INDEX, self.IMAGE_FILES_LIST, paints the new image and (re)paints the buttons (again).
     #   This method display the zeroth image, and all functional buttons.
+    #   The image folder is listed in the background: the zeroth image is shown as soon as it is found, while the rest
+    #   of the list is being filled in (see fnc_scanBatch(...)).
     # Args:
     #   kwargs : typical keyword arguments
     #       'autoplay_cancel' : <any value>
     #           If this is set, autoplay will be canceled.
     #       'image_keep' : <any value>
-    #           This must be set before re-painting with the newly specified button/label sizes.
+    #           If this is set, the list of images and the current image are kept (e.g. when coming back from
+    #           the grid view).
     # Returns: nothing.
     def fnc_paint(self, **kwargs):
         if self.IS_CLOSING:
             return
+        if self.CONFIG.IS_START_DIR_PENDING:
+            if self.CONFIG.IMAGE_FOLDER is None:
+                # the image folder is still being looked for (see fnc_startDir(...))
+                return
+            # another folder has been selected in the meantime
+            if not (self.START_DIR_FINDER is None):
+                self.START_DIR_FINDER.fnc_stop()
+                self.START_DIR_FINDER = None
+            self.CONFIG.fnc_setStartDir(self.CONFIG.IMAGE_FOLDER)
 
         if 'autoplay_cancel' in kwargs:
             self.fnc_autoplay(stop=1)
 
+        if not (self.GRID is None):
+            self.GRID.fnc_stop()
+            self.GRID = None
+        if not (self.ZOOM is None):
+            self.ZOOM.fnc_stop()
+            self.ZOOM = None
+
+        # the frames are created once, and then only shown or hidden
+        [self.__f__[_key].pack_forget() for _key in self.__f__]
+
         if not ('image_keep' in kwargs):
+            # where the browser is in the folder shown so far
+            self.fnc_positionSave()
+            if not (self.ANIMATION is None):
+                self.ANIMATION.fnc_stop()
+                self.ANIMATION = None
             self.CURRENT_IMAGE_INDEX = 0
-            self.IMAGE_FILES_LIST = Shch.fnc_GetImageFileList(self.CONFIG.IMAGE_FOLDER, self.CONFIG.IMAGE_FILE_EXTENSIONS)
-
-        if len(self.__f__) > 0:
-            [self.__f__[_key].destroy() for _key in self.__f__]
+            self.IMAGE_FILES_LIST = []
+            if not (self.SCANNER is None):
+                self.SCANNER.fnc_stop()
+            if not (self.WATCHER is None):
+                self.WATCHER.fnc_stop()
+                self.WATCHER = None
+            if not (self.INDEX is None):
+                self.INDEX.fnc_stop()
+                self.INDEX = None
+            if not (self.SORTER is None):
+                self.SORTER.fnc_stop()
+            self.fnc_sessionFolder()
+            self.SCANNER = self.fnc_scanStart()
+            self.fnc_resume()
+            if len(self.IMAGE_FILES_LIST) < 1:
+                # the first image (or the warning) is shown by fnc_scanBatch(...)
+                return
 
         if len(self.IMAGE_FILES_LIST) < 1:
-            self.__f__['tk_frame_warning'] = tk.Frame(self.tk_main)
+            if not ('tk_frame_warning' in self.__f__):
+                self.fnc_paintWarning()
             self.__f__['tk_frame_warning'].pack(padx= 5, pady= 5)
-
-            self.tk_label_w_no_images_warning = tk.Label(
-                        self.__f__['tk_frame_warning'],
-                        text = "Hi! There are no legit images in the selected folder.", font = ('Times', 14),
-                        padx = 12, pady = 10,
-                        relief = tk.SUNKEN, bd = 8
-                        )
-            self.tk_label_showing_how_to_choose_folder = tk.Label(
-                        self.__f__['tk_frame_warning'],
-                        text = "To choose another folder use |Folder| > |Select Folder|.", font = ('Times', 14),
-                        padx = 2, pady = 10,
-                        relief = tk.RAISED, bd = 8
-                        )
-            self.tk_label_w_extensions_warning = tk.Label(
-                        self.__f__['tk_frame_warning'],
-                        text = "Also, check your image files' extensions (i.e. image types).", font = ('Times', 13),
-                        padx = 1, pady = 10,
-                        relief = tk.SUNKEN, bd = 8
-                        )
-            self.tk_label_showing_how_to_choose_extensions = tk.Label(
-                        self.__f__['tk_frame_warning'],
-                        text = "To select extensions use |Extensions| > |Select Extensions|.", font = ('Times', 13),
-                        padx = 6, pady = 10,
-                        relief = tk.RAISED, bd = 8
-                        )
-            self.tk_label_w_no_images_warning.pack(ipadx= 12, ipady= 10)
-            self.tk_label_showing_how_to_choose_folder.pack(ipadx= 6, ipady= 10)
-            self.tk_label_w_extensions_warning.pack(ipadx= 12, ipady= 10)
-            self.tk_label_showing_how_to_choose_extensions.pack(ipadx= 6, ipady= 10)
-
             return
 
+        if not ('tk_frame_image' in self.__f__):
+            self.fnc_paintViewer()
+        self.__f__['tk_frame_image'].pack(padx= 1, pady= 1)
+        self.__f__['tk_frame_button'].pack(padx= 1, pady= 1)
+        self.__f__['tk_frame_autoplay'].pack(padx= 3, pady= 1)
+        self.__f__['tk_frame_scale'].pack(padx= 5, pady= 5)
+
+        # loading and displaying the current image (the zeroth one, unless the folder is resumed, see fnc_resume(...)).
+        self.fnc_next(0)
+        # end of function
+    #!
+    # creates the frame with the warning shown when there are no images in the folder.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_paintWarning(self):
+        self.__f__['tk_frame_warning'] = tk.Frame(self.tk_main)
+
+        self.tk_label_w_no_images_warning = tk.Label(
+                    self.__f__['tk_frame_warning'],
+                    text = "Hi! There are no legit images in the selected folder.", font = ('Times', 14),
+                    padx = 12, pady = 10,
+                    relief = tk.SUNKEN, bd = 8
+                    )
+        self.tk_label_showing_how_to_choose_folder = tk.Label(
+                    self.__f__['tk_frame_warning'],
+                    text = "To choose another folder use |Folder| > |Select Folder|.", font = ('Times', 14),
+                    padx = 2, pady = 10,
+                    relief = tk.RAISED, bd = 8
+                    )
+        self.tk_label_w_extensions_warning = tk.Label(
+                    self.__f__['tk_frame_warning'],
+                    text = "Also, check your image files' extensions (i.e. image types).", font = ('Times', 13),
+                    padx = 1, pady = 10,
+                    relief = tk.SUNKEN, bd = 8
+                    )
+        self.tk_label_showing_how_to_choose_extensions = tk.Label(
+                    self.__f__['tk_frame_warning'],
+                    text = "To select extensions use |Extensions| > |Select Extensions|.", font = ('Times', 13),
+                    padx = 6, pady = 10,
+                    relief = tk.RAISED, bd = 8
+                    )
+        self.tk_label_w_no_images_warning.pack(ipadx= 12, ipady= 10)
+        self.tk_label_showing_how_to_choose_folder.pack(ipadx= 6, ipady= 10)
+        self.tk_label_w_extensions_warning.pack(ipadx= 12, ipady= 10)
+        self.tk_label_showing_how_to_choose_extensions.pack(ipadx= 6, ipady= 10)
+        # end of function
+    #!
+    # creates the frames with the image, and all functional buttons under it.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_paintViewer(self):
         # frame to place the image in
         self.__f__['tk_frame_image'] = tk.Frame(self.tk_main)
-        self.__f__['tk_frame_image'].pack(padx= 1, pady= 1)
         # frame for tk_button_back, tk_button_forward and tk_button_autoplay
         self.__f__['tk_frame_button'] = tk.Frame(self.tk_main)
-        self.__f__['tk_frame_button'].pack(padx= 1, pady= 1)
         # frame for tk_delay_scale
         self.__f__['tk_frame_autoplay'] = tk.Frame(self.tk_main)
-        self.__f__['tk_frame_autoplay'].pack(padx= 3, pady= 1)
         # frame for tk_scale_down, tk_scale_up and tk_exit_button
         self.__f__['tk_frame_scale'] = tk.Frame(self.tk_main)
-        self.__f__['tk_frame_scale'].pack(padx= 5, pady= 5)
 
         # button to autoplay, or move one image at a time either forward or back
         self.tk_button_back_fast = tk.Button(
@@ -298,107 +604,459 @@ class ShchImgBrowser():
         self.tk_button_exit.grid(row= 0, column= 1)
         self.tk_button_scale_up.grid(row= 0, column= 2)
 
-        # loading and displaying the zeroth image.
-        self.fnc_next(0)
+        # the labels with the image, its name and its info; they are filled in by fnc_showImage(...)
+        self.tk_label_w_img = tk.Label(
+                    self.__f__['tk_frame_image'],
+                    )
+        self.tk_label_w_img_name = tk.Label(
+                    self.__f__['tk_frame_image'],
+                    font = ('Times', self.font(segundo=1)),
+                    anchor= 'w'
+                    )
+        self.tk_label_w_img_info = tk.Label(
+                    self.__f__['tk_frame_image'],
+                    font = ('Times', self.font(segundo=1)),
+                    anchor= 'e'
+                    )
+        self.tk_label_w_img.grid(row= 0, column= 0, columnspan= 2, sticky="we")
+        self.tk_label_w_img.bind('<Double-Button-1>', lambda event: self.fnc_zoomView())
+        self.tk_label_w_img_name.grid(row= 1, column= 0, sticky='w')
+        self.tk_label_w_img_info.grid(row= 1, column= 1, sticky='e')
+
+        self.__w__ += [
+                    (self.tk_button_back_fast, 'Arial', 'primero'),
+                    (self.tk_button_back, 'Arial', 'primero'),
+                    (self.tk_button_autoplay, 'Helvetica', 'primero'),
+                    (self.tk_button_forward, 'Arial', 'primero'),
+                    (self.tk_button_forward_fast, 'Arial', 'primero'),
+                    (self.tk_scale_delay, 'TkTextFont', 'tercero'),
+                    (self.tk_button_scale_down, 'Arial', 'tercero'),
+                    (self.tk_button_exit, 'Arial', 'cuarto'),
+                    (self.tk_button_scale_up, 'Arial', 'tercero'),
+                    (self.tk_label_w_img_name, 'Times', 'segundo'),
+                    (self.tk_label_w_img_info, 'Times', 'segundo'),
+                    ]
+        # end of function
+    #!
+    # starts listing self.CONFIG.IMAGE_FOLDER (and its subfolders, in the recursive mode) in the background.
+    #   The found image files are passed to fnc_scanBatch(...). The watcher (if enabled) is started first, so that
+    #   no change made while the folder is being listed is missed.
+    #   If the folder index (if enabled) knows the folder, self.IMAGE_FILES_LIST is filled from it at once, and the
+    #   scanner only brings it up to date. The list is sorted once the folder has been listed (see fnc_sortList(...)).
+    # Args: none.
+    # Returns: scanner : ShchScan.ImgFolderScanner
+    def fnc_scanStart(self):
+        self.SORTER = ShchSort.ImgSortKeys(self.tk_main, self.CONFIG.IMAGE_FOLDER, self.METADATA, self.fnc_sortList)
+        _scan_kwargs = {'max_depth': self.CONFIG.RECURSIVE_DEPTH,\
+                        'include': self.CONFIG.INCLUDE_GLOBS, 'exclude': self.CONFIG.EXCLUDE_GLOBS}
+        if self.CONFIG.RECURSIVE == 1:
+            _scan_kwargs['recursive'] = 1
+        if self.CONFIG.WATCH_FOLDER == 1:
+            self.WATCHER = ShchScan.ImgFolderWatcher(\
+                    self.tk_main, self.CONFIG.IMAGE_FOLDER, self.CONFIG.IMAGE_FILE_EXTENSIONS, self.fnc_watchChanges,\
+                    **_scan_kwargs)
+            # the watcher is told about every folder the scanner walks
+            _scan_kwargs['on_folder'] = self.WATCHER.fnc_addFolder
+        if self.CONFIG.FOLDER_INDEX == 1:
+            import lib.shch_img_browser_index as ShchIndex
+            self.INDEX = ShchIndex.FolderIndex(self.CONFIG.CACHE_PATH, self.CONFIG.IMAGE_FOLDER,\
+                    ShchIndex.fnc_GetSignature(self.CONFIG.IMAGE_FILE_EXTENSIONS, **_scan_kwargs))
+            _image_files = self.INDEX.fnc_load()
+            if len(_image_files) > 0:
+                if not (self.WATCHER is None):
+                    _image_files = self.WATCHER.fnc_seed(_image_files)
+                self.IMAGE_FILES_LIST.extend(_image_files)
+                self.INDEX_UNSEEN = set(_image_files)
+        return ShchScan.ImgFolderScanner(\
+                    self.tk_main, self.CONFIG.IMAGE_FOLDER, self.CONFIG.IMAGE_FILE_EXTENSIONS, self.fnc_scanBatch,\
+                    **_scan_kwargs)
+        # end of function
+    #!
+    # appends the newly found image files to self.IMAGE_FILES_LIST.
+    #   This function is a callback used by the folder scanner (see fnc_paint(...)).
+    # Args:
+    #   image_files : list
+    #       The names of the newly found image files.
+    #   is_done : bool
+    #       This is True when the whole folder has been listed.
+    # Returns: nothing.
+    def fnc_scanBatch(self, image_files, is_done):
+        if self.IS_CLOSING:
+            return
+
+        _was_empty = len(self.IMAGE_FILES_LIST) < 1
+        if not (self.INDEX_UNSEEN is None):
+            # the files loaded from the folder index are in the list already
+            _new_files = []
+            for _image_file in image_files:
+                if _image_file in self.INDEX_UNSEEN:
+                    self.INDEX_UNSEEN.discard(_image_file)
+                else:
+                    _new_files.append(_image_file)
+            image_files = _new_files
+        if not (self.WATCHER is None):
+            # the files already reported (or removed) by the watcher are skipped
+            image_files = self.WATCHER.fnc_seed(image_files)
+        # the list is extended in place, since the grid view (if shown) reads it as it is
+        self.IMAGE_FILES_LIST.extend(image_files)
+        if is_done:
+            self.SCANNER = None
+
+        if _was_empty and ((len(self.IMAGE_FILES_LIST) > 0) or is_done):
+            # the zeroth image (or the warning, if there are no images at all)
+            self.fnc_paint(image_keep=1)
+        elif len(self.IMAGE_FILES_LIST) > 0:
+            self.fnc_updateButtons()
+
+        if is_done and not (self.INDEX_UNSEEN is None):
+            # the files loaded from the folder index, which are not in the folder any more
+            _gone_files = list(self.INDEX_UNSEEN)
+            self.INDEX_UNSEEN = None
+            if len(_gone_files) > 0:
+                if not (self.WATCHER is None):
+                    self.WATCHER.fnc_forget(_gone_files)
+                self.fnc_watchChanges([], _gone_files)
+        if is_done:
+            self.fnc_sortList()
+        if is_done and not (self.INDEX is None):
+            self.INDEX.fnc_update(self.IMAGE_FILES_LIST)
+        # end of function
+    #!
+    # applies the changes found by the folder watcher to self.IMAGE_FILES_LIST. The list is changed in place, and
+    #   the current image (and thus the autoplay position) is kept, unless it has been removed, in which case
+    #   the image which took its place is shown. A changed file is reported as removed and added: if it is
+    #   the current image, it stays the current one, and it is shown again.
+    #   This function is a callback used by the folder watcher (see fnc_scanStart(...)).
+    # Args:
+    #   added : list
+    #       The names of the image files which have appeared.
+    #   removed : list
+    #       The names of the image files which have disappeared.
+    # Returns: nothing.
+    def fnc_watchChanges(self, added, removed):
+        if self.IS_CLOSING:
+            return
+
+        _was_empty = len(self.IMAGE_FILES_LIST) < 1
+        _is_current_removed = False
+        _current_file = None
+        # the keys of the changed files are read again (a changed file is reported as removed and added)
+        self.SORTER.fnc_forget(removed + added)
+        if len(removed) > 0:
+            _removed = set(removed)
+            _index = self.CURRENT_IMAGE_INDEX
+            if _index < len(self.IMAGE_FILES_LIST):
+                _current_file = self.IMAGE_FILES_LIST[_index]
+                _is_current_removed = _current_file in _removed
+            # the images removed before the current one shift it to the left
+            self.CURRENT_IMAGE_INDEX -= sum(1 for _each in self.IMAGE_FILES_LIST[:_index] if _each in _removed)
+            self.IMAGE_FILES_LIST[:] = [_each for _each in self.IMAGE_FILES_LIST if not (_each in _removed)]
+        # the new images are put in their places in the sorted list (the images after the current one shift it)
+        _key = self.SORTER.fnc_getKey(self.CONFIG.SORT_MODE)
+        for _image_file in added:
+            _index = ShchSort.fnc_InsertSorted(self.IMAGE_FILES_LIST, _image_file, _key, self.CONFIG.SORT_REVERSE == 1)
+            if (_index <= self.CURRENT_IMAGE_INDEX) and (len(self.IMAGE_FILES_LIST) > 1):
+                self.CURRENT_IMAGE_INDEX += 1
+        if _is_current_removed and (_current_file in added):
+            # the current image has changed (it is shown again, see below)
+            self.CURRENT_IMAGE_INDEX = self.IMAGE_FILES_LIST.index(_current_file)
+        if (len(added) > 0) and not (self.CONFIG.SORT_MODE == 'name'):
+            # the keys of the new images are read, and the list is sorted again (see fnc_sortList(...))
+            self.fnc_sortList()
+
+        if _was_empty or (len(self.IMAGE_FILES_LIST) < 1):
+            if not (_was_empty and (len(self.IMAGE_FILES_LIST) < 1)):
+                self.fnc_paint(image_keep=1)
+        elif not (self.GRID is None):
+            self.GRID.fnc_refresh()
+        elif _is_current_removed:
+            self.fnc_next(0)
+        else:
+            self.fnc_updateButtons()
+        # end of function
+    #!
+    # sorts self.IMAGE_FILES_LIST (in place) in the selected sort mode (see self.CONFIG.SORT_MODE), keeping
+    #   the current image. If some sort keys are not known, they are read in the background first, and this function
+    #   is called again (by self.SORTER) when they are.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_sortList(self):
+        if self.IS_CLOSING or (self.SORTER is None) or (len(self.IMAGE_FILES_LIST) < 1):
+            return
+
+        # the sizes, the mtimes and the capture dates known from the folder index are loaded with the missing keys
+        if not self.SORTER.fnc_request(self.IMAGE_FILES_LIST, self.CONFIG.SORT_MODE,\
+                                       **({} if (self.INDEX is None) else {'index': self.INDEX})):
+            return
+
+        self.CURRENT_IMAGE_INDEX = max(0, min(self.CURRENT_IMAGE_INDEX, len(self.IMAGE_FILES_LIST) - 1))
+        _current_file = self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX]
+        self.IMAGE_FILES_LIST.sort(key= self.SORTER.fnc_getKey(self.CONFIG.SORT_MODE),\
+                                   reverse= self.CONFIG.SORT_REVERSE == 1)
+        self.CURRENT_IMAGE_INDEX = self.IMAGE_FILES_LIST.index(_current_file)
+
+        if not (self.GRID is None):
+            self.GRID.CURRENT_IMAGE_INDEX = self.CURRENT_IMAGE_INDEX
+            self.GRID.fnc_refresh()
+        elif 'tk_frame_image' in self.__f__:
+            self.fnc_next(0)
+        # end of function
+    #!
+    # selects the sort mode, and sorts the list of images.
+    # Args:
+    #   mode : str
+    #       One of ShchSort.SORT_MODES.
+    # Returns: nothing.
+    def fnc_sort(self, mode):
+        self.CONFIG.SORT_MODE = mode
+        self.fnc_sortList()
+        # end of function
+    #!
+    # switches the reverse sort order on or off, and sorts the list of images.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_sortReverse(self):
+        self.CONFIG.SORT_REVERSE = 0 if (self.CONFIG.SORT_REVERSE == 1) else 1
+        self.fnc_sortList()
         # end of function
     #!
     #
     def fnc_paintStop(self):
         self.IS_CLOSING = True
+        [self.tk_main.after_cancel(_each) for _each in self.STARTUP_QUEUE]
+        self.STARTUP_QUEUE = []
+        if not (self.START_DIR_FINDER is None):
+            self.START_DIR_FINDER.fnc_stop()
+        if not (self.SCANNER is None):
+            self.SCANNER.fnc_stop()
+        if not (self.WATCHER is None):
+            self.WATCHER.fnc_stop()
+        if not (self.INDEX is None):
+            self.INDEX.fnc_stop()
+        if not (self.SORTER is None):
+            self.SORTER.fnc_stop()
+        if not (self.ANIMATION is None):
+            self.ANIMATION.fnc_stop()
+        [self.tk_main.after_cancel(_each) for _each in self.PERF_OVERLAY_QUEUE + self.PERF_LOG_QUEUE]
+        self.PERF_OVERLAY_QUEUE = []
+        self.PERF_LOG_QUEUE = []
+        ShchPerf.PERF.fnc_flush()
+        if not (self.SESSION is None):
+            self.SESSION.fnc_close()
+        # the config (with where the browser is in the folder) is on the disk before this program stops
+        self.fnc_positionSave()
+        self.CONFIG.fnc_flush()
+        self.PREFETCHER.fnc_stop()
+        self.FRAMES.fnc_stop()
+        self.READ_AHEAD.fnc_stop()
+        if not (self.POOL is None):
+            self.POOL.fnc_stop()
+        if not (self.GRID is None):
+            self.GRID.fnc_stop()
+        if not (self.ZOOM is None):
+            self.ZOOM.fnc_stop()
         self.tk_main.destroy()
         # end of function
 
     #!
     # shows the image with the specified name residing in self.CONFIG.IMAGE_FOLDER.
+    #   If the image is animated, its first frame is shown at once, and then it is played (see ShchAnim.ImgAnimation).
+    #   The animation of the image shown before is paused (and dropped, unless it is this image again).
     # Args:
     #   image_file : str
     #       The name of an image file (for instance My 101thImage.jpg).
+    #   kwargs : typical kwargs
+    #       'fine' : <any value>
+    #           If this is set, the image is rendered in the fine quality (see fnc_getQuality(...)).
     # Returns: success_code : int
     #   This is 1 if success, and 0 otherwise
-    def fnc_showImage(self, image_file):
+    def fnc_showImage(self, image_file, **kwargs):
+        _show_start = time.perf_counter()
         _img_path = Shch.fnc_GetImageFilePath(self.CONFIG.IMAGE_FOLDER, image_file)
         _img_name = image_file
-        _img_okay = True
-        try:
-            _img = pil_image.open(_img_path)
-        except:
-            _img_okay = False
+        _img_params = self.fnc_getRenderParams(fine=1) if ('fine' in kwargs) else self.fnc_getRenderParams()
+        _session_params = _img_params
 
+        if not (self.ANIMATION is None) and not self.ANIMATION.fnc_isOf(_img_path, _img_params):
+            self.ANIMATION.fnc_stop()
+            self.ANIMATION = None
+        # the animation of this image goes on (e.g. when the fine image replaces the fast one)
+        _is_playing = not (self.ANIMATION is None) and self.ANIMATION.fnc_isPlaying()
+
+        # the image may have been shown recently, or it may have been already rendered in the background
+        #   (see fnc_next(...)); the image in the fine quality is taken if there is one
+        _frame, _img_params = self.FRAMES.fnc_getFrame(_img_path, _img_params)
+
+        _img_okay = not (_frame is None)
         if _img_okay:
-            # Here we flip the image
-            if not (self.IMAGE_FLIP_LEFT_RIGHT == 0):
-                try:
-                    _img = _img.transpose(pil_image.FLIP_LEFT_RIGHT)
-                except:
-                    pass
-            if not (self.IMAGE_FLIP_TOP_BOTTOM == 0):
-                try:
-                    _img = _img.transpose(pil_image.FLIP_TOP_BOTTOM)
-                except:
-                    pass
-
-            # Below the image is rotated (in 90 degree increments)
-            if not (self.IMAGE_ROTATION_INDEX == 0):
-                try:
-                    _img = _img.transpose(self.IMAGE_ROTATIONS[self.IMAGE_ROTATION_INDEX])
-                except:
-                    pass
-
-            _img_width, _img_height = _img.size
-            _img_info = 'width: {}, height: {}'.format(_img_width, _img_height)
-
-            _screen_width = self.tk_main.winfo_screenwidth()
-            _screen_height = self.tk_main.winfo_screenheight()
-            _width_ratio = float(_screen_width) /  float(_img_width)
-            _height_ratio = float (_screen_height) / float(_img_height)
-
-            # Here we are computing the desired image scale...
-            if self.CONFIG.IMAGE_SCALE_INDEX < 0:
-                self.CONFIG.IMAGE_SCALE_INDEX = 0
-            if self.CONFIG.IMAGE_SCALE_INDEX > (len(self.IMAGE_SCALES) - 1):
-                self.CONFIG.IMAGE_SCALE_INDEX = len(self.IMAGE_SCALES) - 1
-            _img_scale = self.IMAGE_SCALES[self.CONFIG.IMAGE_SCALE_INDEX] * (_width_ratio if (_width_ratio < _height_ratio) else _height_ratio)
-            _img_width = int(_img_scale * _img_width)
-            _img_height = int(_img_scale * _img_height)
-            # and loading and resizing the image
+            # the info text comes from the file header (see ShchMeta.fnc_ProbeImage(...))
+            _img_meta = self.METADATA.fnc_get(_img_path)
+            _img_info = ShchMeta.fnc_FormatInfo(_img_meta, _img_params[3]) if (_img_meta is not None) else _frame.INFO
             try:
-                self.img = pil_image_tk.PhotoImage(_img.resize((_img_width, _img_height), pil_image.ANTIALIAS))
+                self.img = _frame.fnc_getPhoto()
             except:
                 _img_okay = False
 
+        # the labels are reused: only their image and texts are changed
+        _widget_start = time.perf_counter()
+        if _img_okay and _is_playing:
+            pass
+        elif _img_okay:
+            self.tk_label_w_img.configure(image= self.img, text= '')
+        else:
+            self.tk_label_w_img.configure(image= '', text= "Bad Image", font= ('Arial', 16))
+        self.tk_label_w_img_name.configure(text= _img_name)
+        self.tk_label_w_img_info.configure(text= _img_info if _img_okay else "Bad Image",\
+                    fg= 'black' if _img_okay else 'red')
+        ShchPerf.PERF.fnc_add('widget', _widget_start)
+
+        # the image shown in the fast quality is replaced once the view has settled
+        [self.tk_main.after_cancel(_each) for _each in self.QUALITY_QUEUE]
+        self.QUALITY_QUEUE = []
+        self.QUALITY_PENDING = None
+        self.NAV_PENDING = None
+        if _img_okay and (_img_params[5] == 'fast'):
+            self.QUALITY_QUEUE = [self.tk_main.after(self.CONFIG.QUALITY_IDLE_MS, self.fnc_refine)]
+
+        if _img_okay and (_img_meta is not None) and _img_meta.get('animated'):
+            if self.ANIMATION is None:
+                import lib.shch_img_browser_anim as ShchAnim
+                self.ANIMATION = ShchAnim.ImgAnimation(self.tk_main, _img_path, _img_params, self.fnc_showFrame,\
+                                                       max_bytes= self.CONFIG.ANIMATION_CACHE_MB * 1024 * 1024)
+            self.ANIMATION.fnc_play()
+
+        _show_time = time.perf_counter() - _show_start
+        ShchPerf.PERF.fnc_record('show', _show_time)
+        self.fnc_sessionRecord('show', at= _show_start, file= image_file, params= _session_params,\
+                               ms= round(1000. * _show_time, 3))
+        self.fnc_positionLater()
+        if _img_okay:
+            return 1
+        return 0
+    #!
+    # shows a frame of the animated image. This function is a callback used by the animation (see fnc_showImage(...)).
+    # Args:
+    #   frame : ShchRender.RenderedFrame
+    #       The rendered frame.
+    # Returns: nothing.
+    def fnc_showFrame(self, frame):
+        if self.IS_CLOSING or not (self.GRID is None) or not (self.ZOOM is None):
+            return
         try:
-            self.tk_label_w_img.destroy()
-            self.tk_label_w_img_info.destroy()
-            self.tk_label_w_img_name.destroy()
+            self.img = frame.fnc_getPhoto()
         except:
-            pass
-        self.tk_label_w_img = tk.Label(
-                    self.__f__['tk_frame_image'],
-                    image = self.img,
-                    ) if _img_okay else\
-                    tk.Label(
-                    self.__f__['tk_frame_image'],
-                    text = "Bad Image", font = ('Arial', 16),
-                    )
-        self.tk_label_w_img_name = tk.Label(
-                    self.__f__['tk_frame_image'],
-                    text = _img_name, font = ('Times', self.font(segundo=1)),
-                    anchor= 'w'
-                    )
-        self.tk_label_w_img_info = tk.Label(
-                    self.__f__['tk_frame_image'],
-                    text = _img_info if _img_okay else "Bad Image",
-                    font = ('Times', self.font(segundo=1)),  fg = 'black' if _img_okay else 'red',
-                    anchor= 'e'
+            return
+        _start = time.perf_counter()
+        self.tk_label_w_img.configure(image= self.img, text= '')
+        ShchPerf.PERF.fnc_add('widget', _start)
+        # end of function
+    #!
+    # shows (or hides) the overlay with the recent timings of the stages of showing an image (see ShchPerf.PERF).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_perfOverlay(self):
+        [self.tk_main.after_cancel(_each) for _each in self.PERF_OVERLAY_QUEUE]
+        self.PERF_OVERLAY_QUEUE = []
+        if not (self.PERF_OVERLAY is None):
+            self.PERF_OVERLAY.destroy()
+            self.PERF_OVERLAY = None
+            return
+
+        self.PERF_OVERLAY = tk.Label(
+                    self.tk_main,
+                    font= ('Courier', self.font(tercero=1)), fg= '#00ff00', bg= 'black',
+                    justify= 'left', anchor= 'nw',
                     )
+        self.PERF_OVERLAY.place(x= 0, y= 0)
+        self.fnc_perfOverlayUpdate()
+        # end of function
+    #!
+    # refreshes the overlay (see fnc_perfOverlay(...)), for as long as it is shown.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_perfOverlayUpdate(self):
+        self.PERF_OVERLAY_QUEUE = []
+        if self.IS_CLOSING or (self.PERF_OVERLAY is None):
+            return
 
-        self.tk_label_w_img.grid(row= 0, column= 0, columnspan= 2, sticky="we")
-        self.tk_label_w_img_name.grid(row= 1, column= 0, sticky='w')
-        self.tk_label_w_img_info.grid(row= 1, column= 1, sticky='e')
+        _lines = ['{:<12}{:>9}{:>9}{:>9}{:>5}'.format('stage, ms', 'last', 'median', 'max', 'n')]
+        for _stage, _last, _median, _max, _count in ShchPerf.PERF.fnc_recent():
+            _lines.append('{:<12}{:>9.1f}{:>9.1f}{:>9.1f}{:>5}'.format(_stage, _last, _median, _max, _count))
+        _lines.append('autoplayed: {}, missed: {}'.format(self.AUTOPLAY_FRAMES, self.AUTOPLAY_MISSED))
+        self.PERF_OVERLAY.configure(text= '\n'.join(_lines))
+        # the overlay stays above the views which are shown after it
+        self.PERF_OVERLAY.lift()
+        self.PERF_OVERLAY_QUEUE = [self.tk_main.after(self.PERF_OVERLAY_INTERVAL, self.fnc_perfOverlayUpdate)]
+        # end of function
+    #!
+    # writes the histograms of the timings to the log (see ShchPerf.PerfRecorder.fnc_flush(...)) every
+    #   self.CONFIG.PERF_LOG_INTERVAL_S seconds.
+    # Args:
+    #   kwargs : typical kwargs
+    #       'start' : <any value>
+    #           If this is set, nothing is written now (the first interval starts).
+    # Returns: nothing.
+    def fnc_perfLog(self, **kwargs):
+        self.PERF_LOG_QUEUE = []
+        if self.IS_CLOSING or not (self.CONFIG.PERF_LOG == 1):
+            return
+        if not ('start' in kwargs):
+            ShchPerf.PERF.fnc_flush()
+        self.PERF_LOG_QUEUE = [self.tk_main.after(1000 * max(1, self.CONFIG.PERF_LOG_INTERVAL_S), self.fnc_perfLog)]
+        # end of function
+    #!
+    # starts (or stops) recording what the browser is asked to do (see ShchSession.SessionRecorder); the session
+    #   is written to CACHE_PATH/sessions/ and can be replayed with shch_img_browser_bench.py replay.
+    # Args:
+    #   kwargs : typical kwargs
+    #       'quiet' : <any value>
+    #           If this is set, the path to the session is not shown.
+    # Returns: nothing.
+    def fnc_session(self, **kwargs):
+        if not (self.SESSION is None):
+            self.SESSION.fnc_close()
+            if not ('quiet' in kwargs):
+                tk_messagebox.showinfo('Record Session:', 'The session is saved to\n' + self.SESSION.SESSION_PATH)
+            self.SESSION = None
+            return
 
-        if _img_okay:
-            return 1
-        return 0
+        import lib.shch_img_browser_session as ShchSession
+        try:
+            self.SESSION = ShchSession.SessionRecorder(ShchSession.fnc_GetSessionPath(self.CONFIG.CACHE_PATH),\
+                max_scale= max(self.IMAGE_SCALES), frame_cache_mb= self.CONFIG.FRAME_CACHE_MB,\
+                read_ahead_files= self.CONFIG.READ_AHEAD_FILES, read_ahead_mb= self.CONFIG.READ_AHEAD_MB,\
+                decode_processes= self.CONFIG.DECODE_PROCESSES)
+        except:
+            if not ('quiet' in kwargs):
+                tk_messagebox.showinfo('Record Session:', 'The session cannot be recorded')
+            return
+        # the folder being shown is where the replay starts (otherwise it is recorded when it is listed)
+        if len(self.IMAGE_FILES_LIST) > 0:
+            self.fnc_sessionFolder()
+        if not ('quiet' in kwargs):
+            tk_messagebox.showinfo('Record Session:', 'The session is being recorded to\n' + self.SESSION.SESSION_PATH)
+        # end of function
+    #!
+    # records an operation, if the session is being recorded (see fnc_session(...)).
+    # Args:
+    #   op : str
+    #   kwargs : see ShchSession.SessionRecorder.fnc_record(...)
+    # Returns: nothing.
+    def fnc_sessionRecord(self, op, **kwargs):
+        if self.SESSION is None:
+            return
+        self.SESSION.fnc_record(op, **kwargs)
+        # end of function
+    #!
+    # records the image folder and how it is listed, if the session is being recorded (see fnc_session(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_sessionFolder(self):
+        self.fnc_sessionRecord('folder', folder= self.CONFIG.IMAGE_FOLDER, extensions= self.CONFIG.IMAGE_FILE_EXTENSIONS,\
+            recursive= self.CONFIG.RECURSIVE, depth= self.CONFIG.RECURSIVE_DEPTH,\
+            include= self.CONFIG.INCLUDE_GLOBS, exclude= self.CONFIG.EXCLUDE_GLOBS,\
+            sort= self.CONFIG.SORT_MODE, reverse= self.CONFIG.SORT_REVERSE)
+        # end of function
     #!
     # shows the next image (from self.IMAGE_FILES_LIST).
     #   This function is used as a callback by the back and forward buttons.
@@ -407,23 +1065,199 @@ class ShchImgBrowser():
     #   This is used to obtain the index of the next image. If the new index is less than zero, it will be equated to zero.
     #   If the new index is greater than the last index in the file_list, it will be equated to the last index.
     def fnc_next(self, increment):
-        if len(self.IMAGE_FILES_LIST) < 1:
+        if (len(self.IMAGE_FILES_LIST) < 1) or not (self.GRID is None) or not (self.ZOOM is None):
             return
 
         self.CURRENT_IMAGE_INDEX += increment
         _last_image_index = len(self.IMAGE_FILES_LIST) - 1
+        if not (increment == 0):
+            # see fnc_getQuality(...)
+            _step_time = time.perf_counter()
+            self.IS_QUICK_STEP = (_step_time - self.LAST_STEP_TIME) < self.QUALITY_FAST_STEP
+            self.LAST_STEP_TIME = _step_time
 
         if self.CURRENT_IMAGE_INDEX < 0:
             self.CURRENT_IMAGE_INDEX = 0
         if  self.CURRENT_IMAGE_INDEX > _last_image_index:
             self.CURRENT_IMAGE_INDEX = _last_image_index
 
+        self.fnc_updateButtons()
+
+        _success_code = self.fnc_showImage(self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX])
+
+        # getting the neighbours of the shown image ready in the background
+        if self.AUTOPLAY == 1:
+            self.PREFETCHER.fnc_schedule(self.CONFIG.IMAGE_FOLDER, self.IMAGE_FILES_LIST, self.CURRENT_IMAGE_INDEX,\
+                self.fnc_getRenderParams(), wrap=1)
+            self.READ_AHEAD.fnc_schedule(self.CONFIG.IMAGE_FOLDER, self.IMAGE_FILES_LIST, self.CURRENT_IMAGE_INDEX,\
+                wrap=1)
+        else:
+            self.PREFETCHER.fnc_schedule(self.CONFIG.IMAGE_FOLDER, self.IMAGE_FILES_LIST, self.CURRENT_IMAGE_INDEX,\
+                self.fnc_getRenderParams())
+            self.READ_AHEAD.fnc_schedule(self.CONFIG.IMAGE_FOLDER, self.IMAGE_FILES_LIST, self.CURRENT_IMAGE_INDEX)
+        self.fnc_sessionRecord('next', increment= increment, index= self.CURRENT_IMAGE_INDEX,\
+                               file= self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX], params= self.fnc_getRenderParams())
+        # end of function
+    #!
+    # enables/disables the back and forward buttons, depending on where the current image is in the list.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_updateButtons(self):
+        if not ('tk_frame_button' in self.__f__):
+            return
+
+        _last_image_index = len(self.IMAGE_FILES_LIST) - 1
         self.tk_button_back_fast['state'] =  'disabled' if (self.CURRENT_IMAGE_INDEX <= 0) else 'active'
         self.tk_button_back['state'] =  'disabled' if (self.CURRENT_IMAGE_INDEX <= 0) else 'active'
         self.tk_button_forward['state'] = 'disabled' if (self.CURRENT_IMAGE_INDEX >= _last_image_index) else 'active'
         self.tk_button_forward_fast['state'] = 'disabled' if (self.CURRENT_IMAGE_INDEX >= _last_image_index) else 'active'
+        # end of function
+    #!
+    # returns the parameters the images are to be rendered with (see ShchRender.fnc_RenderImage(...)).
+    #   Also, self.CONFIG.IMAGE_SCALE_INDEX is normalized here.
+    # Args: none.
+    # Returns: params : tuple
+    #   This is (scale, flip_left_right, flip_top_bottom, rotation, screen_size).
+    def fnc_getRenderParams(self, **kwargs):
+        # Here we are computing the desired image scale...
+        if self.CONFIG.IMAGE_SCALE_INDEX < 0:
+            self.CONFIG.IMAGE_SCALE_INDEX = 0
+        if self.CONFIG.IMAGE_SCALE_INDEX > (len(self.IMAGE_SCALES) - 1):
+            self.CONFIG.IMAGE_SCALE_INDEX = len(self.IMAGE_SCALES) - 1
+
+        _screen_size = (self.tk_main.winfo_screenwidth(), self.tk_main.winfo_screenheight())
+        return (self.IMAGE_SCALES[self.CONFIG.IMAGE_SCALE_INDEX],\
+            self.IMAGE_FLIP_LEFT_RIGHT, self.IMAGE_FLIP_TOP_BOTTOM,\
+            self.IMAGE_ROTATIONS[self.IMAGE_ROTATION_INDEX], _screen_size,\
+            'fine' if ('fine' in kwargs) else self.fnc_getQuality())
+        # end of function
+    #!
+    # returns the render quality (see ShchRender.RESAMPLE_FILTERS): 'fast' while the images are stepped through
+    #   quickly, or autoplayed with a short interval, and 'fine' otherwise.
+    # Args: none.
+    # Returns: quality : str
+    def fnc_getQuality(self):
+        if (self.AUTOPLAY == 1) and (self.tk_scale_delay.get() <= self.QUALITY_FAST_AUTOPLAY):
+            return 'fast'
+        if self.IS_QUICK_STEP and (time.perf_counter() - self.LAST_STEP_TIME < self.QUALITY_FAST_STEP):
+            return 'fast'
+        return 'fine'
+        # end of function
+    #!
+    # replaces the image shown in the fast quality with the fine one, once the view has settled.
+    #   The fine image is rendered from the working copy, or in the background (see fnc_prefetched(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_refine(self):
+        self.QUALITY_QUEUE = []
+        if self.IS_CLOSING or (len(self.IMAGE_FILES_LIST) < 1) or not (self.GRID is None) or\
+           not (self.ZOOM is None):
+            return
 
-        _success_code = self.fnc_showImage(self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX])
+        self.IS_QUICK_STEP = False
+        _image_file = self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX]
+        _img_path = Shch.fnc_GetImageFilePath(self.CONFIG.IMAGE_FOLDER, _image_file)
+        _img_params = self.fnc_getRenderParams(fine=1)
+        # the neighbours are prepared in the fine quality too
+        self.PREFETCHER.fnc_schedule(self.CONFIG.IMAGE_FOLDER, self.IMAGE_FILES_LIST, self.CURRENT_IMAGE_INDEX,\
+            _img_params, **({'wrap': 1} if (self.AUTOPLAY == 1) else {}))
+        self.fnc_sessionRecord('refine', index= self.CURRENT_IMAGE_INDEX, file= _image_file, params= _img_params)
+
+        if self.FRAMES.fnc_hasMaster(_img_path) or self.FRAME_CACHE.fnc_has(_img_path, _img_params):
+            self.fnc_showImage(_image_file, fine=1)
+        else:
+            self.QUALITY_PENDING = (_img_path, _img_params)
+            self.PREFETCHER.fnc_request(_img_path, _img_params)
+        # end of function
+    #!
+    # moves to another image in response to a key. The image name and the buttons follow the key at once, but
+    #   the image itself is shown only if it is ready; otherwise it is rendered in the background, and the keys
+    #   pressed in the meantime only change which image is to be shown (see fnc_navRender(...)). Thus holding a key
+    #   moves through the images as fast as the key repeats.
+    # Args:
+    #   increment : int
+    #       See fnc_next(...).
+    #   kwargs : typical kwargs
+    #       'first' : <any value>
+    #           If this is set, the first image is shown.
+    #       'last' : <any value>
+    #           If this is set, the last image is shown.
+    # Returns: nothing.
+    def fnc_key(self, increment, **kwargs):
+        if (len(self.IMAGE_FILES_LIST) < 1) or not (self.GRID is None) or not (self.ZOOM is None) or\
+           not ('tk_frame_image' in self.__f__):
+            return
+
+        _last_image_index = len(self.IMAGE_FILES_LIST) - 1
+        if 'first' in kwargs:
+            _index = 0
+        elif 'last' in kwargs:
+            _index = _last_image_index
+        else:
+            _index = max(0, min(self.CURRENT_IMAGE_INDEX + increment, _last_image_index))
+        if _index == self.CURRENT_IMAGE_INDEX:
+            return
+
+        _step_time = time.perf_counter()
+        self.IS_QUICK_STEP = (_step_time - self.LAST_STEP_TIME) < self.QUALITY_FAST_STEP
+        self.LAST_STEP_TIME = _step_time
+        self.CURRENT_IMAGE_INDEX = _index
+        if not (self.ANIMATION is None):
+            # the animated image is not shown any more
+            self.ANIMATION.fnc_pause()
+        self.fnc_updateButtons()
+        self.tk_label_w_img_name.configure(text= self.IMAGE_FILES_LIST[_index])
+        self.fnc_sessionRecord('key', increment= increment, index= _index, file= self.IMAGE_FILES_LIST[_index])
+
+        if len(self.NAV_QUEUE) < 1:
+            self.NAV_QUEUE = [self.tk_main.after(self.NAV_DELAY, self.fnc_navRender)]
+        # end of function
+    #!
+    # shows the image selected with the keys (see fnc_key(...)) if it is ready, or requests it to be rendered
+    #   (the requests for the images passed by in the meantime are dropped).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_navRender(self):
+        self.NAV_QUEUE = []
+        if self.IS_CLOSING or (len(self.IMAGE_FILES_LIST) < 1) or not (self.GRID is None) or\
+           not (self.ZOOM is None):
+            return
+
+        _image_file = self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX]
+        _img_path = Shch.fnc_GetImageFilePath(self.CONFIG.IMAGE_FOLDER, _image_file)
+        _img_params = self.fnc_getRenderParams()
+        if self.FRAME_CACHE.fnc_has(_img_path, _img_params) or\
+           self.FRAME_CACHE.fnc_has(_img_path, _img_params[:5] + ('fine',)):
+            self.NAV_PENDING = None
+            self.fnc_next(0)
+            return
+
+        self.NAV_PENDING = (_img_path, tuple(_img_params))
+        self.PREFETCHER.fnc_request(_img_path, _img_params, exclusive=1)
+        # end of function
+    #!
+    # shows the image requested by fnc_navRender(...), or the fine image requested by fnc_refine(...), when it has
+    #   been rendered. This function is a callback used by the prefetcher.
+    # Args:
+    #   img_path : str
+    #       The path to the rendered image file.
+    #   params : tuple
+    #       The render parameters (see fnc_getRenderParams(...)).
+    # Returns: nothing.
+    def fnc_prefetched(self, img_path, params):
+        if self.IS_CLOSING:
+            return
+        if (self.NAV_PENDING is not None) and (self.NAV_PENDING == (img_path, params)):
+            # the image selected with the keys (see fnc_navRender(...))
+            self.NAV_PENDING = None
+            if (len(self.IMAGE_FILES_LIST) > 0) and (self.GRID is None):
+                self.fnc_next(0)
+            return
+        if (self.QUALITY_PENDING is None) or not (self.QUALITY_PENDING == (img_path, params)):
+            return
+        self.QUALITY_PENDING = None
+        if (len(self.IMAGE_FILES_LIST) > 0) and (self.GRID is None) and (self.ZOOM is None):
+            self.fnc_showImage(self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX], fine=1)
         # end of function
     #!
     # play images in self.IMAGE_FILES_LIST
@@ -441,22 +1275,42 @@ class ShchImgBrowser():
     def fnc_autoplay(self, **kwargs):
         if len(self.IMAGE_FILES_LIST) < 1:
             return
+        if not ((self.GRID is None) and (self.ZOOM is None)) and not ('stop' in kwargs):
+            return
 
         _stop_in_kwargs = 'stop' in kwargs
 
         if ('loop' in kwargs) and (not _stop_in_kwargs):
+            self.AUTOPLAY_QUEUE = []
+            if not (self.ANIMATION is None):
+                # the animated image is played once (or for AUTOPLAY_ANIMATION_MS) before moving on
+                _wait = self.ANIMATION.fnc_getWait(.001 * self.CONFIG.AUTOPLAY_ANIMATION_MS)
+                if _wait > 0:
+                    self.AUTOPLAY_DEADLINE = time.perf_counter() + _wait
+                    self.AUTOPLAY_QUEUE = [self.tk_main.after(\
+                        max(0, int(1000 * (_wait - self.AUTOPLAY_SHOW_TIME))), lambda: self.fnc_autoplay(loop=1))]
+                    return
             if self.CURRENT_IMAGE_INDEX >= len(self.IMAGE_FILES_LIST) - 1:
                 self.CURRENT_IMAGE_INDEX = -1
+            _start_time = time.perf_counter()
             self.fnc_next(1)
-
-            _interval = 100 * self.tk_scale_delay.get()
-            self.AUTOPLAY_QUEUE = [self.tk_main.after(_interval, lambda: self.fnc_autoplay(loop=1))]
+            _shown_time = time.perf_counter()
+
+            self.AUTOPLAY_FRAMES += 1
+            if _shown_time > self.AUTOPLAY_DEADLINE + self.AUTOPLAY_TOLERANCE:
+                self.AUTOPLAY_MISSED += 1
+                if DEBUG_ENABLED:
+                    print('autoplay deadline missed by {:.3f} s'.format(_shown_time - self.AUTOPLAY_DEADLINE))
+            self.AUTOPLAY_SHOW_TIME = .8 * self.AUTOPLAY_SHOW_TIME + .2 * (_shown_time - _start_time)
+            self.fnc_autoplaySchedule()
             return
 
         [self.tk_main.after_cancel(_each) for _each in self.AUTOPLAY_QUEUE]
         self.AUTOPLAY_QUEUE = []
 
         if _stop_in_kwargs:
+            if self.AUTOPLAY == 1:
+                self.fnc_sessionRecord('autoplay', on= 0)
             self.AUTOPLAY = 0
             self.tk_button_autoplay['text'] = 'play'
             return
@@ -464,16 +1318,112 @@ class ShchImgBrowser():
         self.AUTOPLAY += 1
         if self.AUTOPLAY > 1:
             self.AUTOPLAY = 0
+        self.fnc_sessionRecord('autoplay', on= self.AUTOPLAY, delay_ms= 100 * self.tk_scale_delay.get())
 
         if self.AUTOPLAY == 0:
             self.tk_button_autoplay['text'] = 'play'
             return
 
-        _interval = 100 * self.tk_scale_delay.get()
-        self.AUTOPLAY_QUEUE = [self.tk_main.after(_interval, lambda: self.fnc_autoplay(loop=1))]
+        # the shown image is on the screen now, the next one is due one interval later
+        self.AUTOPLAY_DEADLINE = time.perf_counter()
+        self.fnc_autoplaySchedule()
         self.tk_button_autoplay['text'] = 'pause'
         # end of function
+    #!
+    # schedules the next autoplayed image. Its deadline is one interval after the previous deadline (not after
+    #   the previous image was shown), and it is started ahead of the deadline by the time it takes to show
+    #   an image, so that it is on the screen on time. The next images are rendered in the background meanwhile
+    #   (see fnc_next(...)). If autoplay has fallen behind by more than an interval, the deadlines start over
+    #   from now (the images are not skipped to catch up).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_autoplaySchedule(self):
+        _now = time.perf_counter()
+        self.AUTOPLAY_DEADLINE += .1 * self.tk_scale_delay.get()
+        if self.AUTOPLAY_DEADLINE < _now:
+            self.AUTOPLAY_DEADLINE = _now
+        _delay = self.AUTOPLAY_DEADLINE - self.AUTOPLAY_SHOW_TIME - _now
+        self.AUTOPLAY_QUEUE = [self.tk_main.after(max(0, int(1000 * _delay)), lambda: self.fnc_autoplay(loop=1))]
+        # end of function
+
+    #!
+    # replaces the shown image (and the buttons under it) with the grid of thumbnails of all images in the folder.
+    #   Clicking a thumbnail shows that image (see fnc_gridSelect(...)).
+    #   This function is a callback used by the Grid View command in the menu.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_gridView(self):
+        if (len(self.IMAGE_FILES_LIST) < 1) or not (self.GRID is None) or not (self.ZOOM is None):
+            return
+
+        self.fnc_autoplay(stop=1)
+        if not (self.ANIMATION is None):
+            self.ANIMATION.fnc_pause()
+        [self.__f__[_key].pack_forget() for _key in self.__f__]
+
+        import lib.shch_img_browser_grid as ShchGrid
+        if self.THUMBNAILS is None:
+            import lib.shch_img_browser_thumbs as ShchThumbs
+            self.THUMBNAILS = ShchThumbs.ThumbnailStore(self.CONFIG.CACHE_PATH,\
+                                                        self.CONFIG.THUMBNAIL_CACHE_MB * 1024 * 1024)
+        self.GRID = ShchGrid.ImgGridView(
+                    self.tk_main, self.CONFIG.IMAGE_FOLDER, self.IMAGE_FILES_LIST, self.THUMBNAILS, self.fnc_gridSelect,
+                    current_index= self.CURRENT_IMAGE_INDEX, font_size= self.font(quinto=1),
+                    )
+        # end of function
+    #!
+    # closes the grid of thumbnails, and shows the selected image.
+    #   This function is a callback used by the grid of thumbnails (see fnc_gridView(...)).
+    # Args:
+    #   image_index : int
+    #       The index of the image (in self.IMAGE_FILES_LIST) to show.
+    # Returns: nothing.
+    def fnc_gridSelect(self, image_index):
+        if self.GRID is None:
+            return
+
+        self.GRID.fnc_stop()
+        self.GRID = None
+        self.CURRENT_IMAGE_INDEX = image_index
+        self.fnc_paint(image_keep=1)
+        # end of function
+    #!
+    # replaces the shown image (and the buttons under it) with the zoom view of it, in which the image can be seen
+    #   1:1 (and closer) and dragged around (see ShchZoom.ImgZoomView). Escape closes it (see fnc_zoomClose(...)).
+    #   This function is a callback used by the Zoom & Pan command in the menu (and a double click on the image).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_zoomView(self):
+        if (len(self.IMAGE_FILES_LIST) < 1) or not (self.GRID is None) or not (self.ZOOM is None):
+            return
+
+        self.fnc_autoplay(stop=1)
+        if not (self.ANIMATION is None):
+            self.ANIMATION.fnc_pause()
+        [self.__f__[_key].pack_forget() for _key in self.__f__]
+
+        import lib.shch_img_browser_zoom as ShchZoom
+        if self.ZOOM_TILES is None:
+            self.ZOOM_TILES = ShchZoom.TileCache(self.CONFIG.ZOOM_CACHE_MB * 1024 * 1024)
+        self.ZOOM = ShchZoom.ImgZoomView(
+                    self.tk_main,
+                    Shch.fnc_GetImageFilePath(self.CONFIG.IMAGE_FOLDER, self.IMAGE_FILES_LIST[self.CURRENT_IMAGE_INDEX]),
+                    self.ZOOM_TILES, self.fnc_zoomClose, font_size= self.font(quinto=1),
+                    )
+        # end of function
+    #!
+    # closes the zoom view, and shows the image as it was shown before.
+    #   This function is a callback used by the zoom view (see fnc_zoomView(...)).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_zoomClose(self):
+        if self.ZOOM is None:
+            return
 
+        self.ZOOM.fnc_stop()
+        self.ZOOM = None
+        self.fnc_paint(image_keep=1)
+        # end of function
     #!
     # changes the image scale relative to the screen.
     #   This function is a callback used by tk_button_scale_up and tk_button_scale_down (and their conterparts in the menu).
@@ -487,7 +1437,8 @@ class ShchImgBrowser():
             return
 
         self.CONFIG.IMAGE_SCALE_INDEX += scale_index_increment
-        # self.CONFIG.IMAGE_SCALE_INDEX is normalized in the function  fnc_showImage(...)
+        # self.CONFIG.IMAGE_SCALE_INDEX is normalized in the function  fnc_getRenderParams(...)
+        self.fnc_sessionRecord('scale', increment= scale_index_increment)
 
         self.fnc_next(0)
         # end of function
@@ -513,6 +1464,7 @@ class ShchImgBrowser():
                 self.IMAGE_FLIP_TOP_BOTTOM = 0
 
         if (how == 1) or (how == -1):
+            self.fnc_sessionRecord('flip', how= how)
             self.fnc_next(0)
         # end of function
     #!
@@ -534,6 +1486,7 @@ class ShchImgBrowser():
             if self.IMAGE_ROTATION_INDEX > 3:
                 self.IMAGE_ROTATION_INDEX = 0
 
+            self.fnc_sessionRecord('rotate', how= how)
             self.fnc_next(0)
         # end of function
     #!
@@ -550,6 +1503,7 @@ class ShchImgBrowser():
         self.IMAGE_FLIP_TOP_BOTTOM = 0
         self.IMAGE_ROTATION_INDEX = 0
 
+        self.fnc_sessionRecord('reset')
         self.fnc_next(0)
         # end of function
 
@@ -565,15 +1519,22 @@ class ShchImgBrowser():
         self.CONFIG.WIDGET_FONT_SIZE_INDEX += index_increment
         # self.CONFIG.WIDGET_FONT_SIZE_INDEX is normalized in the function font(...)
 
-        _was_autoplaying = (self.AUTOPLAY == 1)
-        _autoplaying_interval = self.tk_scale_delay.get()
-
-        self.fnc_paintStart(paint_again=1)
-        self.fnc_paint(autoplay_cancel=1, image_keep=1)
-        self.tk_scale_delay.set(_autoplaying_interval)
-
-        if _was_autoplaying:
-            self.fnc_autoplay()
+        # the widgets are not recreated, thus autoplay goes on
+        _start = time.perf_counter()
+        self.fnc_applyFonts()
+        self.fnc_sessionRecord('font', at= _start, increment= index_increment, index= self.CONFIG.WIDGET_FONT_SIZE_INDEX,\
+                               ms= round(1000. * (time.perf_counter() - _start), 3))
+        # end of function
+    #!
+    # changes the fonts of the menus, buttons and labels in place (after the button scale has changed).
+    # Args: none.
+    # Returns: nothing.
+    def fnc_applyFonts(self):
+        for _widget, _family, _size in self.__w__:
+            try:
+                _widget.configure(font= (_family, self.font(**{_size: 1})))
+            except:
+                pass
         # end of function
     #!
     # returns the font size
@@ -627,6 +1588,35 @@ class ShchImgBrowser():
             self.fnc_paint(autoplay_cancel=1)
         # end of function
     #!
+    # switches the recursive mode (i.e. browsing the subfolders of the image folder too) on or off.
+    #   The folder is listed again in the background; the images can be browsed as soon as they are found.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_recursive(self):
+        self.CONFIG.RECURSIVE = 0 if (self.CONFIG.RECURSIVE == 1) else 1
+        self.fnc_paint(autoplay_cancel=1)
+        # end of function
+    #!
+    # asks for the include and exclude glob patterns (comma separated, e.g. *.jpg, 2021/*), and lists the folder again.
+    # Args: none.
+    # Returns: nothing.
+    def fnc_globs(self):
+        _include = tk_simpledialog.askstring('Include Patterns',\
+                    'Show only the files matching (comma separated, empty - all files):',\
+                    initialvalue= ', '.join(self.CONFIG.INCLUDE_GLOBS), parent= self.tk_main)
+        if _include is None:
+            return
+        _exclude = tk_simpledialog.askstring('Exclude Patterns',\
+                    'Skip the files and subfolders matching (comma separated):',\
+                    initialvalue= ', '.join(self.CONFIG.EXCLUDE_GLOBS), parent= self.tk_main)
+        if _exclude is None:
+            return
+
+        self.CONFIG.INCLUDE_GLOBS = [_each.strip() for _each in _include.split(',') if len(_each.strip()) > 0]
+        self.CONFIG.EXCLUDE_GLOBS = [_each.strip() for _each in _exclude.split(',') if len(_each.strip()) > 0]
+        self.fnc_paint(autoplay_cancel=1)
+        # end of function
+    #!
     # callback for |Extensions| > |Select Extensions|,
     # callback for |Extensions| > |(+) Add Extension|,
     # callback for |Extensions| > |(-) Remove Extension|
@@ -655,6 +1645,9 @@ class ShchImgBrowser():
     # end of class
 
 if __name__ == "__main__":
+    # the decode worker processes (see ShchPool) start this program again, which must be stopped here when frozen
+    import multiprocessing
+    multiprocessing.freeze_support()
     tk_window_main = tk.Tk()
     # centering the window...
     screen_width = tk_window_main.winfo_screenwidth()
@@ -0,0 +1,780 @@
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+import lib.shch_img_browser_lib as Shch
+import lib.shch_img_browser_index as ShchIndex
+import lib.shch_img_browser_meta as ShchMeta
+import lib.shch_img_browser_render as ShchRender
+import lib.shch_img_browser_session as ShchSession
+import lib.shch_img_browser_io as ShchIO
+
+from PIL import Image as pil_image
+import PIL
+
+try:
+    import resource
+except ImportError:
+    resource = None # e.g. on Windows
+
+__doc__ = """
+Benchmarks for the hot paths of Shch Image Browser. They run without a display.
+    scan : lists a synthetic folder with the old (os.listdir + os.path.isfile) and the new (os.scandir) scanner.
+    index : loads the list of a synthetic folder from the folder index, compared to listing the folder.
+    meta : probes the headers (dimensions, format, EXIF) of synthetic images (JPEG and PNG, per format).
+    suite : runs the hot paths on synthetic folders of 1k, 10k and 100k images (mixed formats and sizes):
+        the folder scan, the start folder probe, and the load, transform and resize path of showing an image
+        (and creating the PhotoImage, with --tk, which needs a display, e.g. Xvfb). It reports the p50/p95/p99
+        latencies, the throughput and the peak RSS.
+    compare : compares two reports of the suite (e.g. of two commits) and lists the regressions.
+    startup : times the start of the browser: importing it (in a new process), loading the config on the first run,
+        looking for the start folder (against listing it in full), opening the first TIFF (with the plugin loaded
+        on demand, against all plugins), and (with --tk, which needs a display) showing the window and
+        the first image.
+    replay : replays a recorded session (|Mics| > |Record Session| in the browser) and reports the time every
+        operation takes, replayed and as recorded; optionally under cProfile or tracemalloc.
+Example:
+    python shch_img_browser_bench.py scan --files 200000
+    python shch_img_browser_bench.py suite --output before.json
+    python shch_img_browser_bench.py compare before.json after.json
+    python shch_img_browser_bench.py startup --output startup.json
+    python shch_img_browser_bench.py replay session_20240101_120000.jsonl --speed 0 --profile replay.prof
+"""
+
+DEBUG_ENABLED = False
+#!
+# creates a folder with (empty) files to be listed: images with mixed extensions, and other files.
+# Args:
+#   folder : str
+#       The folder to create the files in (it must exist).
+#   file_count : int
+#       The number of files to create.
+# Returns: nothing.
+def fnc_MakeScanFolder(folder, file_count):
+    _exts = ('jpg', 'JPG', 'png', 'tif', 'gif', 'txt', 'xmp', 'bmp', 'jpeg', 'json')
+    for _index in range(file_count):
+        _path = os.path.join(folder, 'img_{:07d}.{}'.format(_index, _exts[_index % len(_exts)]))
+        with open(_path, 'wb'):
+            pass
+    os.mkdir(os.path.join(folder, 'subfolder.jpg')) # a folder which looks like an image
+    # end of function
+#!
+# lists a folder the way it was done before os.scandir(...) was used (kept as the baseline).
+# Args:
+#   image_folder : str
+#       This must be a legit folder name.
+#   legit_extensions : dict
+#       See Shch.fnc_GetImageFileList(...).
+# Returns: list
+def fnc_GetImageFileListBaseline(image_folder, legit_extensions):
+    return [_f for _f in os.listdir(image_folder) if\
+        os.path.isfile(os.path.join(image_folder, _f)) and\
+        Shch.fnc_HasLegitExtension(_f, legit_extensions)]
+    # end of function
+#!
+# runs a function a few times, and returns the timings.
+# Args:
+#   fnc : function
+#       The function to time (it is called without arguments).
+#   repeat : int
+#       How many times to call the function.
+# Returns: timings : list
+#   The time of each call (in seconds).
+def fnc_Time(fnc, repeat):
+    _timings = []
+    for _each in range(repeat):
+        _start = time.perf_counter()
+        fnc()
+        _timings.append(time.perf_counter() - _start)
+    return _timings
+    # end of function
+#!
+# benchmarks listing a folder: the baseline against Shch.fnc_GetImageFileList(...), and the time it takes
+#   the streaming scanner to find the first image.
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (files, repeat, folder).
+# Returns: report : dict
+def fnc_BenchScan(args):
+    _extensions = {'png': (1, 0), 'jpg': (1, 0), 'jpeg': (1, 0), 'tiff': (1, 0), 'tif': (1, 0),\
+                   'gif': (1, 0), 'bmp': (1, 0), 'raw': (1, 0), 'eps': (1, 0),}
+    _tmp_folder = None
+    _folder = args.folder
+    if _folder is None:
+        _tmp_folder = tempfile.mkdtemp(prefix='shch_bench_')
+        _folder = _tmp_folder
+        fnc_MakeScanFolder(_folder, args.files)
+
+    try:
+        _entry_count = len(os.listdir(_folder))
+        _baseline = fnc_Time(lambda: fnc_GetImageFileListBaseline(_folder, _extensions), args.repeat)
+        _scandir = fnc_Time(lambda: Shch.fnc_GetImageFileList(_folder, _extensions), args.repeat)
+        _first = fnc_Time(lambda: next(Shch.fnc_IterImageFiles(_folder, _extensions), None), args.repeat)
+        _found = len(Shch.fnc_GetImageFileList(_folder, _extensions))
+        if not (_found == len(fnc_GetImageFileListBaseline(_folder, _extensions))):
+            print('warning: the scanners found different files', file=sys.stderr)
+    finally:
+        if not (_tmp_folder is None):
+            shutil.rmtree(_tmp_folder, ignore_errors=True)
+
+    return {
+        'entries': _entry_count,
+        'images': _found,
+        'baseline_s': min(_baseline),
+        'scandir_s': min(_scandir),
+        'first_image_s': min(_first),
+        'baseline_entries_per_s': _entry_count / max(min(_baseline), 1e-9),
+        'scandir_entries_per_s': _entry_count / max(min(_scandir), 1e-9),
+        'speedup': min(_baseline) / max(min(_scandir), 1e-9),
+        }
+    # end of function
+#!
+# benchmarks opening a folder: loading the last known list from the folder index against listing the folder.
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (files, repeat).
+# Returns: report : dict
+def fnc_BenchIndex(args):
+    _extensions = {'png': (1, 0), 'jpg': (1, 0), 'jpeg': (1, 0), 'tiff': (1, 0), 'tif': (1, 0),\
+                   'gif': (1, 0), 'bmp': (1, 0), 'raw': (1, 0), 'eps': (1, 0),}
+    _folder = tempfile.mkdtemp(prefix='shch_bench_')
+    _cache_folder = tempfile.mkdtemp(prefix='shch_bench_cache_')
+    try:
+        fnc_MakeScanFolder(_folder, args.files)
+        _signature = ShchIndex.fnc_GetSignature(_extensions)
+        _index = ShchIndex.FolderIndex(_cache_folder, _folder, _signature)
+        _image_files = Shch.fnc_GetImageFileList(_folder, _extensions)
+        _update = fnc_Time(lambda: (_index.fnc_update(_image_files), _index.THREAD.join()), 1)
+        _update_again = fnc_Time(lambda: (_index.fnc_update(_image_files), _index.THREAD.join()), 1)
+        _scan = fnc_Time(lambda: Shch.fnc_GetImageFileList(_folder, _extensions), args.repeat)
+        _load = fnc_Time(lambda: ShchIndex.FolderIndex(_cache_folder, _folder, _signature).fnc_load(), args.repeat)
+        _loaded = len(ShchIndex.FolderIndex(_cache_folder, _folder, _signature).fnc_load())
+    finally:
+        shutil.rmtree(_folder, ignore_errors=True)
+        shutil.rmtree(_cache_folder, ignore_errors=True)
+
+    return {
+        'images': len(_image_files),
+        'loaded': _loaded,
+        'first_update_s': _update[0],
+        'unchanged_update_s': _update_again[0],
+        'scan_s': min(_scan),
+        'index_load_s': min(_load),
+        }
+    # end of function
+#!
+# benchmarks probing image headers (see ShchMeta.fnc_ProbeImage(...)): cold (every file is opened), and warm
+#   (from the cache), per image format. The PNGs have no EXIF data, thus a probe which decodes the pixels to look
+#   for it after them shows up in the cold time.
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (files, size, formats).
+# Returns: report : dict
+def fnc_BenchMeta(args):
+    _folder = tempfile.mkdtemp(prefix='shch_bench_')
+    _report = {'images': args.files}
+    try:
+        # noise, so that decoding the pixels takes as long as it does with photos
+        _img = pil_image.effect_noise((args.size, args.size * 3 // 4), 40).convert('RGB')
+        _exif = pil_image.Exif()
+        _exif[0x0112] = 1
+        for _ext in args.formats:
+            _paths = []
+            for _index in range(args.files):
+                _path = os.path.join(_folder, 'img_{:07d}.{}'.format(_index, _ext))
+                if _ext == 'jpg':
+                    _img.save(_path, 'JPEG', quality= 85, exif= _exif)
+                else:
+                    _img.save(_path)
+                _paths.append(_path)
+
+            _cache = ShchMeta.MetadataCache()
+            _cold = fnc_Time(lambda: _cache.fnc_getMany(_paths), 1)
+            _warm = fnc_Time(lambda: _cache.fnc_getMany(_paths), 1)
+            _probed = sum(1 for _meta in _cache.fnc_getMany(_paths).values() if _meta is not None)
+            _report[_ext] = {
+                'probed': _probed,
+                'cold_s': _cold[0],
+                'warm_s': _warm[0],
+                'cold_images_per_s': args.files / max(_cold[0], 1e-9),
+                }
+            for _path in _paths:
+                os.remove(_path)
+    finally:
+        shutil.rmtree(_folder, ignore_errors=True)
+
+    return _report
+    # end of function
+#!
+# returns the percentiles of timings, and the throughput.
+# Args:
+#   timings : list
+#       The timings (in seconds).
+# Returns: stats : dict
+#   The latencies (p50, p95, p99, mean, max) are in ms; per_s is how many calls a second were made.
+def fnc_GetStats(timings):
+    if len(timings) < 1:
+        return {'n': 0}
+    _sorted = sorted(timings)
+    def fnc_Percentile(percent):
+        # linear interpolation between the closest ranks
+        _rank = (len(_sorted) - 1) * percent / 100.
+        _low = int(_rank)
+        _high = min(_low + 1, len(_sorted) - 1)
+        return _sorted[_low] + (_sorted[_high] - _sorted[_low]) * (_rank - _low)
+    return {
+        'n': len(_sorted),
+        'p50_ms': 1000. * fnc_Percentile(50),
+        'p95_ms': 1000. * fnc_Percentile(95),
+        'p99_ms': 1000. * fnc_Percentile(99),
+        'mean_ms': 1000. * sum(_sorted) / len(_sorted),
+        'max_ms': 1000. * _sorted[-1],
+        'per_s': len(_sorted) / max(sum(_sorted), 1e-9),
+        }
+    # end of function
+#!
+# returns the peak resident memory of this process so far.
+# Args: none.
+# Returns: peak_rss : float
+#   In MB, or None where it is not known (e.g. on Windows).
+def fnc_GetPeakRss():
+    if resource is None:
+        return None
+    _peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # this is in KB on Linux, and in bytes on macOS
+    return _peak / (1048576. if (sys.platform == 'darwin') else 1024.)
+    # end of function
+#!
+# creates the images the synthetic folders are made of: every format in a few sizes, from thumbnails to
+#   12 Mpx photos. The pixels are gradients with noise, which compress about as well as photos do.
+# Args:
+#   folder : str
+#       The folder to create the images in (it must exist).
+# Returns: templates : list
+#   The (path, weight) of each image; the small images are more common than the large ones.
+def fnc_MakeImageTemplates(folder):
+    _sizes = (((320, 240), 4), ((1024, 768), 4), ((2048, 1536), 2), ((4000, 3000), 1))
+    _formats = (('jpg', 'JPEG', 'RGB'), ('png', 'PNG', 'RGB'), ('gif', 'GIF', 'P'), ('tif', 'TIFF', 'RGB'),\
+                ('bmp', 'BMP', 'RGB'), ('webp', 'WEBP', 'RGB'))
+    _templates = []
+    for (_width, _height), _weight in _sizes:
+        _img = pil_image.merge('RGB', (pil_image.radial_gradient('L').resize((_width, _height)),\
+                                       pil_image.linear_gradient('L').resize((_width, _height)),\
+                                       pil_image.effect_noise((_width, _height), 24)))
+        for _ext, _format, _mode in _formats:
+            _path = os.path.join(folder, 'template_{}x{}.{}'.format(_width, _height, _ext))
+            try:
+                (_img.convert(_mode) if not (_mode == 'RGB') else _img).save(_path, _format)
+            except:
+                # e.g. Pillow is built without WebP
+                continue
+            _templates.append((_path, _weight))
+    return _templates
+    # end of function
+#!
+# creates a folder of images (linked to the templates, so that even 100k images take little disk space),
+#   and some other files which the scan must skip.
+# Args:
+#   folder : str
+#       The folder to create the files in (it must exist).
+#   file_count : int
+#       The number of images.
+#   templates : list
+#       See fnc_MakeImageTemplates(...).
+#   seed : int
+#       The seed of the random choice of templates (the same seed makes the same folder).
+# Returns: nothing.
+def fnc_MakeImageFolder(folder, file_count, templates, seed):
+    _random = random.Random(seed)
+    _paths = [_path for _path, _weight in templates]
+    _weights = [_weight for _path, _weight in templates]
+    for _index, _template in enumerate(_random.choices(_paths, weights= _weights, k= file_count)):
+        _path = os.path.join(folder, 'img_{:07d}{}'.format(_index, os.path.splitext(_template)[1]))
+        try:
+            os.link(_template, _path)
+        except OSError:
+            shutil.copyfile(_template, _path)
+        if _index % 10 == 9:
+            with open(os.path.join(folder, 'notes_{:07d}.txt'.format(_index)), 'wb'):
+                pass
+    # end of function
+#!
+# runs the hot paths on one synthetic folder.
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (samples, repeat, seed, screen).
+#   file_count : int
+#       The number of images in the folder.
+#   templates : list
+#       See fnc_MakeImageTemplates(...).
+#   tk_root : Tk
+#       If not None, the PhotoImages are created as well.
+# Returns: report : dict
+def fnc_BenchFolder(args, file_count, templates, tk_root):
+    # the same extensions (and scales) as the browser has by default
+    _extensions = {'png': (1, 0), 'jpg': (1, 0), 'jpeg': (1, 0), 'tiff': (1, 0), 'tif': (1, 0),\
+                   'gif': (1, 0), 'bmp': (1, 0), 'webp': (1, 0), 'raw': (1, 0), 'eps': (1, 0),}
+    _max_scale = .75
+    _screen_size = tuple(args.screen)
+    # the folder is where the start folder probe looks for it (see Shch.ImgBrowserStartDir)
+    _home = tempfile.mkdtemp(prefix='shch_bench_home_')
+    _folder = os.path.join(_home, 'Pictures', 'Saved Pictures')
+    _environ = {_key: os.environ.get(_key) for _key in ('HOME', 'USERPROFILE')}
+    try:
+        os.makedirs(_folder)
+        _start = time.perf_counter()
+        fnc_MakeImageFolder(_folder, file_count, templates, args.seed)
+        _make_time = time.perf_counter() - _start
+
+        _scan = fnc_Time(lambda: Shch.fnc_GetImageFileList(_folder, _extensions), args.repeat)
+        _image_files = sorted(Shch.fnc_GetImageFileList(_folder, _extensions))
+        os.environ['HOME'] = _home
+        os.environ['USERPROFILE'] = _home
+        _start_dir = fnc_Time(lambda: Shch.ImgBrowserStartDir(_extensions, _home), args.repeat)
+
+        # the images are sampled evenly over the folder
+        _step = max(1, len(_image_files) // max(1, args.samples))
+        _samples = [os.path.join(_folder, _each) for _each in _image_files[::_step][:args.samples]]
+        _timings = {'load': [], 'transform': [], 'render_fast': [], 'render_fine': [], 'photo': []}
+        for _index, _path in enumerate(_samples):
+            # see ShchImgBrowser.fnc_showImage(...): a cold image is loaded (the working copy), and then
+            #   resized, flipped and rotated; the images stepped through quickly are rendered at once
+            _params = (_max_scale, _index % 2, 0, (None, pil_image.ROTATE_90)[_index % 2], _screen_size)
+            _start = time.perf_counter()
+            _master = ShchRender.fnc_LoadMaster(_path, _max_scale, _screen_size)
+            _timings['load'].append(time.perf_counter() - _start)
+            if _master is None:
+                print('warning: the image cannot be loaded: {}'.format(_path), file=sys.stderr)
+                continue
+            _start = time.perf_counter()
+            _frame = _master.fnc_render(*_params, 'fine')
+            _timings['transform'].append(time.perf_counter() - _start)
+            _start = time.perf_counter()
+            ShchRender.fnc_RenderImage(_path, *_params, 'fast')
+            _timings['render_fast'].append(time.perf_counter() - _start)
+            _start = time.perf_counter()
+            ShchRender.fnc_RenderImage(_path, *_params, 'fine')
+            _timings['render_fine'].append(time.perf_counter() - _start)
+            if not (tk_root is None) and not (_frame is None):
+                _start = time.perf_counter()
+                _frame.fnc_getPhoto()
+                _timings['photo'].append(time.perf_counter() - _start)
+    finally:
+        for _key, _value in _environ.items():
+            if _value is None:
+                os.environ.pop(_key, None)
+            else:
+                os.environ[_key] = _value
+        shutil.rmtree(_home, ignore_errors=True)
+
+    _report = {
+        'images': len(_image_files),
+        'make_s': _make_time,
+        'scan': fnc_GetStats(_scan),
+        'start_dir': fnc_GetStats(_start_dir),
+        }
+    for _stage, _stage_timings in _timings.items():
+        if len(_stage_timings) > 0:
+            _report[_stage] = fnc_GetStats(_stage_timings)
+    _report['scan']['entries_per_s'] = (file_count + file_count // 10) / max(min(_scan), 1e-9)
+    _report['peak_rss_mb'] = fnc_GetPeakRss()
+    return _report
+    # end of function
+#!
+# runs the hot paths on synthetic folders of the given sizes (see fnc_BenchFolder(...)).
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (sizes, samples, repeat, seed, screen, tk, label).
+# Returns: report : dict
+def fnc_BenchSuite(args):
+    _tk_root = None
+    if args.tk:
+        try:
+            import tkinter as tk
+            _tk_root = tk.Tk()
+            _tk_root.withdraw()
+        except:
+            print('warning: there is no display, the PhotoImages are not created', file=sys.stderr)
+
+    _templates_folder = tempfile.mkdtemp(prefix='shch_bench_templates_')
+    try:
+        _templates = fnc_MakeImageTemplates(_templates_folder)
+        _folders = dict()
+        for _file_count in args.sizes:
+            _folders[str(_file_count)] = fnc_BenchFolder(args, _file_count, _templates, _tk_root)
+            if DEBUG_ENABLED:
+                print('folder of {} images is done'.format(_file_count))
+    finally:
+        shutil.rmtree(_templates_folder, ignore_errors=True)
+        if not (_tk_root is None):
+            _tk_root.destroy()
+
+    return {
+        'label': args.label,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'screen': list(args.screen),
+        'samples': args.samples,
+        'folders': _folders,
+        'peak_rss_mb': fnc_GetPeakRss(),
+        }
+    # end of function
+#!
+# compares two reports of the suite. The latencies (and the peak RSS) which have grown by more than the threshold
+#   are the regressions.
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (base, new, threshold, min_ms).
+# Returns: report : dict
+#   The rows of the comparison, and the regressions among them.
+def fnc_Compare(args):
+    _reports = []
+    for _path in (args.base, args.new):
+        with open(_path, 'r') as _file:
+            _reports.append(json.load(_file))
+
+    _rows = []
+    for _folder, _base_folder in sorted(_reports[0]['folders'].items(), key= lambda item: int(item[0])):
+        _new_folder = _reports[1]['folders'].get(_folder)
+        if _new_folder is None:
+            continue
+        for _stage, _base_stats in _base_folder.items():
+            if not isinstance(_base_stats, dict) or not isinstance(_new_folder.get(_stage), dict):
+                continue
+            for _metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+                if not ((_metric in _base_stats) and (_metric in _new_folder[_stage])):
+                    continue
+                _base, _new = _base_stats[_metric], _new_folder[_stage][_metric]
+                _change = 100. * (_new - _base) / max(_base, 1e-9)
+                _rows.append({'folder': _folder, 'stage': _stage, 'metric': _metric, 'base': _base, 'new': _new,\
+                              'change_pct': _change,\
+                              'regression': (_change > args.threshold) and ((_new - _base) > args.min_ms)})
+    if not ((_reports[0].get('peak_rss_mb') is None) or (_reports[1].get('peak_rss_mb') is None)):
+        _base, _new = _reports[0]['peak_rss_mb'], _reports[1]['peak_rss_mb']
+        _change = 100. * (_new - _base) / max(_base, 1e-9)
+        _rows.append({'folder': None, 'stage': None, 'metric': 'peak_rss_mb', 'base': _base, 'new': _new,\
+                      'change_pct': _change, 'regression': _change > args.threshold})
+
+    return {
+        'base': _reports[0].get('label') or args.base,
+        'new': _reports[1].get('label') or args.new,
+        'threshold_pct': args.threshold,
+        'rows': _rows,
+        'regressions': [_row for _row in _rows if _row['regression']],
+        }
+    # end of function
+#!
+# runs a piece of code in a new Python process (in the folder of this program), and returns what it prints as JSON.
+# Args:
+#   code : str
+#       The code; it prints one JSON value (and nothing else).
+#   environ : dict
+#       The environment variables to set (or to override).
+#   kwargs : typical kwargs
+#       'timeout' : int
+#           How long to wait for the process (in seconds). The default is 120.
+# Returns: result : any JSON value
+#   This is None if the process has failed (its error output is printed).
+def fnc_RunChild(code, environ, **kwargs):
+    _environ = dict(os.environ)
+    _environ.update(environ)
+    try:
+        _process = subprocess.run([sys.executable, '-c', code], cwd= os.path.dirname(os.path.abspath(__file__)),\
+                                  env= _environ, capture_output= True, text= True,\
+                                  timeout= kwargs['timeout'] if 'timeout' in kwargs else 120)
+    except subprocess.TimeoutExpired:
+        print('warning: the process has timed out', file=sys.stderr)
+        return None
+    if not (_process.returncode == 0):
+        print('warning: the process has failed:\n' + _process.stderr[-2000:], file=sys.stderr)
+        return None
+    try:
+        return json.loads(_process.stdout.strip().splitlines()[-1])
+    except:
+        return None
+    # end of function
+
+# the code run in new processes by fnc_BenchStartup(...); each prints its timing(s) as JSON
+STARTUP_IMPORT_CODE = '''
+import time
+_start = time.perf_counter()
+import shch_img_browser
+print(time.perf_counter() - _start)
+'''
+# the modules which the browser imports where they are first used (the zoom view, the grid, ...), after it has started
+STARTUP_DEFERRED_CODE = '''
+import time
+import shch_img_browser
+_start = time.perf_counter()
+import lib.shch_img_browser_pool, lib.shch_img_browser_zoom, lib.shch_img_browser_grid, lib.shch_img_browser_anim
+import lib.shch_img_browser_session, lib.shch_img_browser_index, lib.shch_img_browser_thumbs
+print(time.perf_counter() - _start)
+'''
+STARTUP_PLUGIN_CODE = '''
+import sys, time
+_path, _all = sys.argv[1], sys.argv[2] == '1'
+from PIL import Image as pil_image
+import lib.shch_img_browser_io as ShchIO
+_start = time.perf_counter()
+if _all:
+    # all plugins, as Pillow loads them when a file is not of the common formats
+    pil_image.init()
+_img, _file = ShchIO.fnc_OpenImage(_path)
+_img.load()
+_file.close()
+print(time.perf_counter() - _start)
+'''
+STARTUP_WINDOW_CODE = '''
+import json, time
+_start = time.perf_counter()
+import tkinter as tk
+import shch_img_browser as App
+import lib.shch_img_browser_perf as ShchPerf
+_root = tk.Tk()
+_app = App.ShchImgBrowser(_root)
+# no position is saved (see ShchImgBrowser.fnc_positionSave(...)), thus every run is the first one
+_app.CONFIG.RESUME = 0
+_result = {'construct_s': time.perf_counter() - _start, 'window_s': None, 'first_image_s': None}
+while (time.perf_counter() - _start < 60) and (_result['first_image_s'] is None):
+    _root.update()
+    _stages = [_each[0] for _each in ShchPerf.PERF.fnc_recent()]
+    if (_result['window_s'] is None) and ('startup' in _stages):
+        _result['window_s'] = time.perf_counter() - _start
+    if 'show' in _stages:
+        _result['first_image_s'] = time.perf_counter() - _start
+_app.fnc_paintStop()
+print(json.dumps(_result))
+'''
+#!
+# times the start of the browser (see STARTUP_IMPORT_CODE, STARTUP_DEFERRED_CODE, STARTUP_PLUGIN_CODE and
+#   STARTUP_WINDOW_CODE). The first run is made in a temporary home folder with Pictures/Saved Pictures of the given
+#   number of files, by a user who has no config file.
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (files, repeat, tk, label).
+# Returns: report : dict
+def fnc_BenchStartup(args):
+    _extensions = {'png': (1, 0), 'jpg': (1, 0), 'jpeg': (1, 0), 'tiff': (1, 0), 'tif': (1, 0),\
+                   'gif': (1, 0), 'bmp': (1, 0), 'raw': (1, 0), 'eps': (1, 0),}
+    _home = tempfile.mkdtemp(prefix='shch_bench_home_')
+    _folder = os.path.join(_home, 'Pictures', 'Saved Pictures')
+    # no config file is found for this user, thus it is the first run
+    _user = 'shch_bench_{}'.format(os.getpid())
+    _environ = {'HOME': _home, 'USERPROFILE': _home, 'LOGNAME': _user, 'USER': _user, 'LNAME': _user, 'USERNAME': _user}
+    _saved_environ = {_key: os.environ.get(_key) for _key in _environ}
+    _report = {}
+    try:
+        os.makedirs(_folder)
+        fnc_MakeScanFolder(_folder, args.files)
+        _tiff_path = os.path.join(_home, 'first.tif')
+        pil_image.linear_gradient('L').resize((1024, 768)).convert('RGB').save(_tiff_path, 'TIFF')
+
+        _report['import'] = fnc_GetStats([_each for _each in\
+            [fnc_RunChild(STARTUP_IMPORT_CODE, _environ) for _repeat in range(args.repeat)] if not (_each is None)])
+        _report['import_deferred'] = fnc_GetStats([_each for _each in\
+            [fnc_RunChild(STARTUP_DEFERRED_CODE, _environ) for _repeat in range(args.repeat)] if not (_each is None)])
+        for _name, _all in (('first_tiff_lazy', '0'), ('first_tiff_all_plugins', '1')):
+            _code = 'import sys; sys.argv = [None, {!r}, {!r}]\n'.format(_tiff_path, _all) + STARTUP_PLUGIN_CODE
+            _report[_name] = fnc_GetStats([_each for _each in\
+                [fnc_RunChild(_code, _environ) for _repeat in range(args.repeat)] if not (_each is None)])
+
+        os.environ.update(_environ)
+        _report['config_first_run'] = fnc_GetStats(fnc_Time(lambda: Shch.ImgBrowserConfig(start_dir_later=1),\
+                                                            args.repeat))
+        _report['start_dir'] = fnc_GetStats(fnc_Time(lambda: Shch.ImgBrowserStartDir(_extensions, _home), args.repeat))
+        # the start folder was checked by listing it in full before
+        _report['start_dir_full_listing'] = fnc_GetStats(fnc_Time(\
+            lambda: len(Shch.fnc_GetImageFileList(_folder, _extensions)) > 0, args.repeat))
+
+        if args.tk:
+            _windows = [_each for _each in [fnc_RunChild(STARTUP_WINDOW_CODE, _environ)\
+                                            for _repeat in range(args.repeat)] if not (_each is None)]
+            if len(_windows) < 1:
+                print('warning: the window cannot be shown (is there a display?)', file=sys.stderr)
+            for _key in ('construct_s', 'window_s', 'first_image_s'):
+                _report[_key[:-2]] = fnc_GetStats([_each[_key] for _each in _windows if not (_each[_key] is None)])
+    finally:
+        for _key, _value in _saved_environ.items():
+            if _value is None:
+                os.environ.pop(_key, None)
+            else:
+                os.environ[_key] = _value
+        shutil.rmtree(_home, ignore_errors=True)
+
+    return {
+        'label': args.label,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'files': args.files,
+        'startup': _report,
+        }
+    # end of function
+#!
+# replays a recorded session (see ShchSession.SessionPlayer), optionally under cProfile (the stats are written to
+#   a file, and the slowest functions are printed to stderr) or tracemalloc (the peak and the largest allocation
+#   sites are added to the report).
+# Args:
+#   args : argparse.Namespace
+#       The command line arguments (session, folder, speed, tk, profile, top, tracemalloc, label).
+# Returns: report : dict
+def fnc_Replay(args):
+    _tk_root = None
+    _kwargs = {'speed': args.speed}
+    if not (args.folder is None):
+        _kwargs['folder'] = args.folder
+    if args.tk:
+        try:
+            import tkinter as tk
+            _tk_root = tk.Tk()
+            _tk_root.withdraw()
+            _kwargs['photo'] = lambda frame: frame.fnc_getPhoto()
+        except:
+            print('warning: there is no display, the PhotoImages are not created', file=sys.stderr)
+    _player = ShchSession.SessionPlayer(args.session, **_kwargs)
+
+    _profiler = None
+    if not (args.profile is None):
+        import cProfile
+        _profiler = cProfile.Profile()
+    if args.tracemalloc:
+        import tracemalloc
+        tracemalloc.start()
+
+    _start = time.perf_counter()
+    try:
+        if _profiler is None:
+            _player.fnc_play()
+        else:
+            _profiler.runcall(_player.fnc_play)
+    finally:
+        if not (_tk_root is None):
+            _tk_root.destroy()
+    _replay_time = time.perf_counter() - _start
+
+    _report = {
+        'label': args.label,
+        'session': args.session,
+        'folder': _player.IMAGE_FOLDER,
+        'speed': args.speed,
+        'ops': len(_player.OPS),
+        'recorded_s': (_player.OPS[-1]['t'] - _player.OPS[0]['t']) if (len(_player.OPS) > 0) else 0.,
+        'replay_s': _replay_time,
+        'missing_images': _player.MISSING,
+        'operations': {_op: {'replay': fnc_GetStats(_timings),\
+                             'recorded': fnc_GetStats(_player.RECORDED.get(_op, []))}\
+                       for _op, _timings in sorted(_player.TIMINGS.items())},
+        'frame_cache': _player.FRAME_CACHE.fnc_stats() if not (_player.FRAME_CACHE is None) else None,
+        'io': ShchIO.IO_STATS.fnc_stats(),
+        'peak_rss_mb': fnc_GetPeakRss(),
+        }
+
+    if not (_profiler is None):
+        import pstats
+        _profiler.dump_stats(args.profile)
+        pstats.Stats(_profiler, stream= sys.stderr).sort_stats('cumulative').print_stats(args.top)
+        _report['profile'] = args.profile
+    if args.tracemalloc:
+        _current, _peak = tracemalloc.get_traced_memory()
+        _top = tracemalloc.take_snapshot().statistics('lineno')[:args.top]
+        tracemalloc.stop()
+        _report['tracemalloc'] = {
+            'current_mb': _current / 1048576.,
+            'peak_mb': _peak / 1048576.,
+            'top': [{'where': str(_each.traceback), 'size_mb': _each.size / 1048576., 'count': _each.count}\
+                    for _each in _top],
+            }
+    return _report
+    # end of function
+#!
+# parses the command line and runs the selected benchmark. The report is printed as JSON.
+# Args: none.
+# Returns: nothing.
+def fnc_Main():
+    _parser = argparse.ArgumentParser(description= 'Shch Image Browser benchmarks')
+    _subparsers = _parser.add_subparsers(dest= 'benchmark')
+    _scan = _subparsers.add_parser('scan', help= 'folder listing throughput')
+    _scan.add_argument('--files', type= int, default= 100000, help= 'number of files in the synthetic folder')
+    _scan.add_argument('--folder', default= None, help= 'list this folder instead of a synthetic one')
+    _scan.add_argument('--repeat', type= int, default= 3)
+
+    _index = _subparsers.add_parser('index', help= 'opening a folder from the folder index')
+    _index.add_argument('--files', type= int, default= 100000, help= 'number of files in the synthetic folder')
+    _index.add_argument('--repeat', type= int, default= 3)
+
+    _meta = _subparsers.add_parser('meta', help= 'header probing throughput')
+    _meta.add_argument('--files', type= int, default= 10000, help= 'number of images to probe')
+    _meta.add_argument('--size', type= int, default= 640, help= 'the width of the images')
+    _meta.add_argument('--formats', nargs= '+', default= ['jpg', 'png'], help= 'the image formats (file extensions)')
+
+    _suite = _subparsers.add_parser('suite', help= 'scan, start folder and render latencies on synthetic folders')
+    _suite.add_argument('--sizes', type= int, nargs= '+', default= [1000, 10000, 100000],\
+                        help= 'the numbers of images in the synthetic folders')
+    _suite.add_argument('--samples', type= int, default= 100, help= 'the number of images rendered per folder')
+    _suite.add_argument('--repeat', type= int, default= 5, help= 'how many times to scan each folder')
+    _suite.add_argument('--seed', type= int, default= 1)
+    _suite.add_argument('--screen', type= int, nargs= 2, default= [1920, 1080], help= 'the screen width and height')
+    _suite.add_argument('--tk', action= 'store_true', help= 'create the PhotoImages too (this needs a display)')
+    _suite.add_argument('--label', default= None, help= 'the name of the report (e.g. the commit)')
+    _suite.add_argument('--output', default= None, help= 'write the report to this file as well')
+
+    _compare = _subparsers.add_parser('compare', help= 'compare two reports of the suite')
+    _compare.add_argument('base', help= 'the report to compare against')
+    _compare.add_argument('new', help= 'the new report')
+    _compare.add_argument('--threshold', type= float, default= 10., help= 'the slowdown (in %%) which is a regression')
+    _compare.add_argument('--min-ms', type= float, default= .5, help= 'the slowdowns below this (in ms) are noise')
+
+    _startup = _subparsers.add_parser('startup', help= 'import, first run and (with --tk) window start-up times')
+    _startup.add_argument('--files', type= int, default= 100000, help= 'number of files in ~/Pictures/Saved Pictures')
+    _startup.add_argument('--repeat', type= int, default= 5)
+    _startup.add_argument('--tk', action= 'store_true', help= 'show the window too (this needs a display)')
+    _startup.add_argument('--label', default= None, help= 'the name of the report (e.g. the commit)')
+    _startup.add_argument('--output', default= None, help= 'write the report to this file as well')
+
+    _replay = _subparsers.add_parser('replay', help= 'replay a recorded session and time its operations')
+    _replay.add_argument('session', help= 'the session file (see |Mics| > |Record Session| in the browser)')
+    _replay.add_argument('--folder', default= None, help= 'replay in this folder instead of the recorded one')
+    _replay.add_argument('--speed', type= float, default= 1.,\
+                         help= 'how much faster than recorded to replay (0: the operations back to back)')
+    _replay.add_argument('--tk', action= 'store_true', help= 'create the PhotoImages too (this needs a display)')
+    _replay.add_argument('--profile', default= None, help= 'profile the replay with cProfile, into this file')
+    _replay.add_argument('--tracemalloc', action= 'store_true', help= 'trace the memory allocations of the replay')
+    _replay.add_argument('--top', type= int, default= 25, help= 'how many functions / allocation sites to list')
+    _replay.add_argument('--label', default= None, help= 'the name of the report (e.g. the commit)')
+    _replay.add_argument('--output', default= None, help= 'write the report to this file as well')
+
+    _args = _parser.parse_args()
+    if _args.benchmark == 'scan':
+        _report = fnc_BenchScan(_args)
+    elif _args.benchmark == 'index':
+        _report = fnc_BenchIndex(_args)
+    elif _args.benchmark == 'meta':
+        _report = fnc_BenchMeta(_args)
+    elif _args.benchmark in ('suite', 'startup', 'replay'):
+        _report = {'suite': fnc_BenchSuite, 'startup': fnc_BenchStartup, 'replay': fnc_Replay}[_args.benchmark](_args)
+        if not (_args.output is None):
+            with open(_args.output, 'w') as _file:
+                json.dump(_report, _file, indent= 2)
+    elif _args.benchmark == 'compare':
+        _report = fnc_Compare(_args)
+    else:
+        _parser.print_help()
+        return
+    print(json.dumps(_report, indent= 2))
+    if (_args.benchmark == 'compare') and (len(_report['regressions']) > 0):
+        sys.exit(1)
+    # end of function
+
+if __name__ == "__main__":
+    fnc_Main()